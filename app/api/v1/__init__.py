@@ -1,6 +1,11 @@
 from fastapi import APIRouter
 
+from .batch import router as batch_router
 from .chat import router as chat_router
+from .health import router as health_router
 
 v1_router = APIRouter()
+# Before the chat routes, so /chat/batch/... is not taken for a conversation or user id
+v1_router.include_router(batch_router, tags=["batch"], prefix="/chat/batch")
 v1_router.include_router(chat_router, tags=["chat"], prefix="/chat")
+v1_router.include_router(health_router, tags=["health"], prefix="/health")
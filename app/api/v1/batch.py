@@ -0,0 +1,49 @@
+from __future__ import annotations as _annotations
+
+import json
+
+from fastapi import APIRouter
+from fastapi.responses import Response, StreamingResponse
+from starlette.exceptions import HTTPException
+
+from app.models.batch import BatchRequest
+from app.services.batch import item_ids, new_batch_id, run_batch, stored_batch_results
+from core.config import settings
+
+router = APIRouter()
+
+
+@router.post('/')
+async def post_batch(batch: BatchRequest) -> StreamingResponse:
+    """
+    Run many prompts through the chat pipeline and stream NDJSON results as they complete.
+
+    The first line describes the batch (keep its `batch_id` to resume), then one
+    `result` line per item in completion order, then a `summary` line.
+    """
+    if len(batch.items) > settings.BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"A batch can have at most {settings.BATCH_MAX_ITEMS} items")
+    ids = [item_id for item_id, _ in item_ids(batch)]
+    if len(set(ids)) != len(ids):
+        raise HTTPException(status_code=400, detail="Item ids must be unique within a batch")
+    batch_id = batch.batch_id or new_batch_id()
+
+    async def stream_results():
+        yield json.dumps({"type": "batch", "batch_id": batch_id, "items": len(ids)}).encode('utf-8') + b'\n'
+        counts = {"ok": 0, "error": 0, "resumed": 0}
+        async for result in run_batch(batch_id, batch):
+            counts["resumed" if result.get("resumed") else result["status"]] += 1
+            yield json.dumps({"type": "result", "batch_id": batch_id, **result}).encode('utf-8') + b'\n'
+        yield json.dumps({"type": "summary", "batch_id": batch_id, **counts}).encode('utf-8') + b'\n'
+
+    return StreamingResponse(stream_results(), media_type='application/x-ndjson')
+
+
+@router.get('/{batch_id}')
+async def get_batch(batch_id: str) -> Response:
+    """Completed results of a batch, as NDJSON, while they are kept (BATCH_RESULT_TTL)."""
+    results = await stored_batch_results(batch_id)
+    return Response(
+        b''.join(json.dumps({"type": "result", "batch_id": batch_id, **result}).encode('utf-8') + b'\n' for result in results),
+        media_type='application/x-ndjson',
+    )
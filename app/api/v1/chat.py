@@ -1,23 +1,40 @@
 from __future__ import annotations as _annotations
 
 import json
+import logging
+import time
 import datetime
+from contextlib import AsyncExitStack
 from pathlib import Path
 from typing import Annotated, Optional
 
-from fastapi import APIRouter, Depends, Request, Form
-from fastapi.responses import FileResponse, Response, StreamingResponse
+from fastapi import APIRouter, Depends, Request, Form, Header
+from fastapi.responses import FileResponse, Response
 from httpx import AsyncClient
 from app.models.chat import Deps
 from app.models.chat import to_chat_message
-from app.services.agents.chat_agent import chat_agent as agent
+from app.services.agents.registry import get_agent
+from pydantic_ai import capture_run_messages
 from pydantic_ai.messages import ModelResponse, TextPart
 from app.utils.pg_utils import PgDatabase
 from app.utils.pg_utils import DatabaseError
-from app.services.agents.metadata_agent import metadata_agent
-from app.services.agents.title_agent import title_agent
+from core.ai import record_agent_run
+from core.config import settings
+from core.metrics import USER_BUDGET_REJECTIONS
 from core.middleware import correlation_id_ctx_var
-from app.utils.redis_utils import retrieve_web_search_sources
+from core.shutdown import pending_writes
+from core.context_var import turn_deadline_ctx_var
+from app.utils.deadline import turn_deadline
+from app.utils.artifact_store import create_artifact_store
+from app.services.agents.tools.kb_prefetch import KnowledgeBasePrefetch
+from app.utils.search_data import ToolCallIndex
+from app.services.chat_pipeline import DEFAULT_METADATA, collect_search_data, generate_metadata, interrupted_turn_messages
+from app.utils.cassette import get_cassette_transport
+from app.utils.frame_scheduler import FrameScheduler
+from app.utils.compression import json_response, streaming_response
+from app.utils.usage import TurnUsage, get_conversation_owner, user_token_budget
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
@@ -29,14 +46,15 @@ async def get_db(request: Request) -> PgDatabase:
     return request.state.db
 
 @router.get('/{conversation_id}')
-async def get_chat(conversation_id: str, database: PgDatabase = Depends(get_db)) -> Response:
+async def get_chat(
+    conversation_id: str,
+    accept_encoding: Annotated[Optional[str], Header()] = None,
+    database: PgDatabase = Depends(get_db)
+) -> Response:
     # Get chronologically ordered messages with metadata interleaved
     messages_with_metadata = await database.get_chat_messages(conversation_id)
 
-    return Response(
-        json.dumps(messages_with_metadata).encode('utf-8'),
-        media_type='application/json',
-    )
+    return json_response(messages_with_metadata, accept_encoding)
 
 @router.delete('/{conversation_id}')
 async def delete_chat(conversation_id: str, database: PgDatabase = Depends(get_db)) -> Response:
@@ -60,12 +78,39 @@ async def post_chat(
     conversation_id: Annotated[str, Form()],
     language: Annotated[Optional[str], Form()] = None,
     use_web_search: Annotated[Optional[bool], Form()] = False,
+    x_turn_deadline: Annotated[Optional[float], Header(gt=0)] = None,
+    x_stream_compression: Annotated[Optional[bool], Header()] = False,
+    accept_encoding: Annotated[Optional[str], Header()] = None,
     database: PgDatabase = Depends(get_db)
-) -> StreamingResponse:
+) -> Response:
+    # Captured here, in the request context, rather than inside the stream generator
+    turn_id = correlation_id_ctx_var.get()
+    # Heavy users are throttled before the turn starts, not after it ran: the turn holds
+    # a reservation on the user's budget and settles it with its actual usage at the end
+    reservation = None
+    if user_token_budget.enabled:
+        user_id = await get_conversation_owner(database, conversation_id, timeout=settings.TURN_MIN_STAGE_SECONDS)
+        if user_id:
+            reservation = await user_token_budget.reserve(user_id)
+        if user_id and reservation is None:
+            USER_BUDGET_REJECTIONS.inc()
+            return Response(
+                json.dumps({"status": "error", "message": "Token budget exhausted, please try again later"}).encode('utf-8'),
+                status_code=429,
+                media_type='application/json',
+            )
+
+    # The whole turn, streaming included, must finish within this budget
+    deadline = turn_deadline(x_turn_deadline)
+
+    def model_frame(text: str, timestamp: datetime.datetime) -> bytes:
+        m = ModelResponse(parts=[TextPart(text)], timestamp=timestamp)
+        return json.dumps(to_chat_message(m, conversation_id)).encode('utf-8') + b'\n'
+
     async def stream_messages():
         """Streams new line delimited JSON `Message`s to the client."""
         # stream the user prompt so that can be displayed straight away
-        print(f"Use web search: {use_web_search}")
+        logger.debug(f"Use web search: {use_web_search}")
 
         yield (
             json.dumps(
@@ -79,84 +124,131 @@ async def stream_messages():
             + b'\n'
         )
         
-        messages = await database.get_messages(conversation_id)
+        turn_deadline_ctx_var.set(deadline)
         
-        async with AsyncClient(timeout=30.0) as client, database._get_connection() as db_connection:
-            deps = Deps(
-                client=client,
-                db_connection=db_connection,  # Use a connection from the pool
-                language=language,  # Pass the language parameter to deps
-                use_web_search=use_web_search  # Pass the use_web_search parameter to deps
-            )
-            
-            async with agent.run_stream(prompt, deps=deps, message_history=messages) as result:
-                async for text in result.stream(debounce_by=0.01):
-                    m = ModelResponse(parts=[TextPart(text)], timestamp=result.timestamp())
-                    yield json.dumps(to_chat_message(m, conversation_id)).encode('utf-8') + b'\n'
-            
-            search_data = None
-            # Try to retrieve sources from Redis using correlation ID
-            correlation_id = correlation_id_ctx_var.get()
-            if correlation_id:
-                web_search_sources = await retrieve_web_search_sources(correlation_id)
-                if web_search_sources:
-                    # Add sources to search data
-                    if not search_data:
-                        search_data = {}
-                    search_data["sources"] = web_search_sources
-            
+        turn_usage = TurnUsage()
+        async with AsyncClient(timeout=deadline.timeout(cap=30.0), transport=get_cassette_transport()) as client:
+            # Start the likely knowledge base query while history loads and the model plans
+            kb_prefetch = None
+            if settings.KB_PREFETCH_ENABLED and not use_web_search:
+                kb_prefetch = KnowledgeBasePrefetch(prompt, language)
+                kb_prefetch.start(client)
+
             try:
-                metadata_response = await metadata_agent.run(result.new_messages_json().decode('utf-8'), deps=deps)
-                if not search_data:
-                    search_data = {}
-                search_data['follow_up_questions'] = metadata_response.data.questions
-                search_data['provide_appointment_booking'] = metadata_response.data.provide_appointment_booking
-                search_data['recommend_product'] = metadata_response.data.recommend_product
-            except Exception as e:
-                print(f"Error: {e}")
-                if not search_data:
-                    search_data = {}
-                search_data['follow_up_questions'] = []
-                search_data['provide_appointment_booking'] = False
-                search_data['recommend_product'] = False
-
-            yield (
-                json.dumps(
-                    {
-                        'role': 'metadata',
-                        "conversation_id": conversation_id,
-                        'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(),
-                        'content': search_data
-                    }
-                ).encode('utf-8')
-                + b'\n'
-            )
+                messages = await database.get_messages(conversation_id, timeout=deadline.timeout())
+
+                async with database._get_connection(deadline.timeout()) as db_connection:
+                    deps = Deps(
+                        client=client,
+                        db_connection=db_connection,  # Use a connection from the pool
+                        language=language,  # Pass the language parameter to deps
+                        use_web_search=use_web_search,  # Pass the use_web_search parameter to deps
+                        artifacts=create_artifact_store(settings.ARTIFACT_STORE_BACKEND, turn_id),
+                        kb_prefetch=kb_prefetch,
+                        deadline=deadline
+                    )
+            
+                    # Tool calls are indexed as the run progresses, not rescanned afterwards
+                    tool_index = ToolCallIndex()
+                    chat_started = time.perf_counter()
+                    # Snapshots hold the full text so far, those arriving between frames are coalesced
+                    frames = FrameScheduler()
+                    result = None
+                    partial_text = None
+                    timed_out = False
+                    with capture_run_messages() as run_messages:
+                        try:
+                            async with AsyncExitStack() as run_stack:
+                                # Starting the run makes every model request and tool round trip before the
+                                # answer streams, the deadline bounds them together, not each request
+                                async with deadline.scope():
+                                    result = await run_stack.enter_async_context(get_agent('chat').run_stream(
+                                        prompt, deps=deps, message_history=messages, model_settings={'timeout': deadline.timeout()}
+                                    ))
+                                async for text in frames.paced(deadline.within(result.stream(debounce_by=0.01))):
+                                    tool_index.update(result.new_messages())
+                                    frame = model_frame(text, result.timestamp())
+                                    sent_at = time.perf_counter()
+                                    yield frame
+                                    frames.sent(len(frame), time.perf_counter() - sent_at)
+                                    partial_text = text
+                        except TimeoutError:
+                            # The answer so far is still stored and charged, only metadata and title are skipped
+                            logger.warning(f"Chat agent did not finish within the turn deadline, {len(partial_text or '')} characters streamed")
+                            timed_out = True
+                    frames.record()
+                    if result is not None:
+                        tool_index.update(result.new_messages())
+                        turn_usage.add('chat', result.usage())
+                    record_agent_run('chat', chat_started, result.usage() if result is not None else None)
+
+                    search_data = await collect_search_data(tool_index, deps.artifacts)
+                    if timed_out:
+                        metadata, title = {**DEFAULT_METADATA, 'error': 'deadline_exceeded'}, None
+                        new_messages_json = interrupted_turn_messages(
+                            run_messages, len(messages), prompt, partial_text,
+                            result.timestamp() if result is not None else datetime.datetime.now(datetime.timezone.utc)
+                        )
+                    else:
+                        # Early turns also need a title, which the combined agent returns in the same call
+                        metadata, title = await generate_metadata(result, deps, deadline, len(messages) < 3, turn_usage)
+                        new_messages_json = result.new_messages_json()
+                    search_data = {**(search_data or {}), **metadata}
 
-            if len(messages) < 3:
-                try:
-                    title_response = await title_agent.run(result.all_messages_json().decode('utf-8'), deps=deps)
-                    if title_response and title_response.data.title:
-                        # Update the conversation title in the database
-                        await database.update_conversation_title(conversation_id, title_response.data.title)
-                except Exception as e:
-                    print(f"Error generating title: {str(e)}")
+                    yield (
+                        json.dumps(
+                            {
+                                'role': 'metadata',
+                                "conversation_id": conversation_id,
+                                'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                                'content': search_data
+                            }
+                        ).encode('utf-8')
+                        + b'\n'
+                    )
 
-            await database.add_messages(result.new_messages_json(), conversation_id, search_data)
+                    if title:
+                        try:
+                            # Update the conversation title in the database
+                            await database.update_conversation_title(
+                                conversation_id, title,
+                                timeout=deadline.timeout(floor=settings.TURN_PERSIST_MIN_SECONDS)
+                            )
+                        except Exception as e:
+                            logger.warning(f"Error updating title: {str(e)}")
+
+                    # Persisting the turn is never skipped, it gets a minimum budget even past the deadline,
+                    # and completes even if the stream is cancelled by a shutdown
+                    turn_usage.record()
+                    await pending_writes.shielded(database.add_messages(
+                        new_messages_json, conversation_id, search_data,
+                        timeout=deadline.timeout(floor=settings.TURN_PERSIST_MIN_SECONDS),
+                        usage=turn_usage.as_dict()
+                    ))
+            
+            finally:
+                if kb_prefetch:
+                    kb_prefetch.finish()
+                if reservation:
+                    # Settled even when the turn failed or the client went away
+                    await pending_writes.shielded(reservation.settle(turn_usage.total_tokens))
             
-    return StreamingResponse(stream_messages(), media_type='text/plain')
+    # Opt-in (X-Stream-Compression: true): frames are compressed and flushed one by one
+    return streaming_response(stream_messages(), 'text/plain', accept_encoding, x_stream_compression)
 
 @router.get('/{user_id}/conversation_ids')
-async def get_conversation_ids(user_id: str, database: PgDatabase = Depends(get_db)) -> Response:
+async def get_conversation_ids(
+    user_id: str,
+    accept_encoding: Annotated[Optional[str], Header()] = None,
+    database: PgDatabase = Depends(get_db)
+) -> Response:
     conversations = await database.get_conversation_ids(user_id)
     # If a conversation has no title, generate a placeholder
     for conversation in conversations:
         if not conversation.get("title"):
             conversation["title"] = f"Conversation {conversation['id'][:5]}"
     
-    return Response(
-        json.dumps(conversations).encode('utf-8'),
-        media_type='application/json',
-    )
+    return json_response(conversations, accept_encoding)
     
 
 @router.get('/ui/app.html')
@@ -0,0 +1,42 @@
+from __future__ import annotations as _annotations
+
+from fastapi import APIRouter, Request
+
+from app.services.agents.tools.knowledge_base import KB_UPSTREAM
+from app.services.agents.tools.web_search import WEB_SEARCH_UPSTREAM
+from app.utils.redis_utils import redis_health
+
+router = APIRouter()
+
+
+@router.get('/')
+async def get_health(request: Request) -> dict:
+    """
+    Health of the service's dependencies: database pool, Redis and upstream circuit breakers.
+
+    Always answers 200 while the process serves requests. Redis and the upstreams
+    are optional (their features fail open), so an open breaker only makes the
+    status "degraded".
+    """
+    db = getattr(request.state, 'db', None)
+    database = {"connected": db is not None}
+    if db is not None:
+        database["pool"] = {
+            "size": db.pool.get_size(),
+            "idle": db.pool.get_idle_size(),
+            "max_size": db.pool.get_max_size(),
+        }
+    redis = redis_health()
+    upstreams = {upstream.name: upstream.breaker.health() for upstream in (KB_UPSTREAM, WEB_SEARCH_UPSTREAM)}
+
+    degraded = (
+        db is None
+        or (redis["configured"] and redis["state"] != "closed")
+        or any(breaker["state"] != "closed" for breaker in upstreams.values())
+    )
+    return {
+        "status": "degraded" if degraded else "ok",
+        "database": database,
+        "redis": redis,
+        "upstreams": upstreams,
+    }
@@ -0,0 +1,29 @@
+from typing import List, Optional
+from pydantic import BaseModel, Field
+
+
+class BatchItem(BaseModel):
+    id: Optional[str] = Field(
+        default=None,
+        description="Identifier of the item within the batch, defaults to its position"
+    )
+    prompt: str = Field(..., min_length=1)
+    language: Optional[str] = None
+    use_web_search: bool = False
+
+
+class BatchRequest(BaseModel):
+    batch_id: Optional[str] = Field(
+        default=None,
+        description="Resubmit with the id of an interrupted batch to resume it, a new id is generated when empty"
+    )
+    items: List[BatchItem] = Field(..., min_length=1)
+    concurrency: Optional[int] = Field(
+        default=None,
+        ge=1,
+        description="Items run at once, at most BATCH_MAX_CONCURRENCY"
+    )
+    include_metadata: bool = Field(
+        default=False,
+        description="Also generate follow-up questions and flags for every answer"
+    )
@@ -1,8 +1,11 @@
-from typing import TypedDict, Literal, Dict, Any, Optional, Union
-from dataclasses import dataclass
+from typing import TYPE_CHECKING, TypedDict, Literal, Dict, Any, Optional, Union
+from dataclasses import dataclass, field
 from asyncpg import Connection
 from httpx import AsyncClient
 
+from app.utils.artifact_store import ArtifactStore, InMemoryArtifactStore
+from app.utils.deadline import Deadline
+
 from pydantic_ai.messages import (
     ModelMessage,
     ModelRequest,
@@ -12,6 +15,9 @@
 )
 from pydantic_ai.exceptions import UnexpectedModelBehavior
 
+if TYPE_CHECKING:
+    from app.services.agents.tools.kb_prefetch import KnowledgeBasePrefetch
+
 
 @dataclass
 class Deps:
@@ -19,6 +25,9 @@ class Deps:
     db_connection: Connection
     language: Optional[str] = None
     use_web_search: bool = False
+    artifacts: ArtifactStore = field(default_factory=InMemoryArtifactStore)
+    kb_prefetch: Optional['KnowledgeBasePrefetch'] = None
+    deadline: Optional[Deadline] = None
 
 
 class ChatMessage(TypedDict):
@@ -1,30 +1,19 @@
 from typing import Optional, List, Tuple, Union
 import logfire
 from pydantic_ai import Agent, RunContext
-from pydantic_ai.models.openai import OpenAIModel
 from pydantic_ai.tools import ToolDefinition
 from httpx import AsyncClient
 
 # Import from root level core directory
 from app.models.chat import Deps
 from core.ai import get_llm_model
-from .prompts.chat_prompt import get_system_prompt
-from .tools.schema import WebSearchRequest, KnowledgeBaseRequest
+from .prompts.chat_prompt import get_system_prompt, get_time_context
+from .tools.schema import WebSearchRequest, KnowledgeBaseRequest, FederatedSearchRequest
 from .tools.web_search import web_search as perform_web_search
 from .tools.knowledge_base import query_knowledge_base as perform_knowledge_base_query
+from .tools.federated_search import federated_search as perform_federated_search
 
-# Initialize OpenAI components
-model = get_llm_model()
-
-# Create and export the agent
-chat_agent = Agent(
-    model,
-    system_prompt=get_system_prompt(),
-    deps_type=Deps,
-)
-
-# Add dynamic system prompt for multilingual support
-@chat_agent.system_prompt
+# Dynamic system prompt for multilingual support
 def add_language_instructions(ctx: RunContext[Deps]) -> str:
     instructions = []
     
@@ -51,6 +40,9 @@ def add_language_instructions(ctx: RunContext[Deps]) -> str:
     
     return "".join(instructions)
 
+def add_time_context() -> str:
+    return get_time_context()
+
 async def if_web_search_enabled(
     ctx: RunContext[Deps], tool_def: ToolDefinition
 ) -> Union[ToolDefinition, None]:
@@ -59,7 +51,6 @@ async def if_web_search_enabled(
         return None
     return tool_def
 
-@chat_agent.tool(prepare=if_web_search_enabled)
 async def knowledge_base_search(ctx: RunContext[Deps], request: KnowledgeBaseRequest) -> dict:
     """
     Query the knowledge base for information about alternative medicine.
@@ -93,7 +84,32 @@ async def knowledge_base_search(ctx: RunContext[Deps], request: KnowledgeBaseReq
     """
     return await perform_knowledge_base_query(ctx, request)
 
-@chat_agent.tool
+async def federated_search(ctx: RunContext[Deps], request: FederatedSearchRequest) -> dict:
+    """
+    Search several alternative medicine domains, and optionally the web, in a single call.
+    Prefer this over several knowledge_base_search or web_search calls when a question spans domains.
+    
+    Parameters:
+        request: The search request with structure:
+            {
+                "query": str,  # The search query to find information
+                "domains": list[str],  # The domains to search within (e.g., ["ayurveda", "siddha"])
+                "include_web_search": bool  # Also search the web (only when web search is enabled)
+            }
+    
+    Examples:
+        {
+            "query": "Herbal treatments for asthma",
+            "domains": ["ayurveda", "siddha"],
+            "include_web_search": false
+        }
+    
+    Returns:
+        The merged results of every domain, the web search answer when included,
+        and the domains that failed under "failed".
+    """
+    return await perform_federated_search(ctx, request)
+
 async def web_search(ctx: RunContext[Deps], request: WebSearchRequest) -> dict:
     """
     Search the web for relevant information about alternative medicine and health topics.
@@ -123,3 +139,20 @@ async def web_search(ctx: RunContext[Deps], request: WebSearchRequest) -> dict:
         }
     """
     return await perform_web_search(ctx, request)
+
+def build_chat_agent() -> Agent:
+    """Build the chat agent with its prompts and tools, called once by the agent registry."""
+    chat_agent = Agent(
+        get_llm_model("chat"),
+        system_prompt=get_system_prompt(),
+        deps_type=Deps,
+    )
+    chat_agent.system_prompt(add_language_instructions)
+    # Registered last so the static prompt and language instructions stay a stable,
+    # cacheable prefix; not dynamic, so the stored history (and with it the cached prefix)
+    # keeps the date its conversation started on instead of being re-rendered every turn
+    chat_agent.system_prompt(add_time_context)
+    chat_agent.tool(prepare=if_web_search_enabled)(knowledge_base_search)
+    chat_agent.tool(federated_search)
+    chat_agent.tool(web_search)
+    return chat_agent
@@ -4,18 +4,7 @@
 from app.services.agents.prompts.metadata_prompt import get_system_prompt
 from app.services.agents.tools.schema import MetadataResponse
 
-model = get_llm_model()
-
-metadata_agent = Agent(
-    model,
-    system_prompt=get_system_prompt(),
-    deps_type=Deps,
-    result_type=MetadataResponse,
-    result_retries=3
-) 
-
-# Add dynamic system prompt for multilingual support
-@metadata_agent.system_prompt
+# Dynamic system prompt for multilingual support
 def add_language_instructions(ctx: RunContext[Deps]) -> str:
     instructions = []
     
@@ -46,4 +35,17 @@ def add_language_instructions(ctx: RunContext[Deps]) -> str:
 - Make sure the follow-up questions encourage the user to explore more up-to-date information that might be available via web search.
 """)
     
-    return "".join(instructions) 
\ No newline at end of file
+    return "".join(instructions)
+
+
+def build_metadata_agent() -> Agent:
+    """Build the metadata agent, called once by the agent registry."""
+    metadata_agent = Agent(
+        get_llm_model("metadata"),
+        system_prompt=get_system_prompt(),
+        deps_type=Deps,
+        result_type=MetadataResponse,
+        result_retries=3
+    )
+    metadata_agent.system_prompt(add_language_instructions)
+    return metadata_agent
@@ -0,0 +1,23 @@
+from core.ai import get_llm_model
+from pydantic_ai import Agent
+from app.models.chat import Deps
+from app.services.agents.metadata_agent import add_language_instructions
+from app.services.agents.prompts.metadata_title_prompt import get_system_prompt
+from app.services.agents.tools.schema import MetadataTitleResponse
+
+
+def build_metadata_title_agent() -> Agent:
+    """
+    Build the agent returning metadata and the conversation title in one call,
+    used while the conversation still needs a title.
+    """
+    metadata_title_agent = Agent(
+        get_llm_model("metadata_title"),
+        system_prompt=get_system_prompt(),
+        deps_type=Deps,
+        result_type=MetadataTitleResponse,
+        result_retries=3
+    )
+    # Same multilingual and web search instructions as the metadata agent
+    metadata_title_agent.system_prompt(add_language_instructions)
+    return metadata_title_agent
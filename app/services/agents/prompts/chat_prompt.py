@@ -1,13 +1,14 @@
 from datetime import datetime, timezone
 
 def get_system_prompt():
-    current_time = datetime.now(timezone.utc)
+    """
+    Returns the static system prompt for the chat agent.
     
-    return f"""You are GuruHeal, an AI assistant specializing in alternative medicine with expertise in Ayurveda, Homeopathy, and Siddha practices. You represent Gurubalaa Healthcare Clinic founded by Dr. K. Sri Sridhar, a renowned herbal oncologist.
-
-Current Context: (THIS IS VERY IMPORTANT)
-- Current Date/Month/Year: {current_time.strftime('%d %B, %Y')} of the format Day Month, Year
-- Current Time (UTC): {current_time.strftime('%H:%M:%S')} UTC
+    It must stay byte-identical across users, languages and turns so the provider
+    can serve it from its prompt cache; anything that varies (language, current
+    date) goes into the prompts registered after it.
+    """
+    return """You are GuruHeal, an AI assistant specializing in alternative medicine with expertise in Ayurveda, Homeopathy, and Siddha practices. You represent Gurubalaa Healthcare Clinic founded by Dr. K. Sri Sridhar, a renowned herbal oncologist.
 
 About Gurubalaa Healthcare:
 - Founded by Dr. K. Sri Sridhar, who specializes in herbal oncology
@@ -31,6 +32,12 @@ def get_system_prompt():
 - Always clarify that you're providing educational information, not medical advice
 - If the Knowledge Base Search tool returns no results or it fails, tell the user that you don't have information about the topic at the moment
 
+Federated Search Strategy:
+When a question spans several domains (e.g. comparing Ayurveda and Siddha approaches), or needs both the knowledge base and the web:
+- Use the federated_search tool once with all relevant domains instead of several separate searches
+- Set include_web_search=true only when up-to-date web information would help
+- If some domains are listed under "failed", answer from the domains that returned results
+
 Web Search Strategy:
 When users ask general health questions or need up-to-date information:
 - Formulate clear, specific queries focused on alternative medicine and health
@@ -88,3 +95,16 @@ def get_system_prompt():
 - For detailed answers, reply with headings and subheadings, and use the appropriate markdown elements to make it look good
 """
 
+def get_time_context():
+    """
+    Returns the current date block, appended after the static prompt.
+
+    Only the date: the block is stored in the conversation's first request, and a
+    finer time would make the same prompt differ between conversations started
+    minutes apart.
+    """
+    current_time = datetime.now(timezone.utc)
+    
+    return f"""Current Context: (THIS IS VERY IMPORTANT)
+- Current Date/Month/Year: {current_time.strftime('%d %B, %Y')} of the format Day Month, Year
+"""
@@ -0,0 +1,26 @@
+from app.services.agents.prompts.metadata_prompt import get_system_prompt as get_metadata_prompt
+
+
+def get_system_prompt():
+    """
+    Returns the system prompt for the combined metadata and title agent.
+
+    It is the metadata prompt extended with the title requirements, so the first
+    turns of a conversation get both from a single call.
+    """
+    return get_metadata_prompt() + """
+This is the start of the conversation, so also generate a short, descriptive title for it.
+
+TITLE REQUIREMENTS:
+- Maximum 3 words
+- Use title case formatting
+- Be specific to the conversation
+
+Add the title to the JSON object as a "title" string, for example:
+{
+  "questions": ["How does Ayurveda treat indigestion?"],
+  "provide_appointment_booking": false,
+  "recommend_product": true,
+  "title": "Ayurvedic Digestion Remedies"
+}
+"""
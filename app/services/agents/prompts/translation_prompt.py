@@ -0,0 +1,11 @@
+def get_system_prompt():
+    """
+    Returns the system prompt for the query translation agent.
+    """
+    return """Translate the user's message into English so it can be used as a knowledge base search query
+
+REQUIREMENTS:
+- Keep medical terms, herb names and Ayurveda, Siddha or Homeopathy terminology accurate
+- Do not answer the message, only translate it
+- Return only the English translation
+"""
@@ -0,0 +1,48 @@
+import importlib
+import logging
+import time
+from typing import Dict, Iterable, Optional
+
+from pydantic_ai import Agent
+
+logger = logging.getLogger(__name__)
+
+# Agent name -> "module:factory"; modules are only imported when their agent is first built
+AGENT_FACTORIES: Dict[str, str] = {
+    "chat": "app.services.agents.chat_agent:build_chat_agent",
+    "metadata": "app.services.agents.metadata_agent:build_metadata_agent",
+    "metadata_title": "app.services.agents.metadata_title_agent:build_metadata_title_agent",
+    "translation": "app.services.agents.translation_agent:build_translation_agent",
+}
+
+_agents: Dict[str, Agent] = {}
+
+
+def get_agent(name: str) -> Agent:
+    """
+    Get an agent by name, building it on first use.
+
+    Agents (and the model clients behind them) are not built at import, so
+    importing the API does not need OPENAI_API_KEY and does not pay for the
+    OpenAI SDK; the lifespan builds them ahead of the first request.
+
+    Args:
+        name: Agent name, a key of AGENT_FACTORIES
+
+    Returns:
+        Agent: The shared agent instance
+    """
+    agent = _agents.get(name)
+    if agent is None:
+        module_name, factory_name = AGENT_FACTORIES[name].split(":")
+        started = time.perf_counter()
+        agent = getattr(importlib.import_module(module_name), factory_name)()
+        _agents[name] = agent
+        logger.info(f"Built agent '{name}' in {(time.perf_counter() - started) * 1000:.0f} ms")
+    return agent
+
+
+def build_agents(names: Optional[Iterable[str]] = None) -> None:
+    """Build the given agents (all of them by default) ahead of their first use."""
+    for name in names or AGENT_FACTORIES:
+        get_agent(name)
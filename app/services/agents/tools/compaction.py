@@ -0,0 +1,106 @@
+from typing import Any, Dict, List, Optional
+from app.utils.text_utils import estimate_tokens, jaccard, shingles, truncate_to_tokens
+from core.config import settings
+
+# Fields that carry the chunk text, in order of preference
+CONTENT_FIELDS = ("content", "text", "chunk", "page_content", "pageContent")
+# Fields that identify where a chunk came from, in order of preference
+SOURCE_FIELDS = ("title", "source", "file_path", "doc_title", "doc_id")
+SCORE_FIELDS = ("score", "relevance_score", "similarity")
+
+
+def extract_knowledge_results(response: Dict) -> List[Any]:
+    """Return the list of results from a knowledge base response, whatever its shape."""
+    if 'results' in response:
+        return response['results'] or []
+    if 'documents' in response:
+        return response['documents'] or []
+    if 'content' in response:
+        return [{"content": response['content']}]
+    return []
+
+
+def _first(item: Dict, fields: tuple) -> Optional[Any]:
+    for name in fields:
+        value = item.get(name)
+        if value not in (None, ""):
+            return value
+    return None
+
+
+def _compact_item(item: Any) -> Optional[Dict]:
+    if isinstance(item, str):
+        return {"content": item}
+    if not isinstance(item, dict):
+        return None
+    content = _first(item, CONTENT_FIELDS)
+    if not content:
+        return None
+    compact = {"content": str(content).strip()}
+    source = _first(item, SOURCE_FIELDS) or _first(item.get("metadata") or {}, SOURCE_FIELDS)
+    if source:
+        compact["source"] = source
+    if item.get("domain"):
+        compact["domain"] = item["domain"]
+    score = _first(item, SCORE_FIELDS)
+    if score is None and isinstance(item.get("distance"), (int, float)):
+        # Distances grow as relevance falls, so flip them to rank like scores
+        score = -item["distance"]
+    if isinstance(score, (int, float)):
+        compact["score"] = score
+    return compact
+
+
+def compact_knowledge_base_response(
+    response: Dict,
+    token_budget: int = settings.KB_COMPACT_TOKEN_BUDGET,
+    duplicate_threshold: float = settings.KB_COMPACT_DUPLICATE_THRESHOLD,
+) -> Dict:
+    """
+    Reduce a knowledge base response to what the model needs to answer.
+
+    Results are stripped to their text, source and score, near-identical chunks
+    (word 3-gram Jaccard at or above `duplicate_threshold`) are dropped, the rest
+    is ranked by score and cut to `token_budget` estimated tokens. Error responses
+    are returned unchanged.
+
+    Args:
+        response: Full JSON response from the knowledge base service
+        token_budget: Maximum estimated tokens of chunk text to keep
+        duplicate_threshold: Similarity above which two chunks count as duplicates
+
+    Returns:
+        {"results": [{"content": str, "source": ..., "score": ...}], "omitted": int}
+    """
+    if "error" in response:
+        return response
+
+    items = [c for c in (_compact_item(item) for item in extract_knowledge_results(response)) if c]
+
+    # Stable sort keeps the service order for results without scores
+    if any("score" in item for item in items):
+        items.sort(key=lambda item: item.get("score", float("-inf")), reverse=True)
+
+    kept: List[Dict] = []
+    kept_shingles = []
+    used_tokens = 0
+    for item in items:
+        item_shingles = shingles(item["content"])
+        if any(jaccard(item_shingles, other) >= duplicate_threshold for other in kept_shingles):
+            continue
+
+        remaining = token_budget - used_tokens
+        if remaining <= 0:
+            break
+        if estimate_tokens(item["content"]) > remaining:
+            # Only trim the last chunk if a meaningful part of it still fits
+            if remaining < 50:
+                break
+            item["content"] = truncate_to_tokens(item["content"], remaining)
+
+        item.pop("score", None)
+        kept.append(item)
+        kept_shingles.append(item_shingles)
+        used_tokens += estimate_tokens(item["content"])
+
+    return {"results": kept, "omitted": len(items) - len(kept)}
@@ -0,0 +1,88 @@
+import asyncio
+from typing import Dict, List
+import logfire
+from pydantic_ai import RunContext
+from app.models.chat import Deps
+from core.config import settings
+from .compaction import compact_knowledge_base_response, extract_knowledge_results
+from .knowledge_base import search_knowledge_base
+from .schema import FederatedSearchRequest, KnowledgeBaseRequest
+from .web_search import cached_web_search
+
+WEB_BRANCH = "web"
+
+async def federated_search(ctx: RunContext[Deps], request: FederatedSearchRequest) -> Dict:
+    """
+    Search several knowledge base domains, and optionally the web, concurrently.
+
+    Every branch runs under the same deadline (FEDERATED_SEARCH_DEADLINE, or less
+    when the turn has less time left); branches that fail or miss it are
+    reported by name instead of failing the whole search. Knowledge base results of
+    all domains are merged, deduplicated and trimmed to one token budget.
+
+    Args:
+        ctx: Run context with dependencies
+        request: Query, domains and whether to include web search
+
+    Returns:
+        {
+            "results": [{"content": str, "source": ..., "domain": str}],
+            "web_search": str,  # only when web search was included and succeeded
+            "omitted": int,
+            "failed": {branch: error}  # only when a branch failed
+        }
+    """
+    with logfire.span('Federated Search', params=request.model_dump()) as span:
+        domains = list(dict.fromkeys(domain.lower() for domain in request.domains))
+        branches = {
+            domain: asyncio.create_task(
+                search_knowledge_base(ctx.deps.client, KnowledgeBaseRequest(query=request.query, domain=domain))
+            )
+            for domain in domains
+        }
+        if request.include_web_search and ctx.deps.use_web_search:
+            branches[WEB_BRANCH] = asyncio.create_task(cached_web_search(request.query))
+
+        deadline = settings.FEDERATED_SEARCH_DEADLINE
+        if ctx.deps.deadline is not None:
+            deadline = ctx.deps.deadline.timeout(cap=deadline)
+        done, pending = await asyncio.wait(branches.values(), timeout=deadline)
+        for task in pending:
+            task.cancel()
+
+        merged: List[Dict] = []
+        failed: Dict[str, str] = {}
+        web_message = None
+        for name, task in branches.items():
+            if task in pending:
+                failed[name] = "deadline_exceeded"
+                continue
+            if task.exception() is not None:
+                failed[name] = f"query_error: {task.exception()}"
+                continue
+            response = task.result()
+            if "error" in response:
+                failed[name] = response["error"]
+                continue
+
+            if name == WEB_BRANCH:
+                web_message = response["message"]
+                if response["sources"]:
+                    await ctx.deps.artifacts.add("web_search_sources", response["sources"], source=f"{ctx.tool_name}:{ctx.run_step}")
+            else:
+                await ctx.deps.artifacts.add("knowledge_base_results", response, source=f"{ctx.tool_name}:{ctx.run_step}")
+                merged.extend(
+                    {**item, "domain": name} if isinstance(item, dict) else {"content": item, "domain": name}
+                    for item in extract_knowledge_results(response)
+                )
+
+        if failed:
+            span.set_attribute('failed_branches', failed)
+            logfire.warning("Federated search branches failed", failed=failed)
+
+        result = compact_knowledge_base_response({"results": merged})
+        if web_message is not None:
+            result["web_search"] = web_message
+        if failed:
+            result["failed"] = failed
+        return result
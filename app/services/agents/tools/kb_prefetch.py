@@ -0,0 +1,131 @@
+import asyncio
+import re
+import time
+from typing import Dict, Optional
+import logfire
+from httpx import AsyncClient
+from app.services.agents.registry import get_agent
+from core.ai import record_agent_run
+from core.config import settings
+from core.metrics import KB_PREFETCH_OUTCOMES, KB_PREFETCH_SAVED_SECONDS
+from .schema import KnowledgeBaseRequest
+from .knowledge_base import search_knowledge_base
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def query_similarity(a: str, b: str) -> float:
+    """Jaccard similarity of the word sets of two queries."""
+    tokens_a = set(_TOKEN_RE.findall(a.lower()))
+    tokens_b = set(_TOKEN_RE.findall(b.lower()))
+    if not tokens_a or not tokens_b:
+        return 0.0
+    return len(tokens_a & tokens_b) / len(tokens_a | tokens_b)
+
+
+class KnowledgeBasePrefetch:
+    """
+    Speculative knowledge base query started at the beginning of a turn.
+
+    The query for the raw user prompt (translated to English first when the turn
+    is in another language) runs alongside history loading and the first model
+    call. When the model then calls `knowledge_base_search` with a query close to
+    the prompt, the tool takes the prefetched result instead of starting its own
+    request. Each prefetch is used at most once per turn.
+    """
+
+    def __init__(
+        self,
+        prompt: str,
+        language: Optional[str] = None,
+        domain: str = settings.KB_PREFETCH_DOMAIN,
+        min_similarity: float = settings.KB_PREFETCH_MIN_SIMILARITY,
+    ):
+        self.prompt = prompt
+        self.language = language
+        self.domain = domain
+        self.min_similarity = min_similarity
+        self.query: Optional[str] = None
+
+        self._task: Optional[asyncio.Task] = None
+        self._query_ready = asyncio.Event()
+        self._started_at = 0.0
+        self._duration = 0.0
+        self._claim_attempted = False
+        self._claimed = False
+
+    def start(self, client: AsyncClient) -> None:
+        self._started_at = time.perf_counter()
+        self._task = asyncio.create_task(self._run(client))
+
+    async def _run(self, client: AsyncClient) -> Dict:
+        try:
+            query = self.prompt
+            if self.language and self.language.lower() != 'en':
+                translation_started = time.perf_counter()
+                translation = await get_agent("translation").run(self.prompt)
+                record_agent_run("translation", translation_started, translation.usage())
+                query = translation.data
+            self.query = query
+        finally:
+            self._query_ready.set()
+
+        result = await search_knowledge_base(client, KnowledgeBaseRequest(query=self.query, domain=self.domain))
+        self._duration = time.perf_counter() - self._started_at
+        return result
+
+    async def claim(self, request: KnowledgeBaseRequest) -> Optional[Dict]:
+        """
+        Return the prefetched result if it answers this tool call, otherwise None.
+
+        Args:
+            request: The knowledge base request issued by the model
+
+        Returns:
+            Optional[Dict]: The prefetched response, or None when the caller should
+            query the knowledge base itself
+        """
+        if self._task is None or self._claimed or request.domain.lower() != self.domain:
+            return None
+
+        # Claimed before the first await, so parallel tool calls in one model step
+        # cannot both take the result; released again if the query does not match
+        self._claimed = True
+        self._claim_attempted = True
+        arrived_at = time.perf_counter()
+        await self._query_ready.wait()
+        if self.query is None or query_similarity(request.query, self.query) < self.min_similarity:
+            self._claimed = False
+            return None
+
+        try:
+            result = await self._task
+        except Exception as e:
+            KB_PREFETCH_OUTCOMES.labels("failed").inc()
+            logfire.warning("Knowledge base prefetch failed", error=str(e))
+            return None
+        if "error" in result:
+            KB_PREFETCH_OUTCOMES.labels("failed").inc()
+            return None
+
+        waited = time.perf_counter() - arrived_at
+        saved = max(0.0, self._duration - waited)
+        KB_PREFETCH_OUTCOMES.labels("hit").inc()
+        KB_PREFETCH_SAVED_SECONDS.observe(saved)
+        logfire.info("Knowledge base prefetch hit",
+            prefetch_query=self.query,
+            tool_query=request.query,
+            saved_ms=round(saved * 1000, 1)
+        )
+        return result
+
+    def finish(self) -> None:
+        """Record the outcome of an unclaimed prefetch and cancel it if it is still running."""
+        if self._task is None or self._claimed:
+            return
+        KB_PREFETCH_OUTCOMES.labels("miss" if self._claim_attempted else "unused").inc()
+        if not self._task.done():
+            self._task.cancel()
+        elif not self._task.cancelled():
+            # Retrieve the exception, if any, so it is not reported as never retrieved
+            self._task.exception()
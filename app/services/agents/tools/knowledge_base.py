@@ -1,11 +1,20 @@
+import asyncio
 import logfire
-from typing import Dict
+from typing import TYPE_CHECKING, Dict, Optional
 from pydantic_ai import RunContext
 from app.models.chat import Deps
 from .schema import KnowledgeBaseRequest
 import os
 import traceback
-from httpx import ConnectError, ReadTimeout, HTTPStatusError
+from httpx import AsyncClient, ConnectError, ReadTimeout, HTTPStatusError
+from .compaction import compact_knowledge_base_response
+from app.utils.deadline import remaining_budget
+from app.utils.resilience import CircuitOpenError, ResilientUpstream
+from app.utils.result_cache import ResultCache, fingerprint, normalize_query
+from core.config import settings
+
+if TYPE_CHECKING:
+    from app.services.retrieval.index import LocalIndex
 
 KNOWLEDGE_BASE_URL = os.getenv("RAG_URL")
 
@@ -15,18 +24,128 @@
     # More domains can be added later
 }
 
+# Remote errors the embedded index may answer for in "fallback" mode
+FALLBACK_ERRORS = {"circuit_open", "config_error", "query_failed", "connection_error", "timeout_error", "http_status_error", "http_error", "query_error"}
+
+# Hedging, circuit breaking and adaptive timeouts for the remote service
+KB_UPSTREAM = ResilientUpstream("knowledge_base")
+
+# Embedded hybrid index, loaded on first use from KB_LOCAL_INDEX_PATH
+_local_index: Optional['LocalIndex'] = None
+_local_index_loaded = False
+
+# Cache of successful knowledge base responses, shared across users
+KB_RESULT_CACHE = ResultCache(
+    "knowledge_base",
+    maxsize=settings.KB_CACHE_MAXSIZE,
+    ttl=settings.KB_CACHE_TTL,
+    use_redis=settings.KB_CACHE_REDIS_ENABLED
+)
+
 async def query_knowledge_base(ctx: RunContext[Deps], request: KnowledgeBaseRequest) -> Dict:
     """
-    Query the knowledge base with domain-specific filtering.
+    Query the knowledge base for a tool call, using the turn's speculative prefetch when it matches.
+    
+    The full response is kept in the turn's artifact store for the UI; the model
+    only receives the compacted results.
     
     Args:
         ctx: Run context with dependencies
         request: Search parameters with query string and domain
         
+    Returns:
+        Compacted knowledge base response, or the error dict from `search_knowledge_base`
+    """
+    response = None
+    if ctx.deps.kb_prefetch:
+        response = await ctx.deps.kb_prefetch.claim(request)
+    if response is None:
+        response = await search_knowledge_base(ctx.deps.client, request)
+    if "error" in response:
+        return response
+    
+    await ctx.deps.artifacts.add("knowledge_base_results", response, source=f"{ctx.tool_name}:{ctx.run_step}")
+    return compact_knowledge_base_response(response)
+
+async def search_knowledge_base(client: AsyncClient, request: KnowledgeBaseRequest) -> Dict:
+    """
+    Query the knowledge base through the configured backends.
+    
+    With KB_LOCAL_MODE "primary" the embedded index answers first and the remote
+    service is only used when it has no results for the domain. With "fallback" the
+    remote service answers first and the embedded index covers its failures.
+    
+    Args:
+        client: HTTP client used for remote requests
+        request: Search parameters with query string and domain
+        
+    Returns:
+        The response of the backend that answered, see `search_remote_knowledge_base`
+    """
+    if settings.KB_LOCAL_MODE == "primary":
+        local_response = search_local_knowledge_base(request)
+        if local_response:
+            return local_response
+    
+    response = await search_remote_knowledge_base(client, request)
+    
+    if settings.KB_LOCAL_MODE == "fallback" and response.get("error") in FALLBACK_ERRORS:
+        local_response = search_local_knowledge_base(request)
+        if local_response:
+            logfire.warning("Knowledge base answered from local index", remote_error=response["error"])
+            return local_response
+    return response
+
+def get_local_index() -> Optional['LocalIndex']:
+    """Load the embedded index once, None when it is not configured or fails to load."""
+    global _local_index, _local_index_loaded
+    if not _local_index_loaded:
+        _local_index_loaded = True
+        if settings.KB_LOCAL_INDEX_PATH:
+            try:
+                # Imported here so NumPy is only loaded when the embedded index is configured
+                from app.services.retrieval.index import LocalIndex
+                _local_index = LocalIndex(settings.KB_LOCAL_INDEX_PATH)
+                logfire.info("Loaded local knowledge base index",
+                    path=settings.KB_LOCAL_INDEX_PATH,
+                    chunks=len(_local_index)
+                )
+            except Exception as e:
+                logfire.error("Failed to load local knowledge base index",
+                    path=settings.KB_LOCAL_INDEX_PATH,
+                    error=str(e)
+                )
+    return _local_index
+
+def search_local_knowledge_base(request: KnowledgeBaseRequest) -> Optional[Dict]:
+    """
+    Query the embedded hybrid index.
+    
+    Returns:
+        Optional[Dict]: {"results": [...], "backend": "local"}, or None when the index
+        is unavailable or has nothing for the domain
+    """
+    index = get_local_index()
+    if index is None:
+        return None
+    with logfire.span('Local Knowledge Base Query', params=request.model_dump()):
+        results = index.search(request.query, domain=request.domain.lower(), top_k=10)
+    if not results:
+        return None
+    return {"results": results, "backend": "local"}
+
+async def search_remote_knowledge_base(client: AsyncClient, request: KnowledgeBaseRequest) -> Dict:
+    """
+    Query the remote knowledge base service with domain-specific filtering.
+    
+    Args:
+        client: HTTP client used for the request
+        request: Search parameters with query string and domain
+        
     Returns:
         Success response: JSON response from knowledge base service
         Error response: {
-            "error": "domain_not_found" | "query_failed" | "query_error",
+            "error": "domain_not_found" | "query_failed" | "circuit_open" | "timeout_error" | "deadline_exceeded" | "query_error",
             "message": str
         }
     """
@@ -63,6 +182,25 @@ async def query_knowledge_base(ctx: RunContext[Deps], request: KnowledgeBaseRequ
                     "message": "Knowledge base URL (RAG_URL) is not configured"
                 }
             
+            # Invalidate cached results whenever the document set changes
+            KB_RESULT_CACHE.set_version(fingerprint(DOMAIN_TO_ID_MAP))
+            cache_key = KB_RESULT_CACHE.make_key(
+                normalize_query(request.query), sorted(ids), query_body["mode"], query_body["top_k"]
+            )
+            cached_response = await KB_RESULT_CACHE.get(cache_key)
+            if cached_response is not None:
+                span.set_attribute('cache_hit', True)
+                return cached_response
+            
+            # Never wait longer than what is left of the turn
+            budget = remaining_budget()
+            if budget is not None and budget <= 0:
+                span.set_status('error', "Turn deadline exceeded")
+                return {
+                    "error": "deadline_exceeded",
+                    "message": "No time left in this turn to query the knowledge base"
+                }
+            
             logfire.info("Making knowledge base request", 
                 query=request.query,
                 domain=domain,
@@ -71,24 +209,29 @@ async def query_knowledge_base(ctx: RunContext[Deps], request: KnowledgeBaseRequ
             )
             
             try:
-                response = await ctx.deps.client.post(
-                    KNOWLEDGE_BASE_URL,
-                    json=query_body,
-                    timeout=30.0  # Add explicit timeout
+                timeout = KB_UPSTREAM.timeout() if budget is None else min(budget, KB_UPSTREAM.timeout())
+                response = await KB_UPSTREAM.call(
+                    lambda attempt_timeout: client.post(
+                        KNOWLEDGE_BASE_URL,
+                        json=query_body,
+                        timeout=attempt_timeout
+                    ),
+                    is_failure=lambda r: r.status_code >= 500,
+                    timeout=budget
                 )
                 
                 logfire.info("Received knowledge base response",
                     status_code=response.status_code,
-                    response_headers=dict(response.headers),
                     response_size=len(response.content)
                 )
                 
                 if response.status_code == 200:
                     response_json = response.json()
-                    logfire.info("Parsed knowledge base response",
+                    logfire.debug("Parsed knowledge base response",
                         response_keys=list(response_json.keys())
                     )
                     
+                    await KB_RESULT_CACHE.set(cache_key, response_json)
                     return response_json
                 else:
                     error_detail = ""
@@ -108,6 +251,17 @@ async def query_knowledge_base(ctx: RunContext[Deps], request: KnowledgeBaseRequ
                         "message": f"Knowledge base query failed with status code: {response.status_code}. Details: {error_detail}"
                     }
             
+            except CircuitOpenError as coe:
+                span.set_status('error', str(coe))
+                logfire.warning("Knowledge base circuit open, failing fast",
+                    url=KNOWLEDGE_BASE_URL,
+                    breaker=KB_UPSTREAM.breaker.health()
+                )
+                return {
+                    "error": "circuit_open",
+                    "message": f"Knowledge base is temporarily unavailable after repeated failures: {str(coe)}"
+                }
+            
             except ConnectError as ce:
                 span.set_status('error', str(ce))
                 logfire.error("Knowledge base connection error",
@@ -122,17 +276,17 @@ async def query_knowledge_base(ctx: RunContext[Deps], request: KnowledgeBaseRequ
                     "message": f"Failed to connect to knowledge base at {KNOWLEDGE_BASE_URL}: {str(ce)}"
                 }
                 
-            except ReadTimeout as rt:
+            except (ReadTimeout, asyncio.TimeoutError) as rt:
                 span.set_status('error', str(rt))
                 logfire.error("Knowledge base request timeout",
                     error=str(rt),
-                    error_type="ReadTimeout",
-                    timeout=30.0,
+                    error_type=type(rt).__name__,
+                    timeout=timeout,
                     url=KNOWLEDGE_BASE_URL
                 )
                 return {
                     "error": "timeout_error",
-                    "message": f"Knowledge base request timed out after 30 seconds: {str(rt)}"
+                    "message": f"Knowledge base request timed out after {timeout:.1f} seconds: {str(rt)}"
                 }
                 
             except HTTPStatusError as hse:
@@ -28,6 +28,35 @@ class Config:
             ]
         }
 
+class FederatedSearchRequest(BaseModel):
+    """
+    Request parameters for searching several knowledge base domains, and optionally the web, at once.
+    """
+    query: str = Field(
+        ...,
+        description="The search query to find relevant information"
+    )
+    domains: List[str] = Field(
+        ...,
+        description="The domains to search within (e.g., ['ayurveda', 'siddha'])",
+        min_length=1
+    )
+    include_web_search: bool = Field(
+        default=False,
+        description="Also search the web, only honoured when the user enabled web search"
+    )
+    
+    class Config:
+        json_schema_extra = {
+            "examples": [
+                {
+                    "query": "Herbal treatments for asthma",
+                    "domains": ["ayurveda", "siddha"],
+                    "include_web_search": False
+                }
+            ]
+        }
+
 class WebSearchRequest(BaseModel):
     query: str = Field(
         ...,
@@ -49,9 +78,9 @@ class MetadataResponse(BaseModel):
         default=False
     )
 
-class TitleResponse(BaseModel):
-    """Response with a generated title for the conversation"""
+class MetadataTitleResponse(MetadataResponse):
+    """Metadata response that also carries the conversation title, for the first turns"""
     title: str = Field(
         description="A short, descriptive title for the conversation (1-3 words)",
         max_length=50
-    )
\ No newline at end of file
+    )
@@ -1,121 +1,217 @@
+import asyncio
+import time
+import traceback
 from typing import Dict
 import logfire
 from pydantic_ai import RunContext
 from httpx import AsyncClient, HTTPError
 from app.models.chat import Deps
+from app.utils.cassette import get_cassette_transport
+from app.utils.deadline import remaining_budget
+from app.utils.resilience import CircuitOpenError, ResilientUpstream
+from app.utils.result_cache import ResultCache, normalize_query
+from app.utils.single_flight import SingleFlight
+from core.config import settings
 from .schema import WebSearchRequest
-from core.middleware import correlation_id_ctx_var
-from app.utils.redis_utils import store_web_search_sources
 
-async def web_search(ctx: RunContext[Deps], request: WebSearchRequest) -> Dict:
+WEB_SEARCH_URL = "http://searchengine.vesselmatch.com:3001/api/search"
+
+# Completed searches are served fresh for WEB_SEARCH_CACHE_TTL seconds, then served
+# stale while a background refresh runs, until WEB_SEARCH_CACHE_STALE_TTL expires them
+WEB_SEARCH_CACHE = ResultCache(
+    "web_search",
+    maxsize=settings.WEB_SEARCH_CACHE_MAXSIZE,
+    ttl=settings.WEB_SEARCH_CACHE_STALE_TTL,
+    use_redis=settings.WEB_SEARCH_CACHE_REDIS_ENABLED
+)
+
+# Hedging, circuit breaking and adaptive timeouts for the search engine
+WEB_SEARCH_UPSTREAM = ResilientUpstream("web_search")
+
+# Concurrent identical queries share one upstream request
+_web_search_flight = SingleFlight("web_search")
+
+async def fetch_web_search(query: str) -> Dict:
     """
-    Search the web for relevant information using a specialized search service.
-    
+    Call the search engine and cache the result when it succeeds.
+
     Args:
-        ctx: The context containing the HTTP client
-        request: Search parameters with query string
-        
+        query: The search query
+
     Returns:
-        Success response: JSON response from search service
+        Success response: {"message": str, "sources": list}
         Error response: {
-            "error": "search_failed" | "search_error",
+            "error": "search_failed" | "circuit_open" | "timeout_error" | "http_error",
             "message": str
         }
     """
-    with logfire.span('Web Search', params=request.model_dump()) as span:
-        try:
-            search_body = {
-                "chatModel": {
-                    "provider": "custom_openai",
-                    "model": "meta-llama/llama-3.3-70b-instruct:free"
-                },
-                "embeddingModel": {
-                    "provider": "openai",
-                    "model": "text-embedding-3-large"
-                },
-                "optimizationMode": "speed",
-                "focusMode": "webSearch",
-                "query": request.query,
-                "history": []
-            }
-            
-            logfire.info("Making web search request", 
-                query=request.query,
-                url="http://searchengine.vesselmatch.com:3001/api/search"
-            )
-            
-            async with AsyncClient() as client:
-                try:
-                    response = await client.post(
-                        "http://searchengine.vesselmatch.com:3001/api/search",
+    with logfire.span('Web Search Upstream', query=query) as span:
+        search_body = {
+            "chatModel": {
+                "provider": "custom_openai",
+                "model": "meta-llama/llama-3.3-70b-instruct:free"
+            },
+            "embeddingModel": {
+                "provider": "openai",
+                "model": "text-embedding-3-large"
+            },
+            "optimizationMode": "speed",
+            "focusMode": "webSearch",
+            "query": query,
+            "history": []
+        }
+
+        logfire.info("Making web search request",
+            query=query,
+            url=WEB_SEARCH_URL
+        )
+
+        async with AsyncClient(transport=get_cassette_transport()) as client:
+            try:
+                response = await WEB_SEARCH_UPSTREAM.call(
+                    lambda attempt_timeout: client.post(
+                        WEB_SEARCH_URL,
                         json=search_body,
-                        timeout=30.0  # Add explicit timeout
+                        timeout=attempt_timeout
+                    ),
+                    is_failure=lambda r: r.status_code >= 500
+                )
+
+                logfire.info("Received web search response",
+                    status_code=response.status_code,
+                    response_size=len(response.content)
+                )
+
+                if response.status_code == 200:
+                    response_json = response.json()
+                    logfire.debug("Parsed web search response",
+                        response_keys=list(response_json.keys())
                     )
-                    
-                    logfire.info("Received web search response",
+
+                    result = {
+                        "message": response_json.get("message", ""),
+                        "sources": response_json.get("sources", [])
+                    }
+                    await WEB_SEARCH_CACHE.set(normalize_query(query), {"fetched_at": time.time(), "result": result})
+                    return result
+                else:
+                    error_detail = ""
+                    try:
+                        error_detail = response.json()
+                    except:
+                        error_detail = response.text[:200]  # First 200 chars of response
+
+                    span.set_status('error', f"Search failed with status {response.status_code}")
+                    logfire.error("Web search request failed",
                         status_code=response.status_code,
-                        response_headers=dict(response.headers),
-                        response_size=len(response.content)
-                    )
-                    
-                    if response.status_code == 200:
-                        response_json = response.json()
-                        logfire.info("Parsed web search response",
-                            response_keys=list(response_json.keys())
-                        )
-                        
-                        # Extract message and sources
-                        message = response_json.get("message", "")
-                        sources = response_json.get("sources", [])
-                        
-                        # Store sources in Redis using correlation ID
-                        correlation_id = correlation_id_ctx_var.get()
-                        if sources and correlation_id:
-                            await store_web_search_sources(correlation_id, sources)
-                            logfire.info("Stored web search sources in Redis", 
-                                correlation_id=correlation_id,
-                                sources_count=len(sources)
-                            )
-                        elif not correlation_id:
-                            logfire.warning("No correlation ID available, cannot store web search sources")
-                        
-                        # Return only the message part to agent
-                        return {"message": message}
-                    else:
-                        error_detail = ""
-                        try:
-                            error_detail = response.json()
-                        except:
-                            error_detail = response.text[:200]  # First 200 chars of response
-                            
-                        span.set_status('error', f"Search failed with status {response.status_code}")
-                        logfire.error("Web search request failed",
-                            status_code=response.status_code,
-                            error_detail=error_detail,
-                            response_headers=dict(response.headers)
-                        )
-                        return {
-                            "error": "search_failed",
-                            "message": f"Web search failed with status code: {response.status_code}. Details: {error_detail}"
-                        }
-                        
-                except HTTPError as he:
-                    span.set_status('error', str(he))
-                    logfire.error("HTTP error during web search",
-                        error=str(he),
-                        error_type=type(he).__name__
+                        error_detail=error_detail,
+                        response_headers=dict(response.headers)
                     )
                     return {
-                        "error": "http_error",
-                        "message": f"HTTP error during web search: {str(he)}"
+                        "error": "search_failed",
+                        "message": f"Web search failed with status code: {response.status_code}. Details: {error_detail}"
                     }
-                    
+
+            except CircuitOpenError as coe:
+                span.set_status('error', str(coe))
+                logfire.warning("Web search circuit open, failing fast",
+                    breaker=WEB_SEARCH_UPSTREAM.breaker.health()
+                )
+                return {
+                    "error": "circuit_open",
+                    "message": f"Web search is temporarily unavailable after repeated failures: {str(coe)}"
+                }
+
+            except asyncio.TimeoutError as te:
+                span.set_status('error', str(te))
+                logfire.error("Web search request timeout",
+                    error=str(te)
+                )
+                return {
+                    "error": "timeout_error",
+                    "message": f"Web search timed out: {str(te)}"
+                }
+
+            except HTTPError as he:
+                span.set_status('error', str(he))
+                logfire.error("HTTP error during web search",
+                    error=str(he),
+                    error_type=type(he).__name__
+                )
+                return {
+                    "error": "http_error",
+                    "message": f"HTTP error during web search: {str(he)}"
+                }
+
+async def cached_web_search(query: str) -> Dict:
+    """
+    Answer a web search from the cache, deduplicating concurrent upstream calls.
+
+    Fresh entries are returned directly. Stale entries are returned immediately while
+    a single background refresh updates the cache, so popular queries never wait on
+    the upstream. Misses join (or start) the in-flight upstream call for the query,
+    waiting at most for the remaining turn budget.
+    """
+    key = normalize_query(query)
+    cached = await WEB_SEARCH_CACHE.get(key)
+    if cached is not None:
+        if time.time() - cached["fetched_at"] >= settings.WEB_SEARCH_CACHE_TTL:
+            _web_search_flight.do_in_background(key, lambda: fetch_web_search(query))
+        return cached["result"]
+
+    # The upstream call is shared, so only this caller's wait is bounded by its turn deadline
+    budget = remaining_budget()
+    if budget is None:
+        return await _web_search_flight.do(key, lambda: fetch_web_search(query))
+    try:
+        if budget <= 0:
+            raise asyncio.TimeoutError()
+        return await asyncio.wait_for(_web_search_flight.do(key, lambda: fetch_web_search(query)), budget)
+    except asyncio.TimeoutError:
+        return {
+            "error": "deadline_exceeded",
+            "message": "No time left in this turn to wait for web search"
+        }
+
+async def web_search(ctx: RunContext[Deps], request: WebSearchRequest) -> Dict:
+    """
+    Search the web for relevant information using a specialized search service.
+
+    Args:
+        ctx: The context containing the request dependencies
+        request: Search parameters with query string
+
+    Returns:
+        Success response: {"message": str}, sources are kept in the artifact store
+        Error response: {
+            "error": "search_failed" | "circuit_open" | "timeout_error" | "deadline_exceeded" | "http_error" | "search_error",
+            "message": str
+        }
+    """
+    with logfire.span('Web Search', params=request.model_dump()) as span:
+        try:
+            result = await cached_web_search(request.query)
+            if "error" in result:
+                span.set_status('error', result["message"])
+                return result
+
+            # Keep sources for the client; only the message goes to the agent
+            sources = result["sources"]
+            if sources:
+                await ctx.deps.artifacts.add("web_search_sources", sources, source=f"{ctx.tool_name}:{ctx.run_step}")
+                logfire.info("Stored web search sources in artifact store",
+                    sources_count=len(sources)
+                )
+
+            # Return only the message part to agent
+            return {"message": result["message"]}
+
         except Exception as e:
             span.set_status('error', str(e))
-            logfire.error("Web search failed", 
+            logfire.error("Web search failed",
                 error=str(e),
                 error_type=type(e).__name__,
-                error_traceback=logfire.format_exc(),
+                error_traceback=traceback.format_exc(),
                 params=request.model_dump()
             )
             return {
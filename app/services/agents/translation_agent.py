@@ -0,0 +1,13 @@
+from core.ai import get_llm_model
+from pydantic_ai import Agent
+from app.services.agents.prompts.translation_prompt import get_system_prompt
+
+
+def build_translation_agent() -> Agent:
+    """Build the translation agent, called once by the agent registry."""
+    return Agent(
+        get_llm_model("translation"),
+        system_prompt=get_system_prompt(),
+        result_type=str
+    )
+
@@ -0,0 +1,151 @@
+import asyncio
+import time
+import uuid
+from typing import AsyncIterator, Dict, List, Tuple
+
+import logfire
+from httpx import AsyncClient
+
+from app.models.batch import BatchItem, BatchRequest
+from app.models.chat import Deps
+from app.services.agents.registry import get_agent
+from app.services.chat_pipeline import collect_search_data, generate_metadata
+from app.utils.cassette import get_cassette_transport
+from app.utils.deadline import Deadline
+from app.utils.redis_utils import hgetall_json, hset_json
+from app.utils.search_data import ToolCallIndex
+from app.utils.usage import TurnUsage
+from core.ai import record_agent_run
+from core.config import settings
+from core.context_var import turn_deadline_ctx_var
+from core.metrics import BATCH_ITEMS
+
+
+def new_batch_id() -> str:
+    return uuid.uuid4().hex
+
+
+def batch_results_key(batch_id: str) -> str:
+    return f"batch:{batch_id}:results"
+
+
+def item_ids(batch: BatchRequest) -> List[Tuple[str, BatchItem]]:
+    """Items with their ids, defaulting to their position in the batch."""
+    return [(item.id or str(position), item) for position, item in enumerate(batch.items)]
+
+
+async def run_batch_item(client: AsyncClient, item_id: str, item: BatchItem, include_metadata: bool = False) -> Dict:
+    """
+    Run one prompt through the chat pipeline, without conversation history or persistence.
+
+    Args:
+        client: HTTP client for the tools
+        item_id: Identifier of the item within its batch
+        item: The prompt and its options
+        include_metadata: Also run the metadata agent on the answer
+
+    Returns:
+        Dict: The answer, its search data and token usage
+    """
+    started = time.perf_counter()
+    deadline = Deadline.after(settings.TURN_DEADLINE_SECONDS)
+    turn_deadline_ctx_var.set(deadline)
+    deps = Deps(
+        client=client,
+        db_connection=None,  # Batch items are not stored as conversations
+        language=item.language,
+        use_web_search=item.use_web_search,
+        deadline=deadline
+    )
+
+    result = await get_agent('chat').run(item.prompt, deps=deps, model_settings={'timeout': deadline.timeout()})
+    record_agent_run('chat', started, result.usage())
+    turn_usage = TurnUsage()
+    turn_usage.add('chat', result.usage())
+
+    search_data = await collect_search_data(ToolCallIndex().update(result.new_messages()), deps.artifacts)
+    if include_metadata:
+        metadata, _ = await generate_metadata(result, deps, deadline, False, turn_usage)
+        search_data = {**(search_data or {}), **metadata}
+    turn_usage.record()
+
+    return {
+        "item_id": item_id,
+        "status": "ok",
+        "answer": result.data,
+        "search_data": search_data,
+        "usage": turn_usage.as_dict(),
+        "elapsed_seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+async def run_batch(batch_id: str, batch: BatchRequest) -> AsyncIterator[Dict]:
+    """
+    Run a batch with bounded concurrency, yielding item results as they complete.
+
+    Successful results are kept in Redis under the batch id for BATCH_RESULT_TTL
+    seconds. Running a batch id again yields the stored results first (marked
+    `"resumed": true`) and only runs the remaining items, failed ones included.
+    Without Redis, batches still run but cannot be resumed.
+
+    Batches are an operator tool (evaluation, pre-generation) with no owning user,
+    so their tokens are not charged to per-user budgets (`user_token_budget`);
+    their usage is still reported per item and in the turn token metrics.
+
+    Args:
+        batch_id: Identifier of the batch
+        batch: The items and options
+
+    Yields:
+        Dict: One result per item, in completion order
+    """
+    key = batch_results_key(batch_id)
+    items = item_ids(batch)
+    completed = await hgetall_json(key)
+    for item_id, _ in items:
+        if item_id in completed:
+            BATCH_ITEMS.labels("resumed").inc()
+            yield {**completed[item_id], "resumed": True}
+
+    pending_items = [(item_id, item) for item_id, item in items if item_id not in completed]
+    remaining = len(pending_items)
+    pending = iter(pending_items)
+    concurrency = min(batch.concurrency or settings.BATCH_MAX_CONCURRENCY, settings.BATCH_MAX_CONCURRENCY, max(remaining, 1))
+    results: asyncio.Queue = asyncio.Queue()
+
+    async with AsyncClient(timeout=30.0, transport=get_cassette_transport()) as client:
+        async def worker():
+            # Workers share one iterator, so every item is taken exactly once
+            for item_id, item in pending:
+                result = None
+                try:
+                    result = await run_batch_item(client, item_id, item, batch.include_metadata)
+                except Exception as e:
+                    logfire.warning("Batch item failed", batch_id=batch_id, item_id=item_id, error=str(e))
+                    BATCH_ITEMS.labels("error").inc()
+                    result = {"item_id": item_id, "status": "error", "error": type(e).__name__, "message": str(e)}
+                else:
+                    BATCH_ITEMS.labels("ok").inc()
+                    try:
+                        await hset_json(key, item_id, result, ttl=settings.BATCH_RESULT_TTL)
+                    except Exception as e:
+                        # The result is still streamed, the item just runs again on resume
+                        logfire.warning("Batch result not stored", batch_id=batch_id, item_id=item_id, error=str(e))
+                finally:
+                    # Exactly one result per item whatever happened, the stream counts on it to finish
+                    results.put_nowait(result or {"item_id": item_id, "status": "error", "error": "CancelledError", "message": "Item cancelled"})
+
+        workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+        try:
+            for _ in range(remaining):
+                yield await results.get()
+        finally:
+            # Also reached when the client disconnects, unfinished items then run again on resume
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+
+async def stored_batch_results(batch_id: str) -> List[Dict]:
+    """Completed results of a batch that are still kept in Redis."""
+    return list((await hgetall_json(batch_results_key(batch_id))).values())
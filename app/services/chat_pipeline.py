@@ -0,0 +1,160 @@
+import asyncio
+import datetime
+import time
+from typing import Dict, List, Optional, Tuple, Union
+
+import logfire
+from pydantic_ai.messages import ModelMessage, ModelMessagesTypeAdapter, ModelRequest, ModelResponse, TextPart, UserPromptPart
+from pydantic_ai.result import RunResult, StreamedRunResult
+
+from app.models.chat import Deps
+from app.services.agents.registry import get_agent
+from app.services.agents.tools.compaction import extract_knowledge_results
+from app.utils.artifact_store import ArtifactStore, collect_web_search_sources
+from app.utils.deadline import Deadline, DeadlineExceeded
+from app.utils.search_data import ToolCallIndex
+from app.utils.transcript import transcript_for_agent
+from app.utils.usage import TurnUsage
+from core.ai import record_agent_run
+from core.config import settings
+
+# Metadata sent when the metadata agent fails or is skipped
+DEFAULT_METADATA = {
+    'follow_up_questions': [],
+    'provide_appointment_booking': False,
+    'recommend_product': False,
+}
+
+
+async def collect_search_data(tool_index: ToolCallIndex, artifacts: ArtifactStore) -> Optional[Dict]:
+    """
+    Search data of a turn: the indexed tool calls, with the full results kept in the artifact store.
+
+    Args:
+        tool_index: Index of the turn's tool calls and returns
+        artifacts: The turn's artifact store
+
+    Returns:
+        Optional[Dict]: The search data, None if the turn made no tool calls
+    """
+    search_data = tool_index.get_search_data()
+    # Collect sources from every web search call made during this turn
+    web_search_sources = collect_web_search_sources(await artifacts.get("web_search_sources"))
+    if web_search_sources:
+        search_data = search_data or {}
+        search_data["sources"] = web_search_sources
+    # Full knowledge base results go to the UI, the model only saw compacted ones
+    knowledge_results = [
+        item
+        for response in await artifacts.get("knowledge_base_results")
+        for item in extract_knowledge_results(response)
+    ]
+    if knowledge_results:
+        search_data = search_data or {}
+        search_data["knowledge_results"] = knowledge_results
+    return search_data
+
+
+def interrupted_turn_messages(
+    run_messages: List[ModelMessage],
+    history_length: int,
+    prompt: str,
+    partial_text: Optional[str],
+    timestamp: datetime.datetime,
+) -> bytes:
+    """
+    Messages of a turn cut short by its deadline, to be stored like `new_messages_json()`.
+
+    Keeps what the run got to: the prompt, completed tool calls with their returns and
+    the answer streamed so far. A trailing tool call whose return never arrived is
+    dropped, the model provider rejects a history with an unanswered call.
+
+    Args:
+        run_messages: Messages captured from the run (`capture_run_messages`), history included
+        history_length: Number of history messages the run started with
+        prompt: The user prompt, stored alone when the run did not start
+        partial_text: Text streamed to the client so far
+        timestamp: Timestamp of the partial answer
+
+    Returns:
+        bytes: The turn's messages as JSON
+    """
+    new_messages = list(run_messages[history_length:]) or [ModelRequest(parts=[UserPromptPart(prompt)])]
+    last = new_messages[-1]
+    if isinstance(last, ModelResponse) and any(part.part_kind == 'tool-call' for part in last.parts):
+        new_messages.pop()
+    if partial_text:
+        new_messages.append(ModelResponse(parts=[TextPart(partial_text)], timestamp=timestamp))
+    return ModelMessagesTypeAdapter.dump_json(new_messages)
+
+
+async def _run_metadata_agent(
+    agent_name: str,
+    result: Union[RunResult, StreamedRunResult],
+    deps: Deps,
+    deadline: Deadline,
+    turn_usage: TurnUsage,
+):
+    if deadline.remaining() < settings.TURN_MIN_STAGE_SECONDS:
+        raise DeadlineExceeded("No time left in this turn for metadata")
+    stage_timeout = deadline.timeout()
+    started = time.perf_counter()
+    # The agents get a compact dialogue, not the raw message JSON with prompts and tool payloads;
+    # a title is about the whole conversation, metadata about the last turn
+    if agent_name == 'metadata_title':
+        transcript = transcript_for_agent(agent_name, result.all_messages(), result.all_messages_json())
+    else:
+        transcript = transcript_for_agent(agent_name, result.new_messages(), result.new_messages_json())
+    try:
+        response = await asyncio.wait_for(
+            get_agent(agent_name).run(transcript, deps=deps, model_settings={'timeout': stage_timeout}),
+            stage_timeout
+        )
+    except Exception:
+        record_agent_run(agent_name, started)
+        raise
+    record_agent_run(agent_name, started, response.usage())
+    turn_usage.add(agent_name, response.usage())
+    return response
+
+
+async def generate_metadata(
+    result: Union[RunResult, StreamedRunResult],
+    deps: Deps,
+    deadline: Deadline,
+    needs_title: bool,
+    turn_usage: TurnUsage,
+) -> Tuple[Dict, Optional[str]]:
+    """
+    Follow-up questions and flags for a finished chat run, plus a title when one is needed.
+
+    Metadata is optional: it is skipped when less than TURN_MIN_STAGE_SECONDS are
+    left and failures fall back to DEFAULT_METADATA. When the combined metadata and
+    title call fails (e.g. an invalid title), the metadata agent is tried on its
+    own, so the turn only loses its title.
+
+    Args:
+        result: The chat agent's run
+        deps: Dependencies of the turn
+        deadline: Deadline of the turn
+        needs_title: Use the combined metadata and title agent
+        turn_usage: Usage of the turn, the metadata runs are added to it
+
+    Returns:
+        Tuple[Dict, Optional[str]]: The metadata fields and the title (None when not needed or failed)
+    """
+    for agent_name in (['metadata_title', 'metadata'] if needs_title else ['metadata']):
+        try:
+            metadata_response = await _run_metadata_agent(agent_name, result, deps, deadline, turn_usage)
+            break
+        except Exception as e:
+            logfire.warning("Metadata generation failed", agent=agent_name, error=str(e))
+    else:
+        return dict(DEFAULT_METADATA), None
+
+    metadata = {
+        'follow_up_questions': metadata_response.data.questions,
+        'provide_appointment_booking': metadata_response.data.provide_appointment_booking,
+        'recommend_product': metadata_response.data.recommend_product,
+    }
+    return metadata, getattr(metadata_response.data, 'title', None)
@@ -0,0 +1,278 @@
+from __future__ import annotations as _annotations
+
+import hashlib
+import json
+import logging
+import re
+import tempfile
+import unicodedata
+from dataclasses import dataclass
+from difflib import SequenceMatcher
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Project root, where country_ports.json lives
+THIS_DIR = Path(__file__).parent.parent.parent
+COUNTRY_PORTS_PATH = THIS_DIR / "country_ports.json"
+
+# Bump when the compiled layout changes so stale caches are rebuilt
+CACHE_FORMAT_VERSION = 1
+
+# Trigram-score distance from the best candidate within which candidates are reranked
+RERANK_WINDOW = 0.15
+
+_NON_ALNUM_RE = re.compile(r"[^a-z0-9]+")
+
+
+def normalize_place(name: str) -> str:
+    """Lowercase, strip accents and punctuation, collapse whitespace."""
+    ascii_name = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode("ascii")
+    return _NON_ALNUM_RE.sub(" ", ascii_name.lower().replace("_", " ")).strip()
+
+
+def trigrams(normalized: str) -> List[str]:
+    """Padded character trigrams of a normalized name (pg_trgm style: two leading spaces, one trailing)."""
+    padded = f"  {normalized} "
+    return sorted({padded[i:i + 3] for i in range(len(padded) - 2)})
+
+
+@dataclass(frozen=True)
+class PlaceMatch:
+    name: str
+    score: float
+    countries: Tuple[str, ...] = ()
+
+
+class TrigramIndex:
+    """
+    Compact trigram index over a fixed list of names.
+
+    Postings are stored CSR style in NumPy arrays: the entries of `trigram_ids`
+    between `indptr[t]` and `indptr[t + 1]` are the names containing trigram `t`.
+    A lookup gathers the postings of the query's trigrams, counts shared trigrams
+    per name with `np.bincount` and ranks by Dice similarity, then reranks the
+    best few with a character-level ratio so single typos still rank first.
+    """
+
+    def __init__(self, names: np.ndarray, vocab: np.ndarray, indptr: np.ndarray, name_ids: np.ndarray, sizes: np.ndarray):
+        self.names = names
+        self.vocab = vocab
+        self.indptr = indptr
+        self.name_ids = name_ids
+        self.sizes = sizes
+        self._normalized = [normalize_place(str(n)) for n in names]
+        self._exact: Dict[str, int] = {}
+        for i, normalized in enumerate(self._normalized):
+            self._exact.setdefault(normalized, i)
+        self._trigram_ids = {str(t): i for i, t in enumerate(vocab)}
+
+    @classmethod
+    def build(cls, names: Sequence[str]) -> "TrigramIndex":
+        grams = [trigrams(normalize_place(n)) for n in names]
+        vocab = sorted({g for gs in grams for g in gs})
+        ids = {g: i for i, g in enumerate(vocab)}
+        postings: List[List[int]] = [[] for _ in vocab]
+        for name_id, gs in enumerate(grams):
+            for g in gs:
+                postings[ids[g]].append(name_id)
+        indptr = np.zeros(len(vocab) + 1, dtype=np.int32)
+        indptr[1:] = np.cumsum([len(p) for p in postings])
+        name_ids = np.array([i for p in postings for i in p], dtype=np.int32)
+        return cls(
+            np.array(names, dtype=str),
+            np.array(vocab, dtype=str),
+            indptr,
+            name_ids,
+            np.array([len(gs) for gs in grams], dtype=np.int16),
+        )
+
+    def exact(self, name: str) -> Optional[int]:
+        return self._exact.get(normalize_place(name))
+
+    def search(self, query: str, limit: int = 5, min_score: float = 0.3, rerank: int = 10) -> List[Tuple[int, float]]:
+        normalized = normalize_place(query)
+        if not normalized:
+            return []
+        exact = self._exact.get(normalized)
+        if exact is not None and limit == 1:
+            return [(exact, 1.0)]
+
+        query_ids = [self._trigram_ids[g] for g in trigrams(normalized) if g in self._trigram_ids]
+        if not query_ids:
+            return []
+        hits = np.concatenate([self.name_ids[self.indptr[t]:self.indptr[t + 1]] for t in query_ids])
+        shared = np.bincount(hits, minlength=len(self.names))
+        query_size = len(trigrams(normalized))
+        dice = 2.0 * shared / (self.sizes + query_size)
+
+        # Rerank only the candidates close to the best trigram score; the
+        # character-level ratio is ~20us per name, the trigram pass ~50us in total
+        n = min(max(rerank, limit), int(np.count_nonzero(shared)))
+        candidates = np.argpartition(-dice, n - 1)[:n]
+        candidates = candidates[np.argsort(-dice[candidates], kind="stable")]
+        floor = float(dice[candidates].max()) - RERANK_WINDOW
+        scored = []
+        for name_id in candidates:
+            if self._normalized[name_id] == normalized:
+                score = 1.0
+            elif dice[name_id] < floor and len(scored) >= limit:
+                continue
+            else:
+                ratio = SequenceMatcher(None, normalized, self._normalized[name_id]).ratio()
+                score = round(0.5 * float(dice[name_id]) + 0.5 * ratio, 4)
+            if score >= min_score:
+                scored.append((int(name_id), score))
+        scored.sort(key=lambda item: item[1], reverse=True)
+        return scored[:limit]
+
+    def arrays(self, prefix: str) -> Dict[str, np.ndarray]:
+        return {
+            f"{prefix}_names": self.names,
+            f"{prefix}_vocab": self.vocab,
+            f"{prefix}_indptr": self.indptr,
+            f"{prefix}_name_ids": self.name_ids,
+            f"{prefix}_sizes": self.sizes,
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays, prefix: str) -> "TrigramIndex":
+        return cls(*(arrays[f"{prefix}_{field}"] for field in ("names", "vocab", "indptr", "name_ids", "sizes")))
+
+
+class Gazetteer:
+    """
+    Fuzzy port and country lookups over `country_ports.json`.
+
+    Ports are deduplicated by name (a few names, e.g. "Kingston", exist in several
+    countries); the port-to-country relation is a CSR pair of arrays, and the
+    country-to-ports relation is derived from it on load. The compiled arrays are
+    cached to disk as an `.npz` keyed by a hash of the source file, so later starts
+    skip the build.
+    """
+
+    def __init__(self, ports: TrigramIndex, countries: TrigramIndex, port_country_indptr: np.ndarray, port_country_ids: np.ndarray):
+        self.ports = ports
+        self.countries = countries
+        self.port_country_indptr = port_country_indptr
+        self.port_country_ids = port_country_ids
+        self._country_ports: List[List[int]] = [[] for _ in range(len(countries.names))]
+        for port_id in range(len(ports.names)):
+            for country_id in self._port_country_range(port_id):
+                self._country_ports[country_id].append(port_id)
+
+    @classmethod
+    def build(cls, data: Dict[str, List[str]]) -> "Gazetteer":
+        country_names = [key.replace("_", " ").title() for key in data]
+        port_names: List[str] = []
+        port_ids: Dict[str, int] = {}
+        port_countries: List[List[int]] = []
+        for country_id, ports in enumerate(data.values()):
+            for port in ports:
+                key = normalize_place(port)
+                if key not in port_ids:
+                    port_ids[key] = len(port_names)
+                    port_names.append(port)
+                    port_countries.append([])
+                if country_id not in port_countries[port_ids[key]]:
+                    port_countries[port_ids[key]].append(country_id)
+        indptr = np.zeros(len(port_names) + 1, dtype=np.int32)
+        indptr[1:] = np.cumsum([len(c) for c in port_countries])
+        return cls(
+            TrigramIndex.build(port_names),
+            TrigramIndex.build(country_names),
+            indptr,
+            np.array([c for cs in port_countries for c in cs], dtype=np.int16),
+        )
+
+    @classmethod
+    def load(cls, source: Path | str = COUNTRY_PORTS_PATH, cache_path: Optional[Path | str] = None) -> "Gazetteer":
+        """
+        Load the gazetteer, from the compiled cache when it matches the source file.
+
+        Args:
+            source: Path to the country to ports JSON file
+            cache_path: Where to read/write the compiled index, defaults to the temp directory
+        """
+        raw = Path(source).read_bytes()
+        digest = hashlib.sha1(raw).hexdigest()[:16]
+        cache = Path(cache_path) if cache_path else Path(tempfile.gettempdir()) / f"gazetteer-{digest}.npz"
+
+        if cache.exists():
+            try:
+                with np.load(cache, allow_pickle=False) as arrays:
+                    if int(arrays["version"]) == CACHE_FORMAT_VERSION and str(arrays["digest"]) == digest:
+                        return cls(
+                            TrigramIndex.from_arrays(arrays, "port"),
+                            TrigramIndex.from_arrays(arrays, "country"),
+                            arrays["port_country_indptr"],
+                            arrays["port_country_ids"],
+                        )
+            except Exception as e:
+                logger.warning(f"Ignoring unreadable gazetteer cache {cache}: {str(e)}")
+
+        gazetteer = cls.build(json.loads(raw))
+        try:
+            with open(cache, "wb") as f:
+                np.savez(
+                    f,
+                    version=np.array(CACHE_FORMAT_VERSION),
+                    digest=np.array(digest),
+                    port_country_indptr=gazetteer.port_country_indptr,
+                    port_country_ids=gazetteer.port_country_ids,
+                    **gazetteer.ports.arrays("port"),
+                    **gazetteer.countries.arrays("country"),
+                )
+        except OSError as e:
+            logger.warning(f"Could not write gazetteer cache {cache}: {str(e)}")
+        return gazetteer
+
+    def _port_country_range(self, port_id: int) -> List[int]:
+        return [int(c) for c in self.port_country_ids[self.port_country_indptr[port_id]:self.port_country_indptr[port_id + 1]]]
+
+    def _country_names(self, port_id: int) -> Tuple[str, ...]:
+        return tuple(str(self.countries.names[c]) for c in self._port_country_range(port_id))
+
+    def find_ports(self, query: str, limit: int = 5, min_score: float = 0.3) -> List[PlaceMatch]:
+        """Ports whose names best match `query`, tolerant to typos and punctuation."""
+        return [
+            PlaceMatch(str(self.ports.names[port_id]), score, self._country_names(port_id))
+            for port_id, score in self.ports.search(query, limit=limit, min_score=min_score)
+        ]
+
+    def find_countries(self, query: str, limit: int = 3, min_score: float = 0.3) -> List[PlaceMatch]:
+        """Countries whose names best match `query`."""
+        return [
+            PlaceMatch(str(self.countries.names[country_id]), score)
+            for country_id, score in self.countries.search(query, limit=limit, min_score=min_score)
+        ]
+
+    def countries_for_port(self, port: str) -> List[str]:
+        """Countries of a port, matching the port name fuzzily when there is no exact match."""
+        port_id = self.ports.exact(port)
+        if port_id is None:
+            matches = self.ports.search(port, limit=1, min_score=0.6)
+            if not matches:
+                return []
+            port_id = matches[0][0]
+        return list(self._country_names(port_id))
+
+    def ports_for_country(self, country: str) -> List[str]:
+        """Ports of a country, matching the country name fuzzily when there is no exact match."""
+        country_id = self.countries.exact(country)
+        if country_id is None:
+            matches = self.countries.search(country, limit=1, min_score=0.6)
+            if not matches:
+                return []
+            country_id = matches[0][0]
+        return [str(self.ports.names[p]) for p in self._country_ports[country_id]]
+
+
+@lru_cache(maxsize=1)
+def get_gazetteer() -> Gazetteer:
+    """The process-wide gazetteer, loaded on first use."""
+    return Gazetteer.load()
@@ -0,0 +1,180 @@
+from __future__ import annotations as _annotations
+
+import json
+import logging
+import math
+import os
+import shutil
+import tempfile
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple
+
+import numpy as np
+
+from .index import INDEX_FORMAT_VERSION, embed, tokenize
+
+logger = logging.getLogger(__name__)
+
+TEXT_SUFFIXES = {".txt", ".md"}
+
+
+def iter_documents(source_dir: Path) -> Iterator[Tuple[str, str, str, str]]:
+    """
+    Yield (domain, doc_id, title, text) for every exported document.
+
+    The export directory has one sub-directory per domain (e.g. `ayurveda/`) holding
+    `.txt`/`.md` files, or `.jsonl`/`.json` files of objects with `doc_id` (or `id`),
+    `title` and `content` (or `text`).
+    """
+    for domain_dir in sorted(p for p in source_dir.iterdir() if p.is_dir()):
+        domain = domain_dir.name.lower()
+        for path in sorted(domain_dir.rglob("*")):
+            if path.suffix in TEXT_SUFFIXES:
+                doc_id = str(path.relative_to(domain_dir).with_suffix(""))
+                yield domain, doc_id, path.stem, path.read_text(encoding="utf-8")
+            elif path.suffix in (".jsonl", ".json"):
+                raw = path.read_text(encoding="utf-8")
+                records = [json.loads(line) for line in raw.splitlines() if line.strip()] \
+                    if path.suffix == ".jsonl" else json.loads(raw)
+                for i, record in enumerate(records):
+                    text = record.get("content") or record.get("text") or ""
+                    doc_id = str(record.get("doc_id") or record.get("id") or f"{path.stem}-{i}")
+                    yield domain, doc_id, record.get("title") or doc_id, text
+
+
+def chunk_text(text: str, size: int = 200, overlap: int = 40) -> List[str]:
+    """Split text into chunks of `size` words, consecutive chunks sharing `overlap` words."""
+    words = text.split()
+    if not words:
+        return []
+    step = max(1, size - overlap)
+    return [" ".join(words[i:i + size]) for i in range(0, max(1, len(words) - overlap), step)]
+
+
+def _swap_into_place(build_dir: Path, output_dir: Path) -> None:
+    """
+    Replace `output_dir` with `build_dir`.
+
+    Each rename is atomic. Processes that loaded the previous index keep their
+    mapped files (unlinked files stay readable until unmapped), and a reload sees
+    either the previous index or the new one, never a mix.
+    """
+    previous = None
+    if output_dir.exists():
+        previous = output_dir.with_name(f".{output_dir.name}.previous-{os.getpid()}")
+        os.replace(output_dir, previous)
+    os.replace(build_dir, output_dir)
+    if previous is not None:
+        shutil.rmtree(previous, ignore_errors=True)
+
+
+def build_index(
+    source_dir: Path | str,
+    output_dir: Path | str,
+    dim: int = 256,
+    chunk_size: int = 200,
+    chunk_overlap: int = 40,
+    k1: float = 1.5,
+    b: float = 0.75,
+) -> Dict:
+    """
+    Build the on-disk hybrid index read by `LocalIndex`.
+
+    Args:
+        source_dir: Export directory, see `iter_documents`
+        output_dir: Directory the index files are written to
+        dim: Dense vector dimension
+        chunk_size: Words per chunk
+        chunk_overlap: Words shared by consecutive chunks
+        k1: BM25 term frequency saturation
+        b: BM25 length normalization
+
+    Returns:
+        Dict: Summary with document, chunk and term counts per domain
+    """
+    source_dir, output_dir = Path(source_dir), Path(output_dir)
+    output_dir.parent.mkdir(parents=True, exist_ok=True)
+
+    domains: List[str] = []
+    chunks: List[Dict] = []
+    chunk_domains: List[int] = []
+    term_counts: List[Counter] = []
+    texts: List[bytes] = []
+    documents = 0
+
+    for domain, doc_id, title, text in iter_documents(source_dir):
+        if domain not in domains:
+            domains.append(domain)
+        documents += 1
+        for chunk in chunk_text(text, chunk_size, chunk_overlap):
+            chunks.append({"doc_id": doc_id, "source": title})
+            chunk_domains.append(domains.index(domain))
+            term_counts.append(Counter(tokenize(chunk)))
+            texts.append(chunk.encode("utf-8"))
+
+    n_chunks = len(chunks)
+    lengths = np.array([sum(c.values()) for c in term_counts], dtype=np.float32)
+    avg_length = float(lengths.mean()) if n_chunks else 0.0
+
+    # Invert into per-term postings with precomputed BM25 weights
+    postings: Dict[str, List[Tuple[int, float]]] = {}
+    for chunk_id, counts in enumerate(term_counts):
+        norm = k1 * (1 - b + b * lengths[chunk_id] / avg_length) if avg_length else k1
+        for term, tf in counts.items():
+            postings.setdefault(term, []).append((chunk_id, tf * (k1 + 1) / (tf + norm)))
+
+    vocab: Dict[str, int] = {}
+    indptr = [0]
+    docs: List[int] = []
+    weights: List[float] = []
+    for term in sorted(postings):
+        entries = postings[term]
+        idf = math.log(1 + (n_chunks - len(entries) + 0.5) / (len(entries) + 0.5))
+        vocab[term] = len(vocab)
+        docs.extend(chunk_id for chunk_id, _ in entries)
+        weights.extend(idf * weight for _, weight in entries)
+        indptr.append(len(docs))
+
+    vectors = np.zeros((n_chunks, dim), dtype=np.float32)
+    for chunk_id, text in enumerate(texts):
+        vectors[chunk_id] = embed(text.decode("utf-8"), dim)
+
+    offsets = np.zeros(n_chunks + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(t) for t in texts])
+    # Written to a sibling directory and swapped in whole: workers have the current
+    # arrays memory-mapped, so they are never overwritten in place
+    build_dir = Path(tempfile.mkdtemp(prefix=f".{output_dir.name}.building-", dir=output_dir.parent))
+    try:
+        os.chmod(build_dir, 0o755)
+        (build_dir / "texts.bin").write_bytes(b"".join(texts))
+        np.save(build_dir / "text_offsets.npy", offsets)
+        np.save(build_dir / "chunk_domains.npy", np.array(chunk_domains, dtype=np.int16))
+        np.save(build_dir / "postings_indptr.npy", np.array(indptr, dtype=np.int64))
+        np.save(build_dir / "postings_docs.npy", np.array(docs, dtype=np.int32))
+        np.save(build_dir / "postings_weights.npy", np.array(weights, dtype=np.float32))
+        np.save(build_dir / "vectors.npy", vectors)
+        (build_dir / "chunks.json").write_text(json.dumps(chunks), encoding="utf-8")
+        (build_dir / "meta.json").write_text(json.dumps({
+            "version": INDEX_FORMAT_VERSION,
+            "dim": dim,
+            "k1": k1,
+            "b": b,
+            "chunk_size": chunk_size,
+            "chunk_overlap": chunk_overlap,
+            "domains": domains,
+            "vocab": vocab,
+        }), encoding="utf-8")
+        _swap_into_place(build_dir, output_dir)
+    except BaseException:
+        shutil.rmtree(build_dir, ignore_errors=True)
+        raise
+
+    summary = {
+        "documents": documents,
+        "chunks": n_chunks,
+        "terms": len(vocab),
+        "chunks_per_domain": {d: chunk_domains.count(i) for i, d in enumerate(domains)},
+    }
+    logger.info(f"Built local knowledge base index at {output_dir}: {summary}")
+    return summary
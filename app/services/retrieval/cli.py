@@ -0,0 +1,48 @@
+"""
+Command line entry point for the local knowledge base index.
+
+Usage:
+    python -m app.services.retrieval.cli build --source exports/ --output data/kb_index
+    python -m app.services.retrieval.cli query --index data/kb_index --domain ayurveda "basic principles of Ayurveda"
+"""
+import argparse
+import json
+import time
+
+from .builder import build_index
+from .index import LocalIndex
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Build and query the local knowledge base index")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build = commands.add_parser("build", help="Index exported domain documents")
+    build.add_argument("--source", required=True, help="Export directory with one sub-directory per domain")
+    build.add_argument("--output", required=True, help="Directory to write the index to")
+    build.add_argument("--dim", type=int, default=256, help="Dense vector dimension")
+    build.add_argument("--chunk-size", type=int, default=200, help="Words per chunk")
+    build.add_argument("--chunk-overlap", type=int, default=40, help="Words shared by consecutive chunks")
+
+    query = commands.add_parser("query", help="Run a query against an index")
+    query.add_argument("--index", required=True, help="Index directory")
+    query.add_argument("--domain", default=None, help="Restrict results to a domain")
+    query.add_argument("--top-k", type=int, default=5)
+    query.add_argument("text", help="Query text")
+
+    args = parser.parse_args(argv)
+    if args.command == "build":
+        summary = build_index(args.source, args.output, dim=args.dim, chunk_size=args.chunk_size, chunk_overlap=args.chunk_overlap)
+        print(json.dumps(summary, indent=2))
+    else:
+        index = LocalIndex(args.index)
+        start = time.perf_counter()
+        results = index.search(args.text, domain=args.domain, top_k=args.top_k)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        for result in results:
+            print(f"{result['score']:.4f}  [{result['domain']}] {result['source']}: {result['content'][:120]}")
+        print(f"{len(results)} results in {elapsed_ms:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
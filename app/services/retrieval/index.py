@@ -0,0 +1,169 @@
+from __future__ import annotations as _annotations
+
+import json
+import re
+import zlib
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+INDEX_FORMAT_VERSION = 1
+
+_TOKEN_RE = re.compile(r"\w+")
+
+STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how i in is it its me my of on or "
+    "should the their there these this to was what when which who why will with you your".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word tokens without stopwords, shared by indexing and querying."""
+    return [t for t in _TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+
+def embed(text: str, dim: int) -> np.ndarray:
+    """
+    Dense vector for a text using signed feature hashing.
+
+    Words, word bigrams and character trigrams are hashed (CRC32, stable across
+    processes) into `dim` buckets with a hash-derived sign, then L2 normalized.
+    This needs no model or network, so queries embed in microseconds, and it
+    captures partial-word overlap (spelling variants, inflections) that BM25 misses.
+    """
+    vector = np.zeros(dim, dtype=np.float32)
+    words = tokenize(text)
+    features = list(words)
+    features += [f"{a} {b}" for a, b in zip(words, words[1:])]
+    for word in words:
+        padded = f"#{word}#"
+        features += [padded[i:i + 3] for i in range(len(padded) - 2)]
+    for feature in features:
+        h = zlib.crc32(feature.encode("utf-8"))
+        vector[h % dim] += 1.0 if (h >> 31) & 1 else -1.0
+    norm = np.linalg.norm(vector)
+    if norm > 0:
+        vector /= norm
+    return vector
+
+
+class LocalIndex:
+    """
+    Memory-mapped hybrid (BM25 + dense vector) index over exported domain documents.
+
+    The on-disk layout, written by `builder.build_index`, is:
+
+        meta.json            format version, parameters, domains, vocabulary
+        chunks.json          per-chunk doc_id and source title
+        texts.bin            UTF-8 chunk texts, concatenated
+        text_offsets.npy     int64 [n_chunks + 1] byte offsets into texts.bin
+        chunk_domains.npy    int16 [n_chunks] domain index of each chunk
+        postings_indptr.npy  int64 [n_terms + 1] CSR row pointers per term
+        postings_docs.npy    int32 chunk ids per term
+        postings_weights.npy float32 precomputed BM25 weight per (term, chunk)
+        vectors.npy          float32 [n_chunks, dim] normalized dense vectors
+
+    Arrays are opened with `mmap_mode='r'`, so loading is near instant and pages
+    are shared between worker processes.
+    """
+
+    def __init__(self, path: Path | str):
+        self.path = Path(path)
+        meta = json.loads((self.path / "meta.json").read_text(encoding="utf-8"))
+        if meta.get("version") != INDEX_FORMAT_VERSION:
+            raise ValueError(f"Unsupported local index version {meta.get('version')} at {self.path}")
+
+        self.dim: int = meta["dim"]
+        self.domains: List[str] = meta["domains"]
+        self.vocab: Dict[str, int] = meta["vocab"]
+        self.chunks: List[Dict] = json.loads((self.path / "chunks.json").read_text(encoding="utf-8"))
+
+        texts_path = self.path / "texts.bin"
+        # np.memmap cannot map an empty file
+        self._texts = np.memmap(texts_path, dtype=np.uint8, mode="r") if texts_path.stat().st_size \
+            else np.zeros(0, dtype=np.uint8)
+        self._text_offsets = np.load(self.path / "text_offsets.npy", mmap_mode="r")
+        self._chunk_domains = np.load(self.path / "chunk_domains.npy", mmap_mode="r")
+        self._indptr = np.load(self.path / "postings_indptr.npy", mmap_mode="r")
+        self._docs = np.load(self.path / "postings_docs.npy", mmap_mode="r")
+        self._weights = np.load(self.path / "postings_weights.npy", mmap_mode="r")
+        self._vectors = np.load(self.path / "vectors.npy", mmap_mode="r")
+        self._domain_masks: Dict[str, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self.chunks)
+
+    def text(self, chunk_id: int) -> str:
+        start, end = self._text_offsets[chunk_id], self._text_offsets[chunk_id + 1]
+        return bytes(self._texts[start:end]).decode("utf-8")
+
+    def _domain_mask(self, domain: str) -> np.ndarray:
+        mask = self._domain_masks.get(domain)
+        if mask is None:
+            mask = np.asarray(self._chunk_domains) == self.domains.index(domain)
+            self._domain_masks[domain] = mask
+        return mask
+
+    def bm25_scores(self, query: str) -> np.ndarray:
+        scores = np.zeros(len(self.chunks), dtype=np.float32)
+        for term in set(tokenize(query)):
+            term_id = self.vocab.get(term)
+            if term_id is None:
+                continue
+            start, end = self._indptr[term_id], self._indptr[term_id + 1]
+            # Each chunk appears at most once per term, so fancy-index add is safe
+            scores[self._docs[start:end]] += self._weights[start:end]
+        return scores
+
+    def dense_scores(self, query: str) -> np.ndarray:
+        return self._vectors @ embed(query, self.dim)
+
+    def search(self, query: str, domain: Optional[str] = None, top_k: int = 10, candidates: int = 50, rrf_k: int = 60) -> List[Dict]:
+        """
+        Hybrid search fusing BM25 and dense rankings with reciprocal rank fusion.
+
+        Args:
+            query: The search query
+            domain: Restrict results to this domain, all domains when None
+            top_k: Number of results to return
+            candidates: Number of top chunks taken from each ranking before fusion
+            rrf_k: Reciprocal rank fusion constant
+
+        Returns:
+            List[Dict]: Results shaped like the remote service's, best first
+        """
+        if not self.chunks:
+            return []
+
+        allowed = None
+        if domain is not None:
+            if domain not in self.domains:
+                return []
+            allowed = self._domain_mask(domain)
+
+        fused: Dict[int, float] = {}
+        for scores in (self.bm25_scores(query), self.dense_scores(query)):
+            if allowed is not None:
+                scores = np.where(allowed, scores, -np.inf)
+            n = min(candidates, len(scores))
+            top = np.argpartition(-scores, n - 1)[:n]
+            top = top[np.argsort(-scores[top])]
+            for rank, chunk_id in enumerate(top):
+                score = scores[chunk_id]
+                # Masked (-inf) and unrelated (<= 0) chunks never make the fused list
+                if not score > 0:
+                    break
+                fused[int(chunk_id)] = fused.get(int(chunk_id), 0.0) + 1.0 / (rrf_k + rank + 1)
+
+        ranked = sorted(fused.items(), key=lambda item: item[1], reverse=True)[:top_k]
+        return [
+            {
+                "content": self.text(chunk_id),
+                "doc_id": self.chunks[chunk_id]["doc_id"],
+                "source": self.chunks[chunk_id]["source"],
+                "domain": self.domains[int(self._chunk_domains[chunk_id])],
+                "score": round(score, 6),
+            }
+            for chunk_id, score in ranked
+        ]
@@ -0,0 +1,96 @@
+from __future__ import annotations as _annotations
+
+import logging
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Protocol
+
+from app.utils.redis_utils import push_artifact, retrieve_artifacts
+
+logger = logging.getLogger(__name__)
+
+
+class ArtifactStore(Protocol):
+    """
+    Request-scoped storage for tool outputs that should reach the client but not the LLM.
+
+    A store lives for exactly one chat turn. Tools append artifacts under a kind
+    (e.g. "web_search_sources") and the endpoint collects them once the agent run
+    has finished. Every tool call appends its own entry, so several calls of the
+    same tool in one turn are all preserved, in call order.
+    """
+
+    async def add(self, kind: str, value: Any, source: Optional[str] = None) -> None:
+        ...
+
+    async def get(self, kind: str) -> List[Any]:
+        ...
+
+
+class InMemoryArtifactStore:
+    """Artifact store backed by a plain dict, for turns handled in a single process."""
+
+    def __init__(self) -> None:
+        self._artifacts: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+
+    async def add(self, kind: str, value: Any, source: Optional[str] = None) -> None:
+        self._artifacts[kind].append({"source": source, "value": value})
+
+    async def get(self, kind: str) -> List[Any]:
+        return [entry["value"] for entry in self._artifacts.get(kind, [])]
+
+
+class RedisArtifactStore:
+    """
+    Artifact store backed by Redis lists, for turns whose tools run in another process.
+
+    Entries are appended with RPUSH under `artifacts:{turn_id}:{kind}`, so concurrent
+    writers never overwrite each other.
+    """
+
+    def __init__(self, turn_id: str, ttl: int = 180) -> None:
+        self.turn_id = turn_id
+        self.ttl = ttl
+
+    async def add(self, kind: str, value: Any, source: Optional[str] = None) -> None:
+        stored = await push_artifact(self.turn_id, kind, {"source": source, "value": value}, ttl=self.ttl)
+        if not stored:
+            logger.warning(f"Artifact '{kind}' for turn {self.turn_id} was not stored")
+
+    async def get(self, kind: str) -> List[Any]:
+        entries = await retrieve_artifacts(self.turn_id, kind)
+        return [entry["value"] for entry in entries]
+
+
+def create_artifact_store(backend: str = "memory", turn_id: Optional[str] = None) -> ArtifactStore:
+    """
+    Build the artifact store for a turn.
+
+    Args:
+        backend: "memory" (default) or "redis"
+        turn_id: Identifier shared by every process taking part in the turn,
+            required for the Redis backend
+
+    Returns:
+        ArtifactStore: The in-memory store unless a Redis store was requested and
+        a turn id is available
+    """
+    if backend == "redis":
+        if turn_id:
+            return RedisArtifactStore(turn_id)
+        logger.warning("Redis artifact store requested without a turn id, using in-memory store")
+    return InMemoryArtifactStore()
+
+
+def collect_web_search_sources(sources_per_call: List[Any]) -> List[Any]:
+    """Flatten the sources of every web search call in a turn, dropping repeated URLs."""
+    collected = []
+    seen_urls = set()
+    for sources in sources_per_call:
+        for source in sources or []:
+            url = source.get("metadata", {}).get("url") if isinstance(source, dict) else None
+            if url:
+                if url in seen_urls:
+                    continue
+                seen_urls.add(url)
+            collected.append(source)
+    return collected
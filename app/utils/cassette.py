@@ -0,0 +1,195 @@
+import asyncio
+import base64
+import hashlib
+import json
+import logging
+import time
+from collections import defaultdict, deque
+from pathlib import Path
+from typing import AsyncIterator, Deque, Dict, List, Optional, Tuple
+
+import httpx
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Never written to a cassette
+_REDACTED_HEADERS = {"authorization", "api-key", "x-api-key", "cookie", "set-cookie", "ocp-apim-subscription-key"}
+
+
+class CassetteMiss(Exception):
+    """Raised in replay mode when a request has no recorded interaction left"""
+    pass
+
+
+def _body_hash(content: bytes) -> str:
+    return hashlib.sha1(content).hexdigest()
+
+
+def _endpoint(request: httpx.Request) -> str:
+    # Query strings carry no secrets for our upstreams and are part of the endpoint
+    return f"{request.method} {request.url}"
+
+
+class Cassette:
+    """
+    Recorded HTTP interactions, stored one JSON object per line.
+
+    Each interaction holds the request (method, URL, body hash, body text) and the
+    response status, headers and raw body chunks with the time, relative to the
+    request start, at which the headers and each chunk arrived.
+    """
+
+    def __init__(self, path: Path | str):
+        self.path = Path(path)
+        self._by_endpoint: Dict[str, Deque[Dict]] = defaultdict(deque)
+        if self.path.exists():
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        interaction = json.loads(line)
+                        self._by_endpoint[interaction["request"]["endpoint"]].append(interaction)
+
+    def __len__(self) -> int:
+        return sum(len(queue) for queue in self._by_endpoint.values())
+
+    def append(self, interaction: Dict) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(interaction) + "\n")
+
+    def take(self, endpoint: str, body_hash: str) -> Dict:
+        """
+        Next recorded interaction for an endpoint, preferring one with the same body.
+
+        Bodies that embed per-run values (e.g. the current time in a system prompt)
+        never match exactly, so interactions then replay in recorded order.
+        """
+        queue = self._by_endpoint.get(endpoint)
+        if not queue:
+            raise CassetteMiss(f"No recorded interaction left for {endpoint}")
+        for interaction in queue:
+            if interaction["request"]["body_hash"] == body_hash:
+                queue.remove(interaction)
+                return interaction
+        logger.debug(f"No body match for {endpoint}, replaying in recorded order")
+        return queue.popleft()
+
+
+class _RecordingStream(httpx.AsyncByteStream):
+    """Passes the upstream body through while recording its chunks and their timing."""
+
+    def __init__(self, inner: httpx.AsyncByteStream, interaction: Dict, started: float, cassette: Cassette):
+        self._inner = inner
+        self._interaction = interaction
+        self._started = started
+        self._cassette = cassette
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        chunks = self._interaction["response"]["chunks"]
+        async for chunk in self._inner:
+            chunks.append([round(time.perf_counter() - self._started, 4), base64.b64encode(chunk).decode("ascii")])
+            yield chunk
+
+    async def aclose(self) -> None:
+        await self._inner.aclose()
+        self._cassette.append(self._interaction)
+
+
+class _ReplayStream(httpx.AsyncByteStream):
+    """Serves recorded chunks, spaced as recorded and divided by `speed` (0 for no delay)."""
+
+    def __init__(self, chunks: List[Tuple[float, str]], headers_at: float, speed: float):
+        self._chunks = chunks
+        self._headers_at = headers_at
+        self._speed = speed
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        previous = self._headers_at
+        for offset, data in self._chunks:
+            if self._speed > 0 and offset > previous:
+                await asyncio.sleep((offset - previous) / self._speed)
+            previous = offset
+            yield base64.b64decode(data)
+
+
+class CassetteTransport(httpx.AsyncBaseTransport):
+    """
+    httpx transport that records upstream traffic to a cassette, or replays it.
+
+    Used for the OpenAI client behind every agent and for the knowledge base and
+    web search clients, so whole chat turns can be replayed offline with recorded
+    (speed 1), accelerated (speed > 1) or no (speed 0) upstream latency.
+    """
+
+    def __init__(self, mode: str, cassette: Cassette, speed: float = 1.0, inner: Optional[httpx.AsyncBaseTransport] = None):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        self.mode = mode
+        self.cassette = cassette
+        self.speed = speed
+        self._inner = inner or (httpx.AsyncHTTPTransport() if mode == "record" else None)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        body = await request.aread()
+        endpoint = _endpoint(request)
+        if self.mode == "replay":
+            return await self._replay(request, endpoint, _body_hash(body))
+
+        started = time.perf_counter()
+        response = await self._inner.handle_async_request(request)
+        interaction = {
+            "request": {
+                "endpoint": endpoint,
+                "body_hash": _body_hash(body),
+                "body": body.decode("utf-8", errors="replace"),
+            },
+            "response": {
+                "status_code": response.status_code,
+                "headers": [[k, v] for k, v in response.headers.multi_items() if k.lower() not in _REDACTED_HEADERS],
+                "headers_at": round(time.perf_counter() - started, 4),
+                "chunks": [],
+            },
+        }
+        return httpx.Response(
+            response.status_code,
+            headers=response.headers,
+            stream=_RecordingStream(response.stream, interaction, started, self.cassette),
+            extensions=response.extensions,
+        )
+
+    async def _replay(self, request: httpx.Request, endpoint: str, body_hash: str) -> httpx.Response:
+        recorded = self.cassette.take(endpoint, body_hash)["response"]
+        if self.speed > 0:
+            await asyncio.sleep(recorded["headers_at"] / self.speed)
+        return httpx.Response(
+            recorded["status_code"],
+            headers=recorded["headers"],
+            stream=_ReplayStream(recorded["chunks"], recorded["headers_at"], self.speed),
+            request=request,
+        )
+
+    async def aclose(self) -> None:
+        if self._inner is not None:
+            await self._inner.aclose()
+
+
+_cassette: Optional[Cassette] = None
+
+
+def get_cassette_transport() -> Optional[CassetteTransport]:
+    """
+    A cassette transport for a new httpx client, None unless CASSETTE_MODE is "record" or "replay".
+
+    Pass it as `transport=` to the client; with None the client uses the default
+    transport. Every client gets its own transport (a client closes its transport
+    on exit) but all of them share the process-wide cassette.
+    """
+    global _cassette
+    if settings.CASSETTE_MODE == "off":
+        return None
+    if _cassette is None:
+        _cassette = Cassette(settings.CASSETTE_PATH)
+        logger.info(f"Cassette {settings.CASSETTE_MODE} mode with {settings.CASSETTE_PATH} ({len(_cassette)} interactions)")
+    return CassetteTransport(settings.CASSETTE_MODE, _cassette, speed=settings.CASSETTE_REPLAY_SPEED)
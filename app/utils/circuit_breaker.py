@@ -0,0 +1,115 @@
+import logging
+import time
+from enum import Enum
+from typing import Callable, Dict
+
+from core.metrics import CIRCUIT_BREAKER_REJECTIONS, CIRCUIT_BREAKER_STATE, CIRCUIT_BREAKER_TRIPS
+
+logger = logging.getLogger(__name__)
+
+
+class BreakerState(str, Enum):
+    CLOSED = "closed"
+    HALF_OPEN = "half_open"
+    OPEN = "open"
+
+
+_STATE_METRIC_VALUE = {
+    BreakerState.CLOSED: 0,
+    BreakerState.HALF_OPEN: 1,
+    BreakerState.OPEN: 2,
+}
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker with exponential backoff between recovery attempts.
+
+    The breaker opens after `failure_threshold` consecutive failures and rejects
+    calls until the reset timeout has passed. It then lets a single trial call
+    through (half-open): success closes the breaker, failure reopens it with the
+    reset timeout doubled, up to `max_reset_timeout`.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 3,
+        reset_timeout: float = 1.0,
+        max_reset_timeout: float = 60.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.base_reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self._clock = clock
+
+        self._state = BreakerState.CLOSED
+        self._failures = 0
+        self._reset_timeout = reset_timeout
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        CIRCUIT_BREAKER_STATE.labels(name).set(0)
+
+    @property
+    def state(self) -> BreakerState:
+        if self._state == BreakerState.OPEN and self._clock() - self._opened_at >= self._reset_timeout:
+            self._set_state(BreakerState.HALF_OPEN)
+        return self._state
+
+    def allow_request(self) -> bool:
+        """Return True if a call may be attempted now."""
+        state = self.state
+        if state == BreakerState.CLOSED:
+            return True
+        if state == BreakerState.HALF_OPEN and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        CIRCUIT_BREAKER_REJECTIONS.labels(self.name).inc()
+        return False
+
+    def record_success(self) -> None:
+        self._failures = 0
+        self._trial_in_flight = False
+        self._reset_timeout = self.base_reset_timeout
+        if self._state != BreakerState.CLOSED:
+            logger.info(f"Circuit breaker '{self.name}' closed")
+            self._set_state(BreakerState.CLOSED)
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        if self._state == BreakerState.HALF_OPEN:
+            # The trial call failed, back off further before the next one
+            self._trial_in_flight = False
+            self._reset_timeout = min(self._reset_timeout * 2, self.max_reset_timeout)
+            self._open()
+        elif self._state == BreakerState.CLOSED and self._failures >= self.failure_threshold:
+            self._open()
+
+    def record_inconclusive(self) -> None:
+        """Forget a call whose outcome says nothing about the upstream (e.g. the caller gave up)."""
+        self._trial_in_flight = False
+
+    def health(self) -> Dict:
+        """Snapshot of the breaker for health checks."""
+        state = self.state
+        retry_in = 0.0
+        if state == BreakerState.OPEN:
+            retry_in = max(0.0, self._reset_timeout - (self._clock() - self._opened_at))
+        return {
+            "name": self.name,
+            "state": state.value,
+            "consecutive_failures": self._failures,
+            "retry_in_seconds": round(retry_in, 3),
+        }
+
+    def _open(self) -> None:
+        self._opened_at = self._clock()
+        self._set_state(BreakerState.OPEN)
+        CIRCUIT_BREAKER_TRIPS.labels(self.name).inc()
+        logger.warning(f"Circuit breaker '{self.name}' opened for {self._reset_timeout:.1f}s after {self._failures} failures")
+
+    def _set_state(self, state: BreakerState) -> None:
+        self._state = state
+        CIRCUIT_BREAKER_STATE.labels(self.name).set(_STATE_METRIC_VALUE[state])
@@ -0,0 +1,148 @@
+import json
+import zlib
+from typing import Any, AsyncIterable, AsyncIterator, Optional
+
+from fastapi.responses import Response, StreamingResponse
+
+from core.config import settings
+from core.metrics import RESPONSE_COMPRESSION_BYTES
+
+try:
+    import brotli
+except ImportError:  # Brotli is optional, gzip is always offered
+    brotli = None
+
+
+def supported_encodings() -> tuple:
+    """Encodings we can produce, in order of preference."""
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """
+    Pick the response encoding from an Accept-Encoding header.
+
+    Args:
+        accept_encoding: The header value, e.g. "gzip, deflate, br;q=0.9"
+
+    Returns:
+        Optional[str]: "br" or "gzip", None when the client accepts neither
+    """
+    if not accept_encoding:
+        return None
+    weights = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        weight = 1.0
+        if params.strip().startswith("q="):
+            try:
+                weight = float(params.strip()[2:])
+            except ValueError:
+                weight = 0.0
+        weights[name.strip().lower()] = weight
+    candidates = [
+        (weights.get(encoding, weights.get("*", 0.0)), -rank, encoding)
+        for rank, encoding in enumerate(supported_encodings())
+    ]
+    weight, _, encoding = max(candidates)
+    return encoding if weight > 0 else None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=settings.COMPRESSION_BROTLI_QUALITY)
+    compressor = zlib.compressobj(settings.COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 31)
+    return compressor.compress(body) + compressor.flush()
+
+
+def json_response(content: Any, accept_encoding: Optional[str] = None, status_code: int = 200) -> Response:
+    """
+    JSON response compressed with the client's preferred encoding when at least COMPRESSION_MIN_BYTES.
+
+    Args:
+        content: JSON-serializable payload
+        accept_encoding: The request's Accept-Encoding header
+        status_code: HTTP status code
+
+    Returns:
+        Response: The (possibly compressed) JSON response
+    """
+    body = json.dumps(content).encode('utf-8')
+    headers = {"Vary": "Accept-Encoding"}
+    encoding = negotiate_encoding(accept_encoding) if len(body) >= settings.COMPRESSION_MIN_BYTES else None
+    if encoding:
+        compressed = compress(body, encoding)
+        RESPONSE_COMPRESSION_BYTES.labels(encoding, "raw").inc(len(body))
+        RESPONSE_COMPRESSION_BYTES.labels(encoding, "compressed").inc(len(compressed))
+        body = compressed
+        headers["Content-Encoding"] = encoding
+    return Response(body, status_code=status_code, media_type='application/json', headers=headers)
+
+
+class FrameCompressor:
+    """
+    Compresses a stream frame by frame, flushing after each frame.
+
+    Every frame is decodable as soon as it arrives while the compression context
+    is kept across frames, so the repeated keys and ids of NDJSON frames compress
+    well without holding frames back.
+    """
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=settings.COMPRESSION_BROTLI_QUALITY)
+        else:
+            self._compressor = zlib.compressobj(settings.COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def frame(self, data: bytes) -> bytes:
+        if self.encoding == "br":
+            return self._compressor.process(data) + self._compressor.flush()
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        if self.encoding == "br":
+            return self._compressor.finish()
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+async def compress_frames(frames: AsyncIterable[bytes], encoding: str) -> AsyncIterator[bytes]:
+    compressor = FrameCompressor(encoding)
+    raw = compressed = 0
+    try:
+        async for data in frames:
+            chunk = compressor.frame(data)
+            raw += len(data)
+            compressed += len(chunk)
+            yield chunk
+        chunk = compressor.finish()
+        compressed += len(chunk)
+        yield chunk
+    finally:
+        RESPONSE_COMPRESSION_BYTES.labels(encoding, "raw").inc(raw)
+        RESPONSE_COMPRESSION_BYTES.labels(encoding, "compressed").inc(compressed)
+
+
+def streaming_response(
+    frames: AsyncIterable[bytes], media_type: str, accept_encoding: Optional[str] = None, compress_stream: bool = False
+) -> StreamingResponse:
+    """
+    Streaming response, compressed frame by frame when the client opted in and accepts an encoding.
+
+    Args:
+        frames: The frames to stream
+        media_type: Media type of the stream
+        accept_encoding: The request's Accept-Encoding header
+        compress_stream: Whether the client opted in to a compressed stream
+
+    Returns:
+        StreamingResponse: The (possibly compressed) stream
+    """
+    encoding = negotiate_encoding(accept_encoding) if compress_stream else None
+    if not encoding:
+        return StreamingResponse(frames, media_type=media_type)
+    return StreamingResponse(
+        compress_frames(frames, encoding),
+        media_type=media_type,
+        headers={"Content-Encoding": encoding, "Vary": "Accept-Encoding"},
+    )
@@ -0,0 +1,97 @@
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import AsyncIterable, AsyncIterator, Optional, TypeVar
+
+from core.config import settings
+from core.context_var import turn_deadline_ctx_var
+
+T = TypeVar("T")
+
+
+class DeadlineExceeded(Exception):
+    """Raised when a stage is skipped because the turn has no time budget left"""
+    pass
+
+
+@dataclass(frozen=True)
+class Deadline:
+    """
+    Absolute end of a chat turn, on the monotonic clock.
+
+    Every stage of the turn derives its timeout from the remaining budget instead
+    of using its own fixed timeout, so a turn cannot take longer than its deadline.
+    """
+
+    expires_at: float
+
+    @classmethod
+    def after(cls, seconds: float) -> "Deadline":
+        return cls(time.monotonic() + seconds)
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def timeout(self, cap: Optional[float] = None, floor: float = 0.0) -> float:
+        """
+        Timeout for one stage: the remaining budget, at most `cap` and at least `floor`.
+
+        A floor lets essential stages (e.g. persisting the turn) run briefly even
+        when the budget is spent.
+        """
+        timeout = self.remaining()
+        if cap is not None:
+            timeout = min(timeout, cap)
+        return max(timeout, floor)
+
+    def scope(self) -> asyncio.Timeout:
+        """
+        asyncio timeout expiring at the deadline, raising TimeoutError in the awaiting task.
+
+        Only for code that does not yield to a client inside the scope, a timeout
+        spanning a `yield` of a streaming generator would cancel the response instead.
+        """
+        loop = asyncio.get_running_loop()
+        return asyncio.timeout_at(loop.time() + self.remaining())
+
+    async def within(self, items: AsyncIterable[T]) -> AsyncIterator[T]:
+        """Iterate `items`, raising TimeoutError when the next item does not arrive before the deadline."""
+        iterator = items.__aiter__()
+        while True:
+            try:
+                async with self.scope():
+                    item = await iterator.__anext__()
+            except StopAsyncIteration:
+                return
+            yield item
+
+
+def turn_deadline(requested: Optional[float] = None) -> Deadline:
+    """
+    Deadline of a new chat turn.
+
+    Args:
+        requested: Budget asked for by the client (X-Turn-Deadline), in seconds
+
+    Returns:
+        Deadline: The requested budget, or TURN_DEADLINE_SECONDS, kept between
+        TURN_MIN_STAGE_SECONDS and TURN_DEADLINE_MAX_SECONDS
+    """
+    seconds = requested if requested is not None else settings.TURN_DEADLINE_SECONDS
+    return Deadline.after(min(max(seconds, settings.TURN_MIN_STAGE_SECONDS), settings.TURN_DEADLINE_MAX_SECONDS))
+
+
+def current_deadline() -> Optional[Deadline]:
+    """Deadline of the turn being handled, None outside a turn."""
+    return turn_deadline_ctx_var.get()
+
+
+def remaining_budget(cap: Optional[float] = None) -> Optional[float]:
+    """Remaining seconds of the current turn capped at `cap`, or `cap` outside a turn."""
+    deadline = current_deadline()
+    if deadline is None:
+        return cap
+    return deadline.timeout(cap)
@@ -0,0 +1,119 @@
+import asyncio
+import time
+from typing import AsyncIterable, AsyncIterator, Callable, Optional, TypeVar
+
+from core.config import settings
+from core.metrics import CHAT_STREAM_BYTES, CHAT_STREAM_FRAMES
+
+T = TypeVar("T")
+
+# Marks that no coalesced snapshot is waiting to be sent
+_NOTHING = object()
+
+
+class FrameScheduler:
+    """
+    Decides which streamed text snapshots of a chat turn are sent as frames.
+
+    The model stream yields the full text so far, so skipped snapshots are simply
+    superseded by the next frame. Frames are spaced by at least 1 / target_fps
+    seconds. The time a frame takes to be sent (the generator resumes only once
+    the server has written it, which waits while the client's socket buffer is
+    full) is tracked as a moving average; the spacing grows to `backpressure_factor`
+    times that send time, up to 1 / min_fps, so slow clients get fewer, larger
+    frames while fast clients keep the target rate.
+    """
+
+    def __init__(
+        self,
+        target_fps: float = settings.STREAM_TARGET_FPS,
+        min_fps: float = settings.STREAM_MIN_FPS,
+        backpressure_factor: float = settings.STREAM_BACKPRESSURE_FACTOR,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.min_interval = 1.0 / target_fps
+        self.max_interval = 1.0 / min_fps
+        self.backpressure_factor = backpressure_factor
+        self.interval = self.min_interval
+        self.send_seconds = 0.0
+        self.frames = 0
+        self.bytes = 0
+        self._clock = clock
+        self._last_frame: Optional[float] = None
+
+    def due(self) -> bool:
+        """Whether the next snapshot should be sent rather than coalesced into a later frame."""
+        return self._last_frame is None or self._clock() - self._last_frame >= self.interval
+
+    def wait_time(self) -> float:
+        """Seconds until the next frame is due, 0 when it already is."""
+        if self._last_frame is None:
+            return 0.0
+        return max(0.0, self._last_frame + self.interval - self._clock())
+
+    async def paced(self, snapshots: AsyncIterable[T]) -> AsyncIterator[T]:
+        """
+        Yield the snapshots to send as frames, coalescing those that arrive too early.
+
+        A coalesced snapshot is sent as soon as its frame is due, without waiting
+        for the next snapshot (which may be seconds away while the model calls a
+        tool), and the last one is always sent when `snapshots` ends. The caller
+        reports each frame it sends with `sent()`.
+
+        Args:
+            snapshots: Cumulative snapshots, e.g. the text of a model stream so far
+
+        Returns:
+            AsyncIterator: The snapshots to send, in order
+        """
+        unsent = _NOTHING
+        arrived = asyncio.Event()
+
+        async def read():
+            nonlocal unsent
+            async for snapshot in snapshots:
+                unsent = snapshot
+                arrived.set()
+
+        # Snapshots are read in one task (a stream's spans start and end in its context),
+        # so the wait for the next one can end when a frame is due
+        reader = asyncio.ensure_future(read())
+        try:
+            while True:
+                if unsent is not _NOTHING and self.due():
+                    snapshot, unsent = unsent, _NOTHING
+                    yield snapshot
+                    continue
+                if reader.done():
+                    break
+                arrived.clear()
+                waiter = asyncio.ensure_future(arrived.wait())
+                timeout = None if unsent is _NOTHING else self.wait_time()
+                await asyncio.wait({reader, waiter}, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                waiter.cancel()
+            # Errors of the snapshots (e.g. the turn deadline) end the stream
+            reader.result()
+            if unsent is not _NOTHING:
+                yield unsent
+        finally:
+            if not reader.done():
+                reader.cancel()
+                await asyncio.wait({reader})
+
+    def sent(self, size: int, send_seconds: float) -> None:
+        """
+        Account a sent frame and adapt the spacing to how long it took to send.
+
+        Args:
+            size: Size of the frame in bytes
+            send_seconds: Time until the server accepted the next frame
+        """
+        self.frames += 1
+        self.bytes += size
+        self._last_frame = self._clock()
+        self.send_seconds = send_seconds if self.frames == 1 else 0.7 * self.send_seconds + 0.3 * send_seconds
+        self.interval = min(self.max_interval, max(self.min_interval, self.backpressure_factor * self.send_seconds))
+
+    def record(self) -> None:
+        CHAT_STREAM_FRAMES.observe(self.frames)
+        CHAT_STREAM_BYTES.observe(self.bytes)
@@ -35,6 +35,8 @@ class PgDatabase:
 
     pool: Pool
     _loop: asyncio.AbstractEventLoop
+    # Cleared once an insert shows the messages table has no usage column
+    _usage_column: bool = True
 
     @classmethod
     @asynccontextmanager
@@ -46,7 +48,8 @@ async def connectToDb(
         password: str = os.getenv('POSTGRES_PASSWORD'),
         database: str = os.getenv('POSTGRES_DATABASE'),
         min_size: int = 2,
-        max_size: int = 10
+        max_size: int = 10,
+        close_timeout: float = 10.0
     ) -> AsyncIterator['PgDatabase']:
         with span('connect to DB'):
             loop = asyncio.get_event_loop()
@@ -70,47 +73,89 @@ async def connectToDb(
                 raise DatabaseError(f"Failed to connect to PostgreSQL: {str(e)}")
             finally:
                 if 'pool' in locals():
-                    await pool.close()
+                    # Close waits for acquired connections to be released, which is bounded on shutdown
+                    try:
+                        await asyncio.wait_for(pool.close(), timeout=close_timeout)
+                    except asyncio.TimeoutError:
+                        logfire.error("Database pool did not close in time, terminating connections")
+                        pool.terminate()
 
     @asynccontextmanager
-    async def _get_connection(self) -> AsyncIterator[Connection]:
+    async def _get_connection(self, timeout: Optional[float] = None) -> AsyncIterator[Connection]:
         """Get a connection from the pool and release it when done."""
-        con = await self.pool.acquire()
+        con = await self.pool.acquire(timeout=timeout)
         try:
             yield con
         finally:
             await self.pool.release(con)
 
-    async def add_messages(self, messages: bytes, conversation_id: str, search_data: Optional[Dict] = None):
-        """Store raw messages without any filtering and update conversation's updated_at timestamp."""
+    async def check_usage_column(self, timeout: float = 5.0) -> bool:
+        """Whether messages has the usage column, logged at startup so a missing migration is noticed."""
+        try:
+            async with self._get_connection(timeout) as con:
+                found = await con.fetchval(
+                    "SELECT EXISTS (SELECT 1 FROM information_schema.columns WHERE table_name = 'messages' AND column_name = 'usage');",
+                    timeout=timeout
+                )
+        except Exception as e:
+            logfire.warning("Could not check for the messages.usage column", error=str(e))
+            return self._usage_column
+        if not found:
+            logfire.warning("messages.usage column is missing, turns are stored without usage (apply migrations/001_messages_usage.sql)")
+        self._usage_column = bool(found)
+        return self._usage_column
+
+    async def add_messages(self, messages: bytes, conversation_id: str, search_data: Optional[Dict] = None, timeout: Optional[float] = None, usage: Optional[Dict] = None):
+        """
+        Store raw messages without any filtering and update conversation's updated_at timestamp.
+        
+        `timeout` bounds each database operation, in seconds (the pool's command timeout when None).
+        `usage` is the turn's token usage per agent, stored in the `usage` jsonb column
+        added by migrations/001_messages_usage.sql; without that column the messages
+        are stored without usage.
+        """
         try:
             # Convert bytes to string and parse JSON
             messages_str = messages.decode('utf-8')
             messages_list = json.loads(messages_str)
             
-            async with self._get_connection() as con:
+            async with self._get_connection(timeout) as con:
+                columns = ['message_list', 'conversation_id']
+                values = [json.dumps(messages_list), conversation_id]
                 # Insert with search_data if present
                 if search_data:
-                    await con.execute(
-                        'INSERT INTO messages (message_list, conversation_id, search_data) VALUES ($1, $2, $3);',
-                        json.dumps(messages_list), conversation_id, json.dumps(search_data)
-                    )
+                    columns.append('search_data')
+                    values.append(json.dumps(search_data))
+                if usage and self._usage_column:
+                    try:
+                        await self._insert_message(con, columns + ['usage'], values + [json.dumps(usage)], timeout)
+                    except asyncpg.exceptions.UndefinedColumnError:
+                        logfire.warning("messages.usage column is missing, storing turns without usage (apply migrations/001_messages_usage.sql)")
+                        self._usage_column = False
+                        await self._insert_message(con, columns, values, timeout)
                 else:
-                    await con.execute(
-                        'INSERT INTO messages (message_list, conversation_id) VALUES ($1, $2);',
-                        json.dumps(messages_list), conversation_id
-                    )
+                    await self._insert_message(con, columns, values, timeout)
                 
                 # Update the conversation's updated_at timestamp
                 await con.execute(
                     'UPDATE conversations SET updated_at = NOW() WHERE id = $1;',
-                    conversation_id
+                    conversation_id,
+                    timeout=timeout
                 )
         except json.JSONDecodeError as e:
             raise DatabaseError(f"Invalid JSON format in messages: {str(e)}")
         except Exception as e:
             raise DatabaseError(f"Failed to add messages: {str(e)}")
 
+    @staticmethod
+    async def _insert_message(con: Connection, columns: List[str], values: List[Any], timeout: Optional[float]) -> None:
+        placeholders = ', '.join(f'${i}' for i in range(1, len(values) + 1))
+        await con.execute(
+            f'INSERT INTO messages ({", ".join(columns)}) VALUES ({placeholders});',
+            *values,
+            timeout=timeout
+        )
+
     async def get_chat_messages(self, conversation_id: str) -> List[Dict]:
         """Get chat messages with metadata interleaved chronologically."""
         try:
@@ -179,24 +224,27 @@ async def get_chat_messages(self, conversation_id: str) -> List[Dict]:
         except Exception as e:
             raise DatabaseError(f"Failed to retrieve chat messages: {str(e)}")
     
-    async def get_messages(self, conversation_id: str, limit: int = 5) -> List[ModelMessage]:
+    async def get_messages(self, conversation_id: str, limit: int = 5, timeout: Optional[float] = None) -> List[ModelMessage]:
         """
         Get the most recent message exchanges in chronological order.
         If total messages > limit, always includes the first message along with recent messages.
+        `timeout` bounds each database operation, in seconds (the pool's command timeout when None).
         """
         try:
-            async with self._get_connection() as con:
+            async with self._get_connection(timeout) as con:
                 # First, get the total count of messages for this conversation
                 total_count = await con.fetchval(
                     'SELECT COUNT(*) FROM messages WHERE conversation_id = $1',
-                    conversation_id
+                    conversation_id,
+                    timeout=timeout
                 )
 
                 if total_count <= limit:
                     # If total messages are within limit, fetch all messages
                     rows = await con.fetch(
                         'SELECT message_list FROM messages WHERE conversation_id = $1 ORDER BY created_at ASC',
-                        conversation_id
+                        conversation_id,
+                        timeout=timeout
                     )
                 else:
                     # If total messages exceed limit, get first message and recent messages
@@ -228,7 +276,8 @@ async def get_messages(self, conversation_id: str, limit: int = 5) -> List[Model
                         ORDER BY created_at ASC
                         ''',
                         conversation_id,
-                        limit - 1  # Reduce limit by 1 to account for first message
+                        limit - 1,  # Reduce limit by 1 to account for first message
+                        timeout=timeout
                     )
 
             messages: List[ModelMessage] = []
@@ -240,7 +289,7 @@ async def get_messages(self, conversation_id: str, limit: int = 5) -> List[Model
                     )
                     messages.extend(validated_messages)
                 except Exception as e:
-                    print(f"Error processing message: {str(e)}")
+                    logfire.warning("Error processing message", error=str(e))
                     continue
 
             return messages
@@ -262,6 +311,31 @@ async def get_conversation_ids(self, user_id: str) -> List[Dict]:
         except Exception as e:
             raise DatabaseError(f"Failed to retrieve conversation IDs: {str(e)}")
 
+    async def get_conversation_user_id(self, conversation_id: str, timeout: Optional[float] = None) -> Optional[str]:
+        """
+        Get the id of the user a conversation belongs to.
+        
+        Args:
+            conversation_id: The UUID of the conversation
+            timeout: Bound for acquiring a connection and for the query, in seconds
+            
+        Returns:
+            Optional[str]: The user's UUID, None if the conversation does not exist
+            
+        Raises:
+            DatabaseError: If the database operation fails
+        """
+        try:
+            async with self._get_connection(timeout) as con:
+                user_id = await con.fetchval(
+                    'SELECT user_id FROM conversations WHERE id = $1',
+                    conversation_id,
+                    timeout=timeout
+                )
+            return str(user_id) if user_id else None
+        except Exception as e:
+            raise DatabaseError(f"Failed to retrieve conversation owner: {str(e)}")
+
     async def create_conversation(self, user_id: str) -> str:
         """
         Create a new conversation for a user and return the conversation ID.
@@ -316,13 +390,14 @@ async def delete_conversation(self, conversation_id: str) -> bool:
                 raise e
             raise DatabaseError(f"Failed to delete conversation: {str(e)}")
 
-    async def update_conversation_title(self, conversation_id: str, title: str) -> bool:
+    async def update_conversation_title(self, conversation_id: str, title: str, timeout: Optional[float] = None) -> bool:
         """
         Update the title of a conversation.
         
         Args:
             conversation_id: The UUID of the conversation
             title: The new title for the conversation
+            timeout: Bound for the database operation in seconds (the pool's command timeout when None)
             
         Returns:
             bool: True if the title was successfully updated
@@ -331,10 +406,11 @@ async def update_conversation_title(self, conversation_id: str, title: str) -> b
             DatabaseError: If the database operation fails
         """
         try:
-            async with self._get_connection() as con:
+            async with self._get_connection(timeout) as con:
                 result = await con.execute(
                     'UPDATE conversations SET title = $1 WHERE id = $2;',
-                    title, conversation_id
+                    title, conversation_id,
+                    timeout=timeout
                 )
                 
                 # Check if any rows were affected
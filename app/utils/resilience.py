@@ -0,0 +1,187 @@
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, List, Optional, TypeVar
+
+from app.utils.circuit_breaker import CircuitBreaker
+from core.config import settings
+from core.metrics import UPSTREAM_HEDGES, UPSTREAM_LATENCY, UPSTREAM_TIMEOUTS
+
+T = TypeVar("T")
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream whose circuit breaker is open"""
+    pass
+
+
+class LatencyTracker:
+    """Rolling window of recent latencies with percentile lookups."""
+
+    def __init__(self, window: int = 200):
+        self._samples: Deque[float] = deque(maxlen=window)
+
+    def record(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def percentile(self, p: float) -> Optional[float]:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+
+class ResilientUpstream:
+    """
+    Hedged, circuit-broken calls to one upstream service with adaptive timeouts.
+
+    Once enough latencies have been observed, a request still pending after the
+    upstream's p95 latency gets a duplicate ("hedge") and whichever finishes first
+    wins; the loser is cancelled. The overall timeout follows the observed p99
+    latency times a multiplier, bounded by the configured minimum and maximum.
+    Until `min_samples` latencies are known, calls use the maximum timeout and are
+    not hedged. Repeated failures open the upstream's circuit breaker, after which
+    calls fail immediately with `CircuitOpenError`.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        hedging: bool = settings.UPSTREAM_HEDGING_ENABLED,
+        min_timeout: float = settings.UPSTREAM_MIN_TIMEOUT,
+        max_timeout: float = settings.UPSTREAM_MAX_TIMEOUT,
+        timeout_multiplier: float = settings.UPSTREAM_TIMEOUT_MULTIPLIER,
+        min_samples: int = settings.UPSTREAM_MIN_SAMPLES,
+        window: int = settings.UPSTREAM_LATENCY_WINDOW,
+    ):
+        self.name = name
+        self.hedging = hedging
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.timeout_multiplier = timeout_multiplier
+        self.min_samples = min_samples
+        self.latencies = LatencyTracker(window)
+        self.breaker = CircuitBreaker(
+            name,
+            failure_threshold=settings.UPSTREAM_BREAKER_FAILURE_THRESHOLD,
+            reset_timeout=settings.UPSTREAM_BREAKER_RESET_TIMEOUT,
+            max_reset_timeout=settings.UPSTREAM_BREAKER_MAX_RESET_TIMEOUT,
+        )
+
+    def timeout(self) -> float:
+        """Current overall timeout for a call, in seconds."""
+        p99 = self.latencies.percentile(0.99)
+        if p99 is None or len(self.latencies) < self.min_samples:
+            return self.max_timeout
+        return min(self.max_timeout, max(self.min_timeout, p99 * self.timeout_multiplier))
+
+    def hedge_delay(self) -> Optional[float]:
+        """Delay after which a duplicate request is sent, None when hedging is off."""
+        if not self.hedging or len(self.latencies) < self.min_samples:
+            return None
+        return self.latencies.percentile(0.95)
+
+    async def call(
+        self,
+        request: Callable[[float], Awaitable[T]],
+        is_failure: Optional[Callable[[T], bool]] = None,
+        timeout: Optional[float] = None,
+    ) -> T:
+        """
+        Run `request` under the upstream's breaker, hedging and timeout.
+
+        Args:
+            request: Starts one attempt; receives the seconds left for it
+            is_failure: Marks a returned result (e.g. a 5xx response) as a failure
+                for the breaker; the result is still returned to the caller
+            timeout: Upper bound for this call, e.g. the turn's remaining budget
+
+        Returns:
+            The result of the first attempt to succeed
+
+        Raises:
+            CircuitOpenError: The breaker is open, the upstream was not called
+            asyncio.TimeoutError: No attempt finished within the timeout
+            Exception: The error of the last failed attempt
+        """
+        if not self.breaker.allow_request():
+            raise CircuitOpenError(f"Circuit breaker for '{self.name}' is open")
+
+        call_timeout = self.timeout()
+        capped_by_caller = timeout is not None and timeout < call_timeout
+        if capped_by_caller:
+            call_timeout = timeout
+        started = time.perf_counter()
+        attempts: List[asyncio.Task] = []
+        # Recorded on every exit, so a half-open trial is always released
+        outcome = None
+        try:
+            result, hedge_won = await self._first_success(request, call_timeout, attempts)
+        except asyncio.TimeoutError:
+            UPSTREAM_TIMEOUTS.labels(self.name).inc()
+            # A caller running out of budget says nothing about the upstream's health
+            outcome = "inconclusive" if capped_by_caller else "failure"
+            raise
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            outcome = "failure"
+            raise
+        else:
+            if hedge_won:
+                UPSTREAM_HEDGES.labels(self.name, "won").inc()
+            if is_failure is not None and is_failure(result):
+                outcome = "failure"
+            else:
+                elapsed = time.perf_counter() - started
+                self.latencies.record(elapsed)
+                UPSTREAM_LATENCY.labels(self.name).observe(elapsed)
+                outcome = "success"
+            return result
+        finally:
+            for attempt in attempts:
+                if not attempt.done():
+                    attempt.cancel()
+            if outcome == "success":
+                self.breaker.record_success()
+            elif outcome == "failure":
+                self.breaker.record_failure()
+            else:
+                # Cancelled (e.g. federated search past its deadline) or an unclassified error
+                self.breaker.record_inconclusive()
+
+    async def _first_success(self, request: Callable[[float], Awaitable[Any]], call_timeout: float, attempts: List[asyncio.Task]):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + call_timeout
+        hedge_at = None
+        hedge_delay = self.hedge_delay()
+        if hedge_delay is not None:
+            hedge_at = loop.time() + hedge_delay
+
+        attempts.append(asyncio.create_task(request(call_timeout)))
+        pending = set(attempts)
+        last_error: Optional[BaseException] = None
+        while pending:
+            now = loop.time()
+            if now >= deadline:
+                raise asyncio.TimeoutError(f"'{self.name}' did not respond within {call_timeout:.1f}s")
+            wait_until = deadline if hedge_at is None else min(deadline, hedge_at)
+            done, pending = await asyncio.wait(pending, timeout=max(0.0, wait_until - now), return_when=asyncio.FIRST_COMPLETED)
+
+            for attempt in done:
+                if attempt.exception() is None:
+                    return attempt.result(), attempt is not attempts[0]
+                last_error = attempt.exception()
+
+            if not done and hedge_at is not None and loop.time() >= hedge_at:
+                # The primary is slower than usual, race a duplicate against it
+                hedge_at = None
+                hedge = asyncio.create_task(request(max(0.0, deadline - loop.time())))
+                attempts.append(hedge)
+                pending.add(hedge)
+                UPSTREAM_HEDGES.labels(self.name, "sent").inc()
+
+        raise last_error
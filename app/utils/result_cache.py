@@ -0,0 +1,92 @@
+import hashlib
+import json
+import logging
+import re
+from typing import Any, Optional
+
+from cachetools import TTLCache
+
+from app.utils.redis_utils import get_many_json, set_many_json
+from core.metrics import RESULT_CACHE_HITS, RESULT_CACHE_MISSES
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_query(query: str) -> str:
+    """Normalize a search query so trivially different phrasings share a cache entry."""
+    return _WHITESPACE_RE.sub(" ", query.strip().lower()).rstrip("?.! ")
+
+
+def fingerprint(value: Any) -> str:
+    """Short stable hash of a JSON serializable value."""
+    return hashlib.sha1(json.dumps(value, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+class ResultCache:
+    """
+    Two-tier cache for upstream query results.
+
+    The first tier is an in-process `TTLCache` bounded by size and age. The optional
+    second tier is Redis, shared by every worker. Entries are namespaced by a version
+    string: changing the version (e.g. when the underlying document set changes)
+    clears the local tier and makes every Redis entry of the old version unreachable.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        maxsize: int = 1024,
+        ttl: float = 3600,
+        use_redis: bool = False,
+        redis_ttl: Optional[int] = None,
+    ):
+        self.name = name
+        self.ttl = ttl
+        self.use_redis = use_redis
+        self.redis_ttl = redis_ttl or int(ttl)
+        self.version = ""
+        self._local: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def set_version(self, version: str) -> None:
+        """Switch the cache namespace, dropping local entries if the version changed."""
+        if version != self.version:
+            if self.version:
+                logger.info(f"Result cache '{self.name}' invalidated ({self.version} -> {version})")
+            self._local.clear()
+            self.version = version
+
+    def make_key(self, *parts: Any) -> str:
+        return fingerprint(parts)
+
+    async def get(self, key: str) -> Optional[Any]:
+        value = self._local.get(key)
+        if value is not None:
+            RESULT_CACHE_HITS.labels(self.name, "local").inc()
+            return value
+
+        if self.use_redis:
+            redis_key = self._redis_key(key)
+            value = (await get_many_json([redis_key])).get(redis_key)
+            if value is not None:
+                RESULT_CACHE_HITS.labels(self.name, "redis").inc()
+                self._local[key] = value
+                return value
+
+        RESULT_CACHE_MISSES.labels(self.name).inc()
+        return None
+
+    async def set(self, key: str, value: Any) -> None:
+        self._local[key] = value
+        if self.use_redis:
+            await set_many_json({self._redis_key(key): value}, ttl=self.redis_ttl)
+
+    def clear(self) -> None:
+        self._local.clear()
+
+    def __len__(self) -> int:
+        return len(self._local)
+
+    def _redis_key(self, key: str) -> str:
+        return f"cache:{self.name}:{self.version}:{key}"
@@ -1,58 +1,123 @@
-import json
-import datetime
-from typing import List, Dict, Set, Optional
-from pydantic_ai.messages import ModelResponse
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional
+from pydantic_ai.messages import ModelMessage
+from app.services.agents.tools.compaction import extract_knowledge_results
 
-def extract_search_data(messages: List[ModelResponse]) -> Optional[Dict]:
+
+@dataclass
+class ToolCallRecord:
+    """One tool call of a run and, once it arrives, its return."""
+    tool_call_id: str
+    tool_name: str
+    args: Dict[str, Any]
+    status: str = "pending"  # "pending", "returned" or "retry"
+    content: Any = None
+
+
+def _collect_knowledge_results(record: ToolCallRecord, search_data: Dict) -> None:
+    if isinstance(record.content, dict) and "error" not in record.content:
+        results = extract_knowledge_results(record.content)
+        if results:
+            search_data.setdefault("knowledge_results", []).extend(results)
+
+
+def _collect_web_search(record: ToolCallRecord, search_data: Dict) -> None:
+    # The answer text already reached the model; only the sources are kept for the UI
+    if isinstance(record.content, dict) and record.content.get("sources"):
+        search_data.setdefault("sources", []).extend(record.content["sources"])
+
+
+def _collect_federated_search(record: ToolCallRecord, search_data: Dict) -> None:
+    _collect_knowledge_results(record, search_data)
+    _collect_web_search(record, search_data)
+
+
+# How the return of each tool contributes to search_data; tools not listed only
+# appear in "tool_calls"
+RETURN_COLLECTORS: Dict[str, Callable[[ToolCallRecord, Dict], None]] = {
+    "knowledge_base_search": _collect_knowledge_results,
+    "web_search": _collect_web_search,
+    "federated_search": _collect_federated_search,
+}
+
+
+class ToolCallIndex:
     """
-    Extract search data from a list of messages, including filter parameters and knowledge base results.
-    
+    Single-pass index of the tool calls and returns of an agent run.
+
+    Calls are keyed by `tool_call_id`, so matching a return to its call is a dict
+    lookup instead of a rescan of the messages. `update` can be called repeatedly
+    with the run's growing message list (e.g. while the response streams); it only
+    visits messages it has not seen yet and folds each return into `search_data`
+    as it arrives.
+    """
+
+    def __init__(self) -> None:
+        self.calls: Dict[str, ToolCallRecord] = {}
+        self.search_data: Dict[str, Any] = {}
+        self._seen = 0
+        self._unanswered: Dict[str, List[str]] = {}
+
+    def update(self, messages: List[ModelMessage]) -> "ToolCallIndex":
+        """Index the messages appended since the previous update."""
+        for message in messages[self._seen:]:
+            self._index_parts(message.parts)
+        self._seen = max(self._seen, len(messages))
+        return self
+
+    def _index_parts(self, parts: Iterable[Any]) -> None:
+        for part in parts:
+            if part.part_kind == 'tool-call':
+                # Some models omit call ids, fall back to a positional key
+                call_id = part.tool_call_id or f"{part.tool_name}:{len(self.calls)}"
+                self.calls[call_id] = ToolCallRecord(call_id, part.tool_name, part.args_as_dict())
+                self._unanswered.setdefault(part.tool_name, []).append(call_id)
+                if "filter_params" not in self.search_data:
+                    self.search_data["filter_params"] = {**part.args_as_dict(), "filter_type": part.tool_name}
+            elif part.part_kind in ('tool-return', 'retry-prompt') and part.tool_name:
+                record = self._match(part.tool_call_id, part.tool_name)
+                if record is None:
+                    continue
+                if part.part_kind == 'retry-prompt':
+                    record.status = "retry"
+                    continue
+                record.status = "returned"
+                record.content = part.content
+                collector = RETURN_COLLECTORS.get(record.tool_name)
+                if collector:
+                    collector(record, self.search_data)
+
+    def _match(self, tool_call_id: Optional[str], tool_name: str) -> Optional[ToolCallRecord]:
+        unanswered = self._unanswered.get(tool_name, [])
+        if tool_call_id in self.calls:
+            if tool_call_id in unanswered:
+                unanswered.remove(tool_call_id)
+            return self.calls[tool_call_id]
+        # Without an id, a return answers the oldest unanswered call of its tool
+        return self.calls[unanswered.pop(0)] if unanswered else None
+
+    def get_search_data(self) -> Optional[Dict]:
+        """The search data built so far, None if the run made no tool calls."""
+        if not self.calls:
+            return None
+        return {
+            **self.search_data,
+            "tool_calls": [
+                {"tool_name": record.tool_name, "args": record.args, "status": record.status}
+                for record in self.calls.values()
+            ],
+        }
+
+
+def extract_search_data(messages: List[ModelMessage]) -> Optional[Dict]:
+    """
+    Extract search data from a list of messages, including filter parameters and tool results.
+
     Args:
         messages: List of messages from the agent run
-        
+
     Returns:
-        Dictionary containing filter_type, filter_params, and results if a search was performed,
-        None otherwise.
+        Dictionary with the first call's filter_params, every call in tool_calls and the
+        results collected from their returns, or None if no tool was called.
     """
-    filter_data = None
-    knowledge_results = []
-    
-    # Find the successful tool call and its corresponding return
-    tool_call_id = None
-    for message in messages:
-        for part in message.parts:
-            if part.part_kind == 'tool-call':
-                filter_data = part.args_as_dict()
-                filter_data['filter_type'] = part.tool_name
-                if filter_data['filter_type'] != 'web_search':
-                    tool_call_id = part.tool_call_id
-                break
-        
-        # Find the tool return in subsequent messages
-        if tool_call_id:
-            for msg in messages:
-                for part in msg.parts:
-                    if part.part_kind == 'tool-return' and part.tool_call_id == tool_call_id:
-                        response_content = part.content
-                        
-                        # Handle knowledge base search results
-                        if filter_data['filter_type'] == 'knowledge_base_search':
-                            if 'results' in response_content:
-                                knowledge_results = response_content['results']
-                            elif 'documents' in response_content:
-                                knowledge_results = response_content['documents']
-                            elif 'content' in response_content:
-                                knowledge_results = [{"content": response_content['content']}]
-    
-    if filter_data:
-        result_data = {
-            "filter_params": filter_data
-        }
-        
-        # Add appropriate results based on filter type
-        if filter_data['filter_type'] == 'knowledge_base_search' and knowledge_results:
-            result_data["knowledge_results"] = knowledge_results
-        
-        return result_data
-    
-    return None
+    return ToolCallIndex().update(messages).get_search_data()
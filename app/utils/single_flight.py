@@ -0,0 +1,45 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable, Set
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """
+    Deduplicate concurrent calls that share a key.
+
+    The first caller for a key starts the upstream call; callers arriving while it
+    is still running await the same result instead of issuing their own request.
+    The upstream call runs as its own task, so a caller that is cancelled (e.g. a
+    client disconnecting) does not cancel it for everyone else.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._in_flight: Dict[Hashable, asyncio.Task] = {}
+        self._background: Set[asyncio.Task] = set()
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.create_task(fn())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        return await asyncio.shield(task)
+
+    def do_in_background(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> None:
+        """Start (or join) the call for a key without waiting for its result."""
+        if key in self._in_flight:
+            return
+        task = asyncio.create_task(self.do(key, fn))
+        self._background.add(task)
+        task.add_done_callback(self._on_background_done)
+
+    def in_flight(self, key: Hashable) -> bool:
+        return key in self._in_flight
+
+    def _on_background_done(self, task: asyncio.Task) -> None:
+        self._background.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Background call in '{self.name}' failed: {task.exception()}")
@@ -0,0 +1,107 @@
+import json
+from typing import Any, List
+
+import logfire
+from pydantic_ai.messages import ModelMessage
+
+from app.services.agents.tools.compaction import extract_knowledge_results
+from app.utils.text_utils import estimate_tokens, truncate_to_tokens
+from core.config import settings
+from core.metrics import TRANSCRIPT_TOKENS
+
+
+def _summarize_args(args: dict, max_tokens: int) -> str:
+    rendered = ", ".join(f"{name}={json.dumps(value, ensure_ascii=False, default=str)}" for name, value in args.items())
+    return truncate_to_tokens(rendered, max_tokens)
+
+
+def _summarize_return(content: Any, max_tokens: int) -> str:
+    if isinstance(content, dict):
+        if "error" in content:
+            return f"error: {content.get('message') or content['error']}"
+        results = extract_knowledge_results(content)
+        if results:
+            first = results[0].get("content", "") if isinstance(results[0], dict) else results[0]
+            return truncate_to_tokens(f"{len(results)} results, e.g. {first}", max_tokens)
+        if "message" in content:
+            return truncate_to_tokens(str(content["message"]), max_tokens)
+    text = content if isinstance(content, str) else json.dumps(content, ensure_ascii=False, default=str)
+    return truncate_to_tokens(text, max_tokens)
+
+
+def _render_message(message: ModelMessage, tool_tokens: int) -> List[str]:
+    lines = []
+    for part in message.parts:
+        if part.part_kind == 'user-prompt':
+            lines.append(f"User: {part.content}")
+        elif part.part_kind == 'text':
+            lines.append(f"Assistant: {part.content}")
+        elif part.part_kind == 'tool-call':
+            lines.append(f"[Tool call] {part.tool_name}({_summarize_args(part.args_as_dict(), tool_tokens)})")
+        elif part.part_kind == 'tool-return':
+            lines.append(f"[Tool result] {part.tool_name}: {_summarize_return(part.content, tool_tokens)}")
+        # System prompts and retry prompts carry nothing the auxiliary agents need
+    return lines
+
+
+def build_transcript(
+    messages: List[ModelMessage],
+    token_budget: int = settings.TRANSCRIPT_TOKEN_BUDGET,
+    tool_summary_tokens: int = settings.TRANSCRIPT_TOOL_SUMMARY_TOKENS,
+) -> str:
+    """
+    Render an agent run as a compact plain-text dialogue.
+
+    User and assistant text is kept as is, tool calls and returns are reduced to
+    one-line summaries of at most `tool_summary_tokens`. When the dialogue exceeds
+    `token_budget`, the oldest lines are dropped first, and the newest line is
+    truncated if it alone does not fit.
+
+    Args:
+        messages: Messages of the run (e.g. `result.new_messages()`)
+        token_budget: Maximum estimated tokens of the transcript
+        tool_summary_tokens: Maximum estimated tokens of each tool summary
+
+    Returns:
+        str: The transcript, one line per message part
+    """
+    lines = [line for message in messages for line in _render_message(message, tool_summary_tokens)]
+    kept: List[str] = []
+    used = 0
+    for line in reversed(lines):
+        tokens = estimate_tokens(line) + 1
+        if used + tokens > token_budget:
+            if not kept:
+                kept.append(truncate_to_tokens(line, token_budget))
+            break
+        kept.append(line)
+        used += tokens
+    omitted = len(lines) - len(kept)
+    if omitted:
+        kept.append(f"[{omitted} earlier lines omitted]")
+    return "\n".join(reversed(kept))
+
+
+def transcript_for_agent(agent_name: str, messages: List[ModelMessage], raw_json: bytes) -> str:
+    """
+    Build the transcript for an auxiliary agent and report its size against the raw message JSON.
+
+    Args:
+        agent_name: Label of the agent for metrics and logs
+        messages: Messages of the run
+        raw_json: The message JSON the agent would otherwise receive
+
+    Returns:
+        str: The compact transcript
+    """
+    transcript = build_transcript(messages)
+    # Estimated from the byte length, the JSON is never decoded just to be measured
+    raw_tokens = (len(raw_json) + 3) // 4
+    compact_tokens = estimate_tokens(transcript)
+    TRANSCRIPT_TOKENS.labels(agent_name, "raw").observe(raw_tokens)
+    TRANSCRIPT_TOKENS.labels(agent_name, "compact").observe(compact_tokens)
+    logfire.info(
+        "Transcript for {agent}: {raw_tokens} -> {compact_tokens} tokens",
+        agent=agent_name, raw_tokens=raw_tokens, compact_tokens=compact_tokens
+    )
+    return transcript
@@ -0,0 +1,171 @@
+from __future__ import annotations as _annotations
+
+import logging
+import time
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+from cachetools import TTLCache
+from pydantic_ai.usage import Usage
+
+from app.utils.redis_utils import get_many_json, incr_counter, incr_counters
+from core.config import settings
+from core.metrics import TURN_TOKENS
+
+if TYPE_CHECKING:
+    from app.utils.pg_utils import PgDatabase
+
+logger = logging.getLogger(__name__)
+
+
+def usage_to_dict(usage: Usage) -> Dict[str, int]:
+    """Flatten a pydantic-ai `Usage` into the counts stored with a turn."""
+    return {
+        "requests": usage.requests,
+        "request_tokens": usage.request_tokens or 0,
+        "response_tokens": usage.response_tokens or 0,
+        "total_tokens": usage.total_tokens or 0,
+        "cached_tokens": (usage.details or {}).get("cached_tokens", 0),
+    }
+
+
+class TurnUsage:
+    """Token usage of one chat turn, per agent."""
+
+    def __init__(self) -> None:
+        self.agents: Dict[str, Dict[str, int]] = {}
+
+    def add(self, agent_name: str, usage: Usage) -> None:
+        self.agents[agent_name] = usage_to_dict(usage)
+
+    @property
+    def total_tokens(self) -> int:
+        return sum(agent["total_tokens"] for agent in self.agents.values())
+
+    def as_dict(self) -> Dict:
+        return {"agents": self.agents, "total_tokens": self.total_tokens}
+
+    def record(self) -> None:
+        TURN_TOKENS.observe(self.total_tokens)
+
+
+class TokenReservation:
+    """Tokens held for a running turn, settled against what the turn actually used."""
+
+    def __init__(self, budget: UserTokenBudget, user_id: str, key: str, tokens: int):
+        self.budget = budget
+        self.user_id = user_id
+        self.key = key
+        self.tokens = tokens
+
+    async def settle(self, tokens_used: int) -> None:
+        """Replace the reserved tokens with the turn's usage, in the bucket they were reserved in."""
+        await self.budget._add(self.user_id, self.key, tokens_used - self.tokens)
+        self.tokens = tokens_used
+
+
+class UserTokenBudget:
+    """
+    Rolling per-user token budget backed by Redis counters.
+
+    Usage is counted in buckets of USER_TOKEN_BUDGET_BUCKET_SECONDS under
+    `usage:{user_id}:{bucket}`; the spend over the window is the sum of the buckets
+    it covers, read with a single MGET. Each turn reserves `turn_reserve` tokens
+    before it runs and settles the difference when it ends, so concurrent turns count
+    against each other and a nearly spent budget admits no new turn. Budgets fail open:
+    when Redis is unavailable, turns are allowed and not counted.
+    """
+
+    def __init__(
+        self,
+        limit: int = settings.USER_TOKEN_BUDGET,
+        window: int = settings.USER_TOKEN_BUDGET_WINDOW_SECONDS,
+        bucket: int = settings.USER_TOKEN_BUDGET_BUCKET_SECONDS,
+        turn_reserve: int = settings.USER_TOKEN_BUDGET_TURN_RESERVE,
+    ):
+        self.limit = limit
+        self.window = window
+        self.bucket = bucket
+        self.turn_reserve = turn_reserve
+
+    @property
+    def enabled(self) -> bool:
+        return self.limit > 0
+
+    def _keys(self, user_id: str) -> List[str]:
+        current = int(time.time()) // self.bucket
+        return [f"usage:{user_id}:{b}" for b in range(current - self.window // self.bucket + 1, current + 1)]
+
+    async def spent(self, user_id: str) -> int:
+        """Tokens the user spent (or holds for running turns) over the rolling window."""
+        values = await get_many_json(self._keys(user_id))
+        return sum(int(v) for v in values.values())
+
+    async def remaining(self, user_id: str) -> Optional[int]:
+        """Tokens left in the user's budget, None when budgets are disabled."""
+        if not self.enabled:
+            return None
+        return max(0, self.limit - await self.spent(user_id))
+
+    async def reserve(self, user_id: str) -> Optional[TokenReservation]:
+        """
+        Hold `turn_reserve` tokens for a turn about to run.
+
+        The reservation is added to the current bucket with one atomic increment
+        whose result decides, so of several turns starting at once, only those
+        the budget can cover are admitted.
+
+        Returns:
+            Optional[TokenReservation]: The reservation to settle when the turn ends,
+            None when the budget cannot cover another turn
+        """
+        keys = self._keys(user_id)
+        if not self.enabled:
+            return TokenReservation(self, user_id, keys[-1], 0)
+        earlier = await get_many_json(keys[:-1])
+        current = await incr_counter(keys[-1], self.turn_reserve, ttl=self.window + self.bucket)
+        if current is None:
+            logger.warning(f"Token budget of user {user_id} is unavailable, the turn runs unreserved")
+            return TokenReservation(self, user_id, keys[-1], 0)
+        if sum(int(v) for v in earlier.values()) + current > self.limit:
+            await self._add(user_id, keys[-1], -self.turn_reserve)
+            return None
+        return TokenReservation(self, user_id, keys[-1], self.turn_reserve)
+
+    async def charge(self, user_id: str, tokens: int) -> None:
+        """Add a turn's tokens to the user's current bucket."""
+        if tokens > 0:
+            await self._add(user_id, self._keys(user_id)[-1], tokens)
+
+    async def _add(self, user_id: str, key: str, tokens: int) -> bool:
+        if not self.enabled or tokens == 0:
+            return True
+        if not await incr_counters({key: tokens}, ttl=self.window + self.bucket):
+            logger.warning(f"Token usage of user {user_id} was not counted")
+            return False
+        return True
+
+
+# Conversation owners never change, so lookups for budget checks are cached
+_conversation_owners: TTLCache = TTLCache(maxsize=10000, ttl=3600)
+
+
+async def get_conversation_owner(database: PgDatabase, conversation_id: str, timeout: Optional[float] = None) -> Optional[str]:
+    """
+    User id of a conversation, from the cache or the database.
+
+    Budgets fail open: when the lookup fails or times out, the error is logged and
+    None is returned, so the turn runs without a budget check.
+    """
+    if conversation_id not in _conversation_owners:
+        try:
+            user_id = await database.get_conversation_user_id(conversation_id, timeout=timeout)
+        except Exception as e:
+            logger.warning(f"Could not look up the owner of conversation {conversation_id}, skipping its budget check: {str(e)}")
+            return None
+        if user_id is None:
+            return None
+        _conversation_owners[conversation_id] = user_id
+    return _conversation_owners[conversation_id]
+
+
+user_token_budget = UserTokenBudget()
@@ -1,7 +1,19 @@
-from openai import AsyncOpenAI
-from pydantic_ai.models.openai import OpenAIModel
+from __future__ import annotations as _annotations
+
+from httpx import AsyncClient
+from pydantic_ai.usage import Usage
+import logging
 import os
+import time
+from typing import TYPE_CHECKING, Dict, Optional
 from dotenv import load_dotenv
+from core.config import settings
+from core.metrics import AGENT_RUN_SECONDS, AGENT_TOKENS
+
+if TYPE_CHECKING:
+    from pydantic_ai.models.openai import OpenAIModel
+
+logger = logging.getLogger(__name__)
 
 # Load environment variables
 load_dotenv()
@@ -21,12 +33,55 @@
 #         openai_client=client
 #     )
 
-def get_llm_model() -> OpenAIModel:
-    return OpenAIModel(
-        'gpt-4o-mini',
-        # base_url='https://openrouter.ai/api/v1',
-        api_key=os.getenv('OPENAI_API_KEY')
-    )
+# One model instance per model name, shared by every agent on that model
+_models: Dict[str, OpenAIModel] = {}
+
+
+def model_name_for(agent_name: str) -> str:
+    """Model an agent runs on, from its tier in AGENT_MODEL_TIERS (default "standard")."""
+    tier = settings.AGENT_MODEL_TIERS.get(agent_name, "standard")
+    if tier not in settings.LLM_MODEL_TIERS:
+        logger.warning(f"Unknown model tier '{tier}' for agent '{agent_name}', using 'standard'")
+        tier = "standard"
+    return settings.LLM_MODEL_TIERS[tier]
+
+
+def get_llm_model(agent_name: str = "chat") -> OpenAIModel:
+    model_name = model_name_for(agent_name)
+    if model_name not in _models:
+        # Imported here, the OpenAI SDK is a large share of startup time
+        from pydantic_ai.models.openai import OpenAIModel
+        from app.utils.cassette import get_cassette_transport
+        transport = get_cassette_transport()
+        api_key = os.getenv('OPENAI_API_KEY')
+        if transport is not None and transport.mode == "replay":
+            # Replays never reach the provider
+            api_key = api_key or "replay"
+        _models[model_name] = OpenAIModel(
+            model_name,
+            # base_url='https://openrouter.ai/api/v1',
+            api_key=api_key,
+            http_client=AsyncClient(transport=transport, timeout=600) if transport else None
+        )
+    return _models[model_name]
+
+
+def record_agent_run(agent_name: str, started_at: float, usage: Optional[Usage] = None) -> None:
+    """
+    Record the latency and token usage of an agent run, labelled with the agent and its model.
+
+    Args:
+        agent_name: Agent as named in AGENT_MODEL_TIERS
+        started_at: `time.perf_counter()` value taken when the run started
+        usage: Usage of the run, if it completed
+    """
+    model_name = model_name_for(agent_name)
+    AGENT_RUN_SECONDS.labels(agent_name, model_name).observe(time.perf_counter() - started_at)
+    if usage is not None:
+        AGENT_TOKENS.labels(agent_name, model_name, "request").inc(usage.request_tokens or 0)
+        AGENT_TOKENS.labels(agent_name, model_name, "response").inc(usage.response_tokens or 0)
+        # Prompt tokens served from the provider's prefix cache (hit rate = cached / request)
+        AGENT_TOKENS.labels(agent_name, model_name, "cached").inc((usage.details or {}).get("cached_tokens", 0))
 
 # def get_llm_model() -> OpenAIModel:
 #     return OpenAIModel(
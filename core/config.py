@@ -1,5 +1,5 @@
 from enum import Enum
-from typing import Optional
+from typing import Dict, Optional
 
 from pydantic import Field, BaseModel
 from pydantic_settings import BaseSettings
@@ -47,6 +47,17 @@ class Settings(BaseSettings):
 
     ENVIRONMENT: str = EnvironmentType.DEVELOPMENT
     APP_PORT: int = 8000
+    APP_HOST: str = "0.0.0.0"
+
+    # Production runner (core.runner): worker processes, seconds in-flight requests get to
+    # finish on shutdown, then seconds pending writes get before the pool closes.
+    # WORKER_PROCESSES is set by the runner for its workers, connection pool sizes
+    # (DB_POOL_MAX_SIZE, REDIS_MAX_CONNECTIONS) are totals divided between them
+    WORKERS: int = Field(default=2)
+    WORKER_PROCESSES: int = Field(default=1)
+    DB_POOL_MAX_SIZE: int = Field(default=10)
+    SHUTDOWN_DRAIN_SECONDS: int = Field(default=30)
+    SHUTDOWN_FLUSH_SECONDS: float = Field(default=10.0)
 
     # MongoDB Configuration
     MONGO_URI: str = Field(default="mongodb://localhost:27017")
@@ -56,6 +67,21 @@ class Settings(BaseSettings):
     API_KEY: str = Field(default="")
     OPENAI_BASE_URL: str = Field(default="https://api.dosashop1.com/openai/v1")
 
+    # Build every agent during startup instead of on its first request
+    AGENTS_PRELOAD: bool = Field(default=True)
+
+    # Model per tier, and the tier each agent runs on (agents not listed use "standard")
+    LLM_MODEL_TIERS: Dict[str, str] = Field(default={
+        "standard": "gpt-4o-mini",
+        "fast": "gpt-4.1-nano",
+    })
+    AGENT_MODEL_TIERS: Dict[str, str] = Field(default={
+        "chat": "standard",
+        "metadata": "fast",
+        "metadata_title": "fast",
+        "translation": "fast",
+    })
+
     FASTSTREAM_PROVIDER: Optional[str] = None
     FASTSTREAM_ENABLE: bool = False
 
@@ -70,6 +96,102 @@ class Settings(BaseSettings):
     SAQ_WEB_PORT: int = Field(default=8081)
     SAQ_WORKERS: int = Field(default=1)
 
+    # Redis client layer (pool size, timeouts in seconds, circuit breaker backoff)
+    REDIS_MAX_CONNECTIONS: int = Field(default=20)
+    REDIS_SOCKET_TIMEOUT: float = Field(default=2.0)
+    REDIS_CONNECT_TIMEOUT: float = Field(default=2.0)
+    REDIS_BREAKER_FAILURE_THRESHOLD: int = Field(default=3)
+    REDIS_BREAKER_RESET_TIMEOUT: float = Field(default=1.0)
+    REDIS_BREAKER_MAX_RESET_TIMEOUT: float = Field(default=60.0)
+
+    # Knowledge base result cache (TTL in seconds)
+    KB_CACHE_MAXSIZE: int = Field(default=1024)
+    KB_CACHE_TTL: int = Field(default=3600)
+    KB_CACHE_REDIS_ENABLED: bool = Field(default=False)
+
+    # Embedded knowledge base index: KB_LOCAL_MODE is "off", "primary" or "fallback"
+    KB_LOCAL_INDEX_PATH: Optional[str] = Field(default=None)
+    KB_LOCAL_MODE: str = Field(default="off")
+
+    # Tool upstream resilience: hedging after p95, timeout = p99 * multiplier within [min, max] seconds
+    UPSTREAM_HEDGING_ENABLED: bool = Field(default=True)
+    UPSTREAM_MIN_TIMEOUT: float = Field(default=2.0)
+    UPSTREAM_MAX_TIMEOUT: float = Field(default=30.0)
+    UPSTREAM_TIMEOUT_MULTIPLIER: float = Field(default=3.0)
+    UPSTREAM_MIN_SAMPLES: int = Field(default=20)
+    UPSTREAM_LATENCY_WINDOW: int = Field(default=200)
+    UPSTREAM_BREAKER_FAILURE_THRESHOLD: int = Field(default=5)
+    UPSTREAM_BREAKER_RESET_TIMEOUT: float = Field(default=2.0)
+    UPSTREAM_BREAKER_MAX_RESET_TIMEOUT: float = Field(default=60.0)
+
+    # Deadline in seconds for every branch of a federated search
+    FEDERATED_SEARCH_DEADLINE: float = Field(default=10.0)
+
+    # Compaction of knowledge base results before they reach the model
+    KB_COMPACT_TOKEN_BUDGET: int = Field(default=1500)
+    KB_COMPACT_DUPLICATE_THRESHOLD: float = Field(default=0.8)
+
+    # Speculative knowledge base prefetch at the start of a turn (web search off only)
+    KB_PREFETCH_ENABLED: bool = Field(default=False)
+    KB_PREFETCH_DOMAIN: str = Field(default="ayurveda")
+    KB_PREFETCH_MIN_SIMILARITY: float = Field(default=0.4)
+
+    # Web search result cache (fresh TTL, then served stale while revalidating until the stale TTL)
+    WEB_SEARCH_CACHE_MAXSIZE: int = Field(default=512)
+    WEB_SEARCH_CACHE_TTL: int = Field(default=300)
+    WEB_SEARCH_CACHE_STALE_TTL: int = Field(default=1800)
+    WEB_SEARCH_CACHE_REDIS_ENABLED: bool = Field(default=False)
+
+    # End-to-end turn deadline in seconds (overridable per request with the x-turn-deadline header, up to the max);
+    # optional stages are skipped below TURN_MIN_STAGE_SECONDS, persisting the turn always gets TURN_PERSIST_MIN_SECONDS
+    TURN_DEADLINE_SECONDS: float = Field(default=90.0)
+    TURN_DEADLINE_MAX_SECONDS: float = Field(default=300.0)
+    TURN_MIN_STAGE_SECONDS: float = Field(default=2.0)
+    TURN_PERSIST_MIN_SECONDS: float = Field(default=5.0)
+
+    # Compact transcripts sent to the metadata and title agents instead of raw message JSON
+    TRANSCRIPT_TOKEN_BUDGET: int = Field(default=1500)
+    TRANSCRIPT_TOOL_SUMMARY_TOKENS: int = Field(default=60)
+
+    # Per-user rolling token budget over the window, counted in Redis buckets (0 disables budgets)
+    USER_TOKEN_BUDGET: int = Field(default=0)
+    USER_TOKEN_BUDGET_WINDOW_SECONDS: int = Field(default=86400)
+    USER_TOKEN_BUDGET_BUCKET_SECONDS: int = Field(default=3600)
+    # Tokens held for each running turn and settled when it ends; turns are rejected when the budget cannot cover it
+    USER_TOKEN_BUDGET_TURN_RESERVE: int = Field(default=4000)
+
+    # Batch chat API: items run at once, items per batch, and how long completed results are kept for resuming
+    BATCH_MAX_CONCURRENCY: int = Field(default=8)
+    BATCH_MAX_ITEMS: int = Field(default=5000)
+    BATCH_RESULT_TTL: int = Field(default=86400)
+
+    # Chat stream frames: at most STREAM_TARGET_FPS, slowed down to STREAM_MIN_FPS for clients
+    # that take long to accept frames (spacing of STREAM_BACKPRESSURE_FACTOR x the send time)
+    STREAM_TARGET_FPS: float = Field(default=20.0)
+    STREAM_MIN_FPS: float = Field(default=2.0)
+    STREAM_BACKPRESSURE_FACTOR: float = Field(default=4.0)
+
+    # Logging: "json" or "text" output, records queued for the writer thread (dropped when full),
+    # and per logger name prefix the kept fraction of records below WARNING and records per second
+    LOG_FORMAT: str = Field(default="json")
+    LOG_QUEUE_SIZE: int = Field(default=10000)
+    LOG_SAMPLE_RATES: Dict[str, float] = Field(default={"httpx": 0.1})
+    LOG_RATE_LIMITS: Dict[str, int] = Field(default={"": 1000})
+
+    # Response compression: JSON bodies from COMPRESSION_MIN_BYTES, gzip level and brotli quality
+    COMPRESSION_MIN_BYTES: int = Field(default=1024)
+    COMPRESSION_GZIP_LEVEL: int = Field(default=6)
+    COMPRESSION_BROTLI_QUALITY: int = Field(default=5)
+
+    # Record/replay of LLM and tool HTTP traffic: "off", "record" or "replay"; replayed
+    # latency is the recorded one divided by CASSETTE_REPLAY_SPEED (0 replays without delay)
+    CASSETTE_MODE: str = Field(default="off")
+    CASSETTE_PATH: str = Field(default="cassettes/default.jsonl")
+    CASSETTE_REPLAY_SPEED: float = Field(default=1.0)
+
+    # Tool artifact store: "memory" keeps artifacts in the request, "redis" shares them across processes
+    ARTIFACT_STORE_BACKEND: str = Field(default="memory")
+
     PG_HOST: str = Field(default='aws-0-ap-south-1.pooler.supabase.com')
     PG_PORT: int = Field(default=5432)
     PG_USER: str = Field(default='postgres.foartimacvkfjphhgjxm')
@@ -1,3 +1,6 @@
 import contextvars
 
 correlation_id_ctx_var = contextvars.ContextVar("correlation_id", default=None)
+
+# Deadline of the chat turn being handled (app.utils.deadline.Deadline), None outside a turn
+turn_deadline_ctx_var = contextvars.ContextVar("turn_deadline", default=None)
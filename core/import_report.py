@@ -0,0 +1,103 @@
+"""
+Import-time report for the application's startup.
+
+Runs `python -X importtime -c "import <module>"` in a fresh interpreter and
+summarizes the per-module timings:
+
+    python -m core.import_report                  # core.server, top 25 modules
+    python -m core.import_report app.api --top 40
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Project root, so the target is importable whatever the working directory
+PROJECT_ROOT = Path(__file__).parent.parent
+
+_LINE_RE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+
+@dataclass
+class ImportTiming:
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+@dataclass
+class ImportReport:
+    target: str
+    timings: List[ImportTiming]
+
+    @property
+    def total_seconds(self) -> float:
+        """Cumulative import time of the target module."""
+        for timing in self.timings:
+            if timing.module == self.target:
+                return timing.cumulative_us / 1e6
+        return 0.0
+
+    @property
+    def modules(self) -> Dict[str, ImportTiming]:
+        return {timing.module: timing for timing in self.timings}
+
+    def by_package(self) -> Dict[str, float]:
+        """Self import time in seconds, summed per top-level package."""
+        totals: Dict[str, float] = {}
+        for timing in self.timings:
+            package = timing.module.split(".")[0]
+            totals[package] = totals.get(package, 0.0) + timing.self_us / 1e6
+        return dict(sorted(totals.items(), key=lambda item: item[1], reverse=True))
+
+    def format(self, top: int = 25) -> str:
+        lines = [f"Import of {self.target}: {self.total_seconds * 1000:.0f} ms, {len(self.timings)} modules", ""]
+        lines.append("Slowest modules (cumulative ms, self ms):")
+        slowest = sorted(self.timings, key=lambda t: t.cumulative_us, reverse=True)[:top]
+        lines.extend(f"  {t.cumulative_us / 1000:8.1f} {t.self_us / 1000:8.1f}  {t.module}" for t in slowest)
+        lines.append("")
+        lines.append("Self time per top-level package (ms):")
+        lines.extend(f"  {seconds * 1000:8.1f}  {package}" for package, seconds in list(self.by_package().items())[:top])
+        return "\n".join(lines)
+
+
+def measure_imports(target: str = "core.server", env: Optional[Dict[str, str]] = None) -> ImportReport:
+    """
+    Import `target` in a fresh interpreter with `-X importtime` and parse its timings.
+
+    Args:
+        target: Module to import
+        env: Environment of the interpreter, the current one by default
+
+    Returns:
+        ImportReport: Timings of every module imported, in import order
+
+    Raises:
+        RuntimeError: If the import fails
+    """
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+        capture_output=True, text=True, cwd=PROJECT_ROOT, env=env if env is not None else dict(os.environ),
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"Importing {target} failed:\n{completed.stderr[-2000:]}")
+    timings = []
+    for line in completed.stderr.splitlines():
+        match = _LINE_RE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            timings.append(ImportTiming(module, int(self_us), int(cumulative_us), len(indent) // 2))
+    return ImportReport(target, timings)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-module import time report")
+    parser.add_argument("target", nargs="?", default="core.server")
+    parser.add_argument("--top", type=int, default=25)
+    args = parser.parse_args()
+    print(measure_imports(args.target).format(args.top))
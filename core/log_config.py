@@ -1,9 +1,29 @@
+import atexit
+import copy
+import datetime
+import json
 import logging
 import os
+import queue
+import random
+import sys
+import time
+from logging.handlers import QueueHandler, QueueListener
+from typing import Callable, Dict, IO, Optional, Tuple
 
 import uvicorn.config
+
+from .config import settings
+from .metrics import LOG_RECORDS_DROPPED
 from .middleware import correlation_id_ctx_var
 
+# Log call arguments that can be formatted later, in the listener thread (uvicorn's
+# access formatter needs its args)
+_IMMUTABLE = (str, int, float, bool, type(None))
+
+# Attributes every LogRecord has, anything else was passed with `extra=`
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "correlation_id"}
+
 
 class CorrelationIdFilter(logging.Filter):
     def filter(self, record):
@@ -14,24 +34,160 @@ def filter(self, record):
         return True
 
 
+class SamplingFilter(logging.Filter):
+    """
+    Per-logger sampling and rate limits, applied before a record is queued.
+
+    Rules are keyed by logger name prefix ("httpx" also covers "httpx._client",
+    "" covers every logger) and the longest matching prefix wins. Sampling keeps
+    that fraction of records below WARNING; rate limits cap records of every level
+    per second, shared by all loggers under the prefix. Dropped records are
+    counted in LOG_RECORDS_DROPPED.
+    """
+
+    def __init__(
+        self,
+        sample_rates: Optional[Dict[str, float]] = None,
+        rate_limits: Optional[Dict[str, int]] = None,
+        clock: Callable[[], float] = time.monotonic,
+        sample: Callable[[], float] = random.random,
+    ):
+        super().__init__()
+        self.sample_rates = settings.LOG_SAMPLE_RATES if sample_rates is None else sample_rates
+        self.rate_limits = settings.LOG_RATE_LIMITS if rate_limits is None else rate_limits
+        self._clock = clock
+        self._sample = sample
+        # Rule lookups per logger name, and token buckets (tokens, last refill) per rate limit prefix
+        self._rules: Dict[str, Tuple[Optional[str], Optional[str]]] = {}
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+
+    @staticmethod
+    def _match(name: str, rules: Dict) -> Optional[str]:
+        prefixes = [p for p in rules if p == "" or name == p or name.startswith(p + ".")]
+        return max(prefixes, key=len) if prefixes else None
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.name not in self._rules:
+            self._rules[record.name] = (self._match(record.name, self.sample_rates), self._match(record.name, self.rate_limits))
+        sample_prefix, limit_prefix = self._rules[record.name]
+
+        if sample_prefix is not None and record.levelno < logging.WARNING:
+            if self._sample() >= self.sample_rates[sample_prefix]:
+                LOG_RECORDS_DROPPED.labels(record.name, "sampled").inc()
+                return False
+
+        if limit_prefix is not None:
+            limit = self.rate_limits[limit_prefix]
+            now = self._clock()
+            tokens, refilled_at = self._buckets.get(limit_prefix, (limit, now))
+            tokens = min(limit, tokens + (now - refilled_at) * limit)
+            if tokens < 1:
+                self._buckets[limit_prefix] = (tokens, now)
+                LOG_RECORDS_DROPPED.labels(record.name, "rate_limited").inc()
+                return False
+            self._buckets[limit_prefix] = (tokens - 1, now)
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, correlation id, exception and extra fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "correlation_id": getattr(record, "correlation_id", None),
+        }
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and key not in entry:
+                entry[key] = value
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class QueueLogHandler(QueueHandler):
+    """
+    Queues records for a background thread that formats and writes them to `stream`.
+
+    Filters (correlation id, sampling) run in the logging thread, so records carry
+    the request's context; formatting and I/O happen in the listener thread, so
+    logging never blocks the event loop. When the queue is full, records are
+    dropped and counted rather than waiting. The formatter set on this handler
+    is used by the writing side.
+    """
+
+    def __init__(self, stream: IO = sys.stderr, queue_size: int = settings.LOG_QUEUE_SIZE):
+        super().__init__(queue.Queue(maxsize=queue_size))
+        self.sink = logging.StreamHandler(stream)
+        self.listener = QueueListener(self.queue, self.sink)
+        self.listener.start()
+        atexit.register(self._stop)
+
+    def setFormatter(self, fmt: Optional[logging.Formatter]) -> None:
+        self.sink.setFormatter(fmt)
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Mutable args are merged now, they may change after the call returns; the
+        # queue stays in process, so exc_info is kept and formatted by the listener
+        record = copy.copy(record)
+        if record.args and not (isinstance(record.args, tuple) and all(isinstance(a, _IMMUTABLE) for a in record.args)):
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.labels(record.name, "queue_full").inc()
+
+    def _stop(self) -> None:
+        if self.listener._thread is not None:
+            self.listener.stop()
+
+    def close(self) -> None:
+        # Flushes queued records, e.g. when logging is reconfigured
+        self._stop()
+        self.sink.close()
+        super().close()
+
+
 # @setup_logging.connect
 def get_log_config(*args, **kwargs):
-    # Get base config from uvicorn
-    log_config = uvicorn.config.LOGGING_CONFIG
+    # Get base config from uvicorn, copied so it can be built more than once
+    log_config = copy.deepcopy(uvicorn.config.LOGGING_CONFIG)
 
     # Initialize filters dictionary if it doesn't exist
     if "filters" not in log_config:
         log_config["filters"] = {}
 
-    # Add correlation ID filter
+    # Add correlation ID and sampling filters
     log_config["filters"]['correlation_id'] = {
         "()": CorrelationIdFilter
     }
+    log_config["filters"]['sampling'] = {
+        "()": SamplingFilter
+    }
 
     # Update formatters to include correlation ID
     log_config["formatters"]["default"]["fmt"] = "%(asctime)s %(levelprefix)s- [ %(correlation_id)s ] - %(message)s"
     log_config["formatters"]["access"][
         "fmt"] = '%(asctime)s %(levelprefix)s- [ %(correlation_id)s ]- %(client_addr)s - "%(request_line)s" %(status_code)s'
+    log_config["formatters"]["json"] = {
+        "()": JsonFormatter
+    }
+
+    # Handlers write through a queue and a background thread, JSON unless LOG_FORMAT is "text"
+    for handler in log_config["handlers"].values():
+        handler.pop("class")
+        handler["()"] = QueueLogHandler
+        if settings.LOG_FORMAT == "json":
+            handler["formatter"] = "json"
 
     # Configure root logger
     log_config["loggers"][""] = {  # Empty string represents root logger
@@ -40,11 +196,12 @@ def get_log_config(*args, **kwargs):
         "propagate": False
     }
 
-    # Add filter to all handlers
+    # Add filters to all handlers, sampling first so dropped records cost the least
     for handler in log_config["handlers"].values():
         if "filters" not in handler:
             handler["filters"] = []
-        if "correlation_id" not in handler["filters"]:
-            handler["filters"].append('correlation_id')
+        for name in ('sampling', 'correlation_id'):
+            if name not in handler["filters"]:
+                handler["filters"].append(name)
 
     return log_config
@@ -0,0 +1,127 @@
+from prometheus_client import Counter, Gauge, Histogram
+
+# Circuit breakers (0 = closed, 1 = half-open, 2 = open)
+CIRCUIT_BREAKER_STATE = Gauge(
+    "circuit_breaker_state",
+    "Current circuit breaker state (0 = closed, 1 = half-open, 2 = open)",
+    ["breaker"],
+    # Each worker has its own breakers, the most open one of the live workers is reported
+    multiprocess_mode="livemax",
+)
+CIRCUIT_BREAKER_TRIPS = Counter(
+    "circuit_breaker_trips_total",
+    "Number of times a circuit breaker opened",
+    ["breaker"],
+)
+CIRCUIT_BREAKER_REJECTIONS = Counter(
+    "circuit_breaker_rejections_total",
+    "Calls rejected without being attempted because the breaker was open",
+    ["breaker"],
+)
+
+# Result caches (hit rate = hits / (hits + misses))
+RESULT_CACHE_HITS = Counter(
+    "result_cache_hits_total",
+    "Result cache hits",
+    ["cache", "tier"],
+)
+RESULT_CACHE_MISSES = Counter(
+    "result_cache_misses_total",
+    "Result cache misses",
+    ["cache"],
+)
+
+# Speculative knowledge base prefetch
+KB_PREFETCH_OUTCOMES = Counter(
+    "kb_prefetch_outcomes_total",
+    "Speculative knowledge base prefetches by outcome (hit, miss, unused, failed)",
+    ["outcome"],
+)
+KB_PREFETCH_SAVED_SECONDS = Histogram(
+    "kb_prefetch_saved_seconds",
+    "Knowledge base latency hidden from the tool call by the prefetch",
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0),
+)
+
+# Tool upstream calls (knowledge base, web search)
+UPSTREAM_LATENCY = Histogram(
+    "upstream_request_seconds",
+    "Latency of successful upstream tool requests, including hedging",
+    ["upstream"],
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 20.0, 30.0),
+)
+UPSTREAM_HEDGES = Counter(
+    "upstream_hedged_requests_total",
+    "Hedged duplicate requests sent, and how many of them won",
+    ["upstream", "result"],
+)
+UPSTREAM_TIMEOUTS = Counter(
+    "upstream_timeouts_total",
+    "Upstream tool requests that exceeded their adaptive timeout",
+    ["upstream"],
+)
+
+# Size of the transcripts sent to the metadata and title agents ("raw" message JSON vs "compact" transcript)
+TRANSCRIPT_TOKENS = Histogram(
+    "agent_transcript_tokens",
+    "Estimated tokens of the conversation transcript passed to an auxiliary agent",
+    ["agent", "format"],
+    buckets=(100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000),
+)
+
+# LLM agent runs, per agent and the model its tier resolved to
+AGENT_RUN_SECONDS = Histogram(
+    "agent_run_seconds",
+    "Duration of LLM agent runs",
+    ["agent", "model"],
+    buckets=(0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0, 30.0, 60.0),
+)
+AGENT_TOKENS = Counter(
+    "agent_tokens_total",
+    "Tokens used by LLM agent runs, by kind (request, response, cached: request tokens served from the prompt cache)",
+    ["agent", "model", "kind"],
+)
+
+# Per-turn usage accounting and per-user budgets
+TURN_TOKENS = Histogram(
+    "chat_turn_tokens",
+    "Total tokens used by all agents of a chat turn",
+    buckets=(500, 1000, 2000, 4000, 8000, 16000, 32000, 64000),
+)
+USER_BUDGET_REJECTIONS = Counter(
+    "user_token_budget_rejections_total",
+    "Chat turns rejected because the user exhausted their rolling token budget",
+)
+
+# Batch chat API
+BATCH_ITEMS = Counter(
+    "batch_items_total",
+    "Batch chat items by outcome (ok, error, resumed)",
+    ["outcome"],
+)
+
+# Chat stream framing, model text frames sent per turn after coalescing
+CHAT_STREAM_FRAMES = Histogram(
+    "chat_stream_frames_per_turn",
+    "Model text frames streamed to the client per chat turn",
+    buckets=(1, 5, 10, 25, 50, 100, 250, 500, 1000),
+)
+CHAT_STREAM_BYTES = Histogram(
+    "chat_stream_bytes_per_turn",
+    "Bytes of model text frames streamed to the client per chat turn",
+    buckets=(1_000, 10_000, 50_000, 100_000, 250_000, 500_000, 1_000_000, 5_000_000),
+)
+
+# Log records dropped before being written (sampled, rate_limited, queue_full)
+LOG_RECORDS_DROPPED = Counter(
+    "log_records_dropped_total",
+    "Log records dropped by sampling, rate limits or a full logging queue",
+    ["logger", "reason"],
+)
+
+# Response compression, bytes before ("raw") and after ("compressed") per encoding
+RESPONSE_COMPRESSION_BYTES = Counter(
+    "response_compression_bytes_total",
+    "Bytes of compressed responses before and after compression",
+    ["encoding", "stage"],
+)
@@ -2,70 +2,112 @@
 import logging
 import time
 import uuid
-from typing import Any
 
 # from celery import Task
 # from celery.signals import before_task_publish, task_prerun
-from fastapi import Request
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 from .context_var import correlation_id_ctx_var
 
+logger = logging.getLogger(__name__)
 
-# Create a context variable to store correlation ID
 
+# Pure ASGI middlewares: they run in the request task itself, so context variables
+# they set are seen by the endpoint and by StreamingResponse generators, and bodies
+# pass through untouched (no extra task, queue or body wrapping per request).
 
-class CorrelationIdMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        correlation_id = request.headers.get('x-correlation-id', str(uuid.uuid4()))
+
+class CorrelationIdMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        correlation_id = None
+        for name, value in scope["headers"]:
+            if name == b"x-correlation-id":
+                correlation_id = value.decode("latin-1")
+                break
+        correlation_id = correlation_id or str(uuid.uuid4())
         # Set correlation ID in context
         correlation_id_ctx_var.set(correlation_id)
-        response = await call_next(request)
-        response.headers['x-correlation-id'] = correlation_id
-        return response
 
+        async def send_with_correlation_id(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message)["x-correlation-id"] = correlation_id
+            await send(message)
 
-class LoggingMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        # Log request
-        await LoggingMiddleware._log_request(request)
+        await self.app(scope, receive, send_with_correlation_id)
 
-        # Record start time
-        start_time = time.time()
 
-        # Get response
-        response = await call_next(request)
+class LoggingMiddleware:
+    """
+    Logs requests and responses at debug level.
 
-        # Calculate duration
-        duration = time.time() - start_time
+    JSON request bodies are logged as the endpoint reads them, never read ahead,
+    and nothing is done per request beyond timing when debug logging is off.
+    """
 
-        # Log response
-        await self._log_response(response, duration)
+    def __init__(self, app: ASGIApp):
+        self.app = app
 
-        return response
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not logger.isEnabledFor(logging.DEBUG):
+            await self.app(scope, receive, send)
+            return
 
-    @staticmethod
-    async def _log_request(request: Request):
-        body = None
-        if request.method in ["POST", "PUT", "PATCH"]:
-            if request.headers.get("content-type") == "application/json":
-                try:
-                    body = await request.json()
-                except:
-                    body = "(unable to parse request body)"
-
-        log_msg = f"Request: method={request.method} url={str(request.url)}"
-        if body:
-            log_msg += f" body={json.dumps(body)}"
-        logging.debug(log_msg)
+        logger.debug(f"Request: method={scope['method']} url={self._url(scope)}")
+        start_time = time.perf_counter()
+        status_code = None
 
-    @staticmethod
-    async def _log_response(response, duration):
-        log_msg = f"Response: status={response.status_code} duration_ms={round(duration * 1000, 2)}"
-        logging.debug(log_msg)
+        if scope["method"] in ("POST", "PUT", "PATCH") and self._is_json(scope):
+            chunks = []
+
+            async def logging_receive() -> Message:
+                message = await receive()
+                if message["type"] == "http.request":
+                    chunks.append(message.get("body", b""))
+                    if not message.get("more_body", False):
+                        self._log_body(b"".join(chunks))
+                return message
+        else:
+            logging_receive = receive
 
+        async def logging_send(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
 
+        try:
+            await self.app(scope, logging_receive, logging_send)
+        finally:
+            # Streaming responses are timed until their last chunk was sent
+            duration = time.perf_counter() - start_time
+            logger.debug(f"Response: status={status_code} duration_ms={round(duration * 1000, 2)}")
 
+    @staticmethod
+    def _url(scope: Scope) -> str:
+        query = scope.get("query_string", b"")
+        return scope["path"] + (f"?{query.decode('latin-1')}" if query else "")
+
+    @staticmethod
+    def _is_json(scope: Scope) -> bool:
+        for name, value in scope["headers"]:
+            if name == b"content-type":
+                return value.split(b";")[0].strip() == b"application/json"
+        return False
+
+    @staticmethod
+    def _log_body(body: bytes) -> None:
+        try:
+            logger.debug(f"Request body: {json.dumps(json.loads(body))}")
+        except ValueError:
+            logger.debug("Request body: (unable to parse request body)")
 
 
 # @before_task_publish.connect
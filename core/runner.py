@@ -0,0 +1,60 @@
+"""
+Production server: `python -m core.runner [--workers N]`.
+
+Workers share one listening socket (uvicorn's process manager) and write their
+metrics to PROMETHEUS_MULTIPROC_DIR so /metrics aggregates every worker. The
+database and Redis pool sizes are totals for the server, split between workers. On
+SIGTERM each worker stops accepting connections, lets in-flight chat streams
+finish for up to SHUTDOWN_DRAIN_SECONDS, then flushes pending writes for up to
+SHUTDOWN_FLUSH_SECONDS before its database pool closes.
+"""
+import argparse
+import glob
+import os
+import tempfile
+from typing import Optional
+
+from .config import settings
+
+
+def prepare_multiprocess_metrics() -> str:
+    """Point the Prometheus client at a metrics directory, cleared of a previous run's files."""
+    path = os.environ.get("PROMETHEUS_MULTIPROC_DIR") or tempfile.mkdtemp(prefix="prometheus-multiproc-")
+    os.makedirs(path, exist_ok=True)
+    for stale in glob.glob(os.path.join(path, "*.db")):
+        os.remove(stale)
+    # Inherited by the worker processes, which read it when prometheus_client is imported
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = path
+    return path
+
+
+def worker_share(total: int, minimum: int = 2) -> int:
+    """This worker's share of a connection pool size that is a total for the server."""
+    return max(minimum, total // max(1, settings.WORKER_PROCESSES))
+
+
+def run(workers: Optional[int] = None) -> None:
+    # A fixed default: a container's os.cpu_count() is the host's, and every worker opens its own pools
+    workers = workers or settings.WORKERS
+    if workers > 1:
+        prepare_multiprocess_metrics()
+    os.environ["WORKER_PROCESSES"] = str(workers)
+
+    import uvicorn
+
+    from .log_config import get_log_config
+
+    uvicorn.run(
+        "main:app",
+        host=settings.APP_HOST,
+        port=settings.APP_PORT,
+        workers=workers,
+        log_config=get_log_config(),
+        timeout_graceful_shutdown=settings.SHUTDOWN_DRAIN_SECONDS,
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: WORKERS)")
+    run(parser.parse_args().workers)
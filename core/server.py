@@ -1,22 +1,39 @@
 from __future__ import annotations as _annotations
 
+import os
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from prometheus_client import multiprocess
 from prometheus_fastapi_instrumentator import Instrumentator
 from starlette.exceptions import HTTPException
 
 # from .faststream import init_fastream_router
 from app.api import router
 from app.utils.pg_utils import PgDatabase
+from app.utils.redis_utils import connect_redis
+from app.services.agents.tools.knowledge_base import get_local_index
+from app.services.agents.registry import build_agents
 from .config import settings
 from .exception_handler import exception_exception_handler
 from .middleware import CorrelationIdMiddleware, LoggingMiddleware
+from .runner import worker_share
+from .shutdown import pending_writes
 from fastapi.middleware.cors import CORSMiddleware
 
 @asynccontextmanager
 async def lifespan(app_: FastAPI):
-    async with PgDatabase.connectToDb() as db:
-        yield {'db': db}
+    if settings.AGENTS_PRELOAD:
+        build_agents()
+    if settings.KB_LOCAL_MODE != "off":
+        get_local_index()
+    pool_size = worker_share(settings.DB_POOL_MAX_SIZE)
+    async with PgDatabase.connectToDb(min_size=min(2, pool_size), max_size=pool_size) as db, connect_redis() as redis_client:
+        await db.check_usage_column()
+        yield {'db': db, 'redis': redis_client}
+        # Requests are drained by now (uvicorn's graceful shutdown), writes they left must land before the pool closes
+        await pending_writes.flush(settings.SHUTDOWN_FLUSH_SECONDS)
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        multiprocess.mark_process_dead(os.getpid())
 
 
 def add_middlewares(app_: FastAPI) -> None:
@@ -0,0 +1,50 @@
+import asyncio
+import logging
+from typing import Awaitable, Set, TypeVar
+
+T = TypeVar("T")
+
+logger = logging.getLogger(__name__)
+
+
+class PendingWrites:
+    """
+    Writes that must complete even when the request that started them is cancelled.
+
+    On shutdown, requests still running after the drain timeout are cancelled;
+    writes started through `shielded` keep running and the lifespan waits for them
+    (`flush`) before the database pool closes.
+    """
+
+    def __init__(self) -> None:
+        self._tasks: Set[asyncio.Task] = set()
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+    async def shielded(self, write: Awaitable[T]) -> T:
+        task = asyncio.ensure_future(write)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return await asyncio.shield(task)
+
+    async def flush(self, timeout: float) -> int:
+        """
+        Wait for pending writes to finish.
+
+        Args:
+            timeout: Maximum seconds to wait
+
+        Returns:
+            int: Writes still unfinished after the timeout
+        """
+        if not self._tasks:
+            return 0
+        logger.info(f"Flushing {len(self._tasks)} pending writes")
+        _, unfinished = await asyncio.wait(set(self._tasks), timeout=timeout)
+        if unfinished:
+            logger.error(f"{len(unfinished)} pending writes did not finish within {timeout}s")
+        return len(unfinished)
+
+
+pending_writes = PendingWrites()
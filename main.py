@@ -8,7 +8,8 @@
 
 logging.config.dictConfig(get_log_config())
 
-logfire.configure(token='zmLFCyY7Pzr852mBPwDC9SRNFlDmxGPsxfZ8NRQNDzpY')
+# With JSON logs, logfire exports only and does not also write to the console synchronously
+logfire.configure(token='zmLFCyY7Pzr852mBPwDC9SRNFlDmxGPsxfZ8NRQNDzpY', console=False if settings.LOG_FORMAT == "json" else None)
 
 # Keep this so we can run uvicorn main:app --host=0.0.0.0 --port=8000 --reload
 from core.server import app
@@ -0,0 +1,3 @@
+-- Token usage of each stored turn, per agent (see docs/usage.md)
+-- Written by PgDatabase.add_messages; without it turns are stored without usage
+ALTER TABLE messages ADD COLUMN IF NOT EXISTS usage jsonb;
@@ -0,0 +1,77 @@
+"""
+Time build, cached load and lookups over every port and country in the gazetteer.
+
+Not collected by pytest, run it from the project root:
+
+    PYTHONPATH=. python tests/bench_gazetteer.py
+
+Fuzzy lookups query each port with one typo; accuracy counts queries whose
+intended port is the top match.
+"""
+import json
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict
+
+from app.services.gazetteer import COUNTRY_PORTS_PATH, Gazetteer, normalize_place
+
+
+def with_typo(name: str, seed: int) -> str:
+    """Deterministic single-character typo (swap, drop or double)."""
+    if len(name) < 4:
+        return name
+    i = 1 + seed % (len(name) - 2)
+    kind = seed % 3
+    if kind == 0:
+        return name[:i] + name[i + 1] + name[i] + name[i + 2:]
+    if kind == 1:
+        return name[:i] + name[i + 1:]
+    return name[:i] + name[i] + name[i:]
+
+
+def benchmark(source: Path | str = COUNTRY_PORTS_PATH) -> Dict[str, float]:
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = Path(tmp) / "gazetteer.npz"
+        start = time.perf_counter()
+        Gazetteer.load(source, cache)
+        build_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        gazetteer = Gazetteer.load(source, cache)
+        load_ms = (time.perf_counter() - start) * 1000
+
+    ports = [str(n) for n in gazetteer.ports.names]
+    countries = [str(n) for n in gazetteer.countries.names]
+
+    start = time.perf_counter()
+    for port in ports:
+        gazetteer.countries_for_port(port)
+    reverse_us = (time.perf_counter() - start) / len(ports) * 1e6
+
+    typos = [with_typo(port, i) for i, port in enumerate(ports)]
+    hits = 0
+    start = time.perf_counter()
+    for port, typo in zip(ports, typos):
+        matches = gazetteer.find_ports(typo, limit=1)
+        hits += bool(matches) and normalize_place(matches[0].name) == normalize_place(port)
+    fuzzy_us = (time.perf_counter() - start) / len(ports) * 1e6
+
+    start = time.perf_counter()
+    for country in countries:
+        gazetteer.find_countries(with_typo(country, len(country)), limit=1)
+    country_us = (time.perf_counter() - start) / len(countries) * 1e6
+
+    return {
+        "ports": len(ports),
+        "countries": len(countries),
+        "build_ms": round(build_ms, 1),
+        "cached_load_ms": round(load_ms, 1),
+        "reverse_lookup_us": round(reverse_us, 1),
+        "fuzzy_port_us": round(fuzzy_us, 1),
+        "fuzzy_port_top1_accuracy": round(hits / len(ports), 4),
+        "fuzzy_country_us": round(country_us, 1),
+    }
+
+
+if __name__ == "__main__":
+    print(json.dumps(benchmark(), indent=2))
@@ -0,0 +1,48 @@
+import time
+
+from prometheus_client import REGISTRY
+from pydantic_ai.usage import Usage
+
+from core import ai
+from core.ai import get_llm_model, model_name_for, record_agent_run
+from core.config import settings
+
+TIERS = {"standard": "gpt-4o-mini", "fast": "gpt-4.1-nano"}
+
+
+def _use_tiers(monkeypatch, agents):
+    monkeypatch.setattr(settings, "LLM_MODEL_TIERS", TIERS)
+    monkeypatch.setattr(settings, "AGENT_MODEL_TIERS", agents)
+
+
+def test_agents_run_on_their_tier_model(monkeypatch):
+    _use_tiers(monkeypatch, {"chat": "standard", "metadata_title": "fast", "translation": "premium"})
+
+    assert model_name_for("chat") == "gpt-4o-mini"
+    assert model_name_for("metadata_title") == "gpt-4.1-nano"
+    # Unlisted agents and unknown tiers fall back to the standard tier
+    assert model_name_for("metadata") == "gpt-4o-mini"
+    assert model_name_for("translation") == "gpt-4o-mini"
+
+
+def test_agents_on_the_same_model_share_one_instance(monkeypatch):
+    _use_tiers(monkeypatch, {"chat": "standard", "metadata": "fast", "metadata_title": "fast"})
+    monkeypatch.setattr(ai, "_models", {})
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+
+    assert get_llm_model("metadata") is get_llm_model("metadata_title")
+    assert get_llm_model("metadata") is not get_llm_model("chat")
+    assert get_llm_model("metadata_title").model_name == "gpt-4.1-nano"
+
+
+def test_agent_runs_are_recorded_with_their_model(monkeypatch):
+    _use_tiers(monkeypatch, {"metadata": "fast"})
+
+    def tokens(kind):
+        return REGISTRY.get_sample_value("agent_tokens_total", {"agent": "metadata", "model": "gpt-4.1-nano", "kind": kind}) or 0
+
+    before = {kind: tokens(kind) for kind in ("request", "response", "cached")}
+    record_agent_run("metadata", time.perf_counter(), Usage(request_tokens=1200, response_tokens=80, details={"cached_tokens": 1024}))
+
+    assert {kind: tokens(kind) - before[kind] for kind in before} == {"request": 1200, "response": 80, "cached": 1024}
+    assert REGISTRY.get_sample_value("agent_run_seconds_count", {"agent": "metadata", "model": "gpt-4.1-nano"}) >= 1
@@ -0,0 +1,35 @@
+import asyncio
+
+from app.utils.artifact_store import (
+    InMemoryArtifactStore,
+    RedisArtifactStore,
+    collect_web_search_sources,
+    create_artifact_store,
+)
+
+
+def test_in_memory_store_keeps_every_tool_call():
+    async def run():
+        store = InMemoryArtifactStore()
+        await store.add("web_search_sources", [{"metadata": {"url": "https://a"}}], source="web_search:1")
+        await store.add("web_search_sources", [{"metadata": {"url": "https://b"}}], source="web_search:3")
+        return await store.get("web_search_sources"), await store.get("missing")
+
+    sources, missing = asyncio.run(run())
+    assert len(sources) == 2, "Second tool call overwrote the first"
+    assert missing == [], "Unknown kinds should be empty"
+
+
+def test_collect_web_search_sources_drops_repeated_urls():
+    sources = collect_web_search_sources([
+        [{"metadata": {"url": "https://a"}}, {"metadata": {"url": "https://b"}}],
+        [{"metadata": {"url": "https://a"}}, {"pageContent": "no url"}],
+    ])
+    assert [s.get("metadata", {}).get("url") for s in sources] == ["https://a", "https://b", None]
+
+
+def test_create_artifact_store_backend_selection():
+    assert isinstance(create_artifact_store(), InMemoryArtifactStore)
+    assert isinstance(create_artifact_store("redis", "turn-1"), RedisArtifactStore)
+    # Without a turn id the Redis store cannot be shared, so stay in memory
+    assert isinstance(create_artifact_store("redis", None), InMemoryArtifactStore)
@@ -0,0 +1,67 @@
+import asyncio
+
+from app.models.batch import BatchRequest
+from app.services import batch as batch_service
+
+
+def test_run_batch_bounds_concurrency_and_resumes(monkeypatch):
+    store = {}
+    running = {"now": 0, "peak": 0}
+
+    async def fake_hgetall_json(key):
+        return dict(store.get(key, {}))
+
+    async def fake_hset_json(key, field, value, ttl):
+        store.setdefault(key, {})[field] = value
+        return True
+
+    async def fake_run_batch_item(client, item_id, item, include_metadata=False):
+        running["now"] += 1
+        running["peak"] = max(running["peak"], running["now"])
+        await asyncio.sleep(0.01)
+        running["now"] -= 1
+        if item.prompt == "fail":
+            raise RuntimeError("upstream error")
+        return {"item_id": item_id, "status": "ok", "answer": item.prompt.upper()}
+
+    monkeypatch.setattr(batch_service, "hgetall_json", fake_hgetall_json)
+    monkeypatch.setattr(batch_service, "hset_json", fake_hset_json)
+    monkeypatch.setattr(batch_service, "run_batch_item", fake_run_batch_item)
+
+    batch = BatchRequest(items=[{"prompt": p} for p in ["a", "b", "fail", "c", "d"]], concurrency=2)
+
+    async def collect():
+        return [result async for result in batch_service.run_batch("b1", batch)]
+
+    first = asyncio.run(collect())
+    assert running["peak"] == 2
+    assert sorted(r["item_id"] for r in first) == ["0", "1", "2", "3", "4"]
+    assert [r["item_id"] for r in first if r["status"] == "error"] == ["2"]
+
+    # Only the failed item runs again, the others come from the stored results
+    second = asyncio.run(collect())
+    assert sorted(r["item_id"] for r in second if r.get("resumed")) == ["0", "1", "3", "4"]
+    assert [r["item_id"] for r in second if not r.get("resumed")] == ["2"]
+
+
+def test_run_batch_finishes_when_storing_a_result_fails(monkeypatch):
+    async def fake_hgetall_json(key):
+        return {}
+
+    async def failing_hset_json(key, field, value, ttl):
+        raise TypeError("Object of type datetime is not JSON serializable")
+
+    async def fake_run_batch_item(client, item_id, item, include_metadata=False):
+        return {"item_id": item_id, "status": "ok", "answer": item.prompt}
+
+    monkeypatch.setattr(batch_service, "hgetall_json", fake_hgetall_json)
+    monkeypatch.setattr(batch_service, "hset_json", failing_hset_json)
+    monkeypatch.setattr(batch_service, "run_batch_item", fake_run_batch_item)
+
+    async def collect():
+        batch = BatchRequest(items=[{"prompt": p} for p in ["a", "b", "c"]], concurrency=2)
+        return [result async for result in batch_service.run_batch("b2", batch)]
+
+    results = asyncio.run(asyncio.wait_for(collect(), timeout=2))
+    assert sorted(r["item_id"] for r in results) == ["0", "1", "2"]
+    assert all(r["status"] == "ok" for r in results)
@@ -0,0 +1,35 @@
+import asyncio
+import time
+
+import httpx
+
+from app.utils.cassette import Cassette, CassetteTransport
+
+
+def test_recorded_stream_replays_in_order_and_accelerated(tmp_path):
+    path = tmp_path / "turn.jsonl"
+    calls = []
+
+    def upstream(request):
+        calls.append(request)
+        return httpx.Response(200, headers={"content-type": "text/event-stream"}, content=f"data: {len(calls)}\n\n".encode())
+
+    async def run():
+        recorder = CassetteTransport("record", Cassette(path), inner=httpx.MockTransport(upstream))
+        async with httpx.AsyncClient(transport=recorder) as client:
+            for prompt in ("first", "second"):
+                async with client.stream("POST", "https://llm.test/v1/chat", json={"prompt": prompt}, headers={"authorization": "secret"}) as response:
+                    assert await response.aread() == f"data: {len(calls)}\n\n".encode()
+
+        replayer = CassetteTransport("replay", Cassette(path), speed=0)
+        async with httpx.AsyncClient(transport=replayer) as client:
+            # The body of the second request matches exactly, the first replays in order
+            second = await client.post("https://llm.test/v1/chat", json={"prompt": "second"})
+            first = await client.post("https://llm.test/v1/chat", json={"prompt": "changed"})
+        return first.text, second.text
+
+    started = time.perf_counter()
+    assert asyncio.run(run()) == ("data: 1\n\n", "data: 2\n\n")
+    assert time.perf_counter() - started < 1
+    assert len(calls) == 2
+    assert "secret" not in path.read_text()
@@ -0,0 +1,81 @@
+import asyncio
+from types import SimpleNamespace
+
+from pydantic_ai import Agent
+from pydantic_ai.exceptions import UnexpectedModelBehavior
+from pydantic_ai.models.test import TestModel
+
+from app.models.chat import Deps
+from app.services import chat_pipeline
+from app.services.agents.tools.schema import MetadataResponse, MetadataTitleResponse
+from app.services.chat_pipeline import DEFAULT_METADATA, generate_metadata
+from app.utils.deadline import Deadline
+from app.utils.usage import TurnUsage
+
+AGENTS = {
+    "metadata": Agent(TestModel(), result_type=MetadataResponse),
+    "metadata_title": Agent(TestModel(), result_type=MetadataTitleResponse),
+}
+CHAT_AGENT = Agent(TestModel(custom_result_text="Ayurveda balances the three doshas."))
+
+
+def _generate(monkeypatch, needs_title, deadline, failing=()):
+    prompts = []
+
+    def fake_get_agent(name):
+        agent = AGENTS[name]
+
+        async def run(prompt, **kwargs):
+            prompts.append((name, prompt))
+            if name in failing:
+                raise UnexpectedModelBehavior("Exceeded maximum retries (3) for result validation")
+            return await agent.run(prompt, **kwargs)
+
+        return SimpleNamespace(run=run)
+
+    monkeypatch.setattr(chat_pipeline, "get_agent", fake_get_agent)
+    turn_usage = TurnUsage()
+
+    async def run():
+        result = await CHAT_AGENT.run("What is ayurveda?")
+        return await generate_metadata(result, Deps(client=None, db_connection=None), deadline, needs_title, turn_usage)
+
+    metadata, title = asyncio.run(run())
+    return metadata, title, prompts, turn_usage
+
+
+def test_early_turns_get_metadata_and_title_in_one_call(monkeypatch):
+    metadata, title, prompts, turn_usage = _generate(monkeypatch, True, Deadline.after(30))
+
+    assert [name for name, _ in prompts] == ["metadata_title"]
+    assert set(metadata) == set(DEFAULT_METADATA)
+    assert isinstance(title, str)
+    # The agent reads a compact dialogue, not the raw message JSON
+    assert prompts[0][1].startswith("User: What is ayurveda?")
+    assert list(turn_usage.agents) == ["metadata_title"]
+
+
+def test_later_turns_get_metadata_only(monkeypatch):
+    metadata, title, prompts, turn_usage = _generate(monkeypatch, False, Deadline.after(30))
+
+    assert [name for name, _ in prompts] == ["metadata"]
+    assert set(metadata) == set(DEFAULT_METADATA)
+    assert title is None
+    assert list(turn_usage.agents) == ["metadata"]
+
+
+def test_failed_title_still_leaves_the_metadata(monkeypatch):
+    metadata, title, prompts, turn_usage = _generate(monkeypatch, True, Deadline.after(30), failing={"metadata_title"})
+
+    assert [name for name, _ in prompts] == ["metadata_title", "metadata"]
+    assert set(metadata) == set(DEFAULT_METADATA)
+    assert title is None
+    assert list(turn_usage.agents) == ["metadata"]
+
+
+def test_metadata_is_skipped_without_time_left(monkeypatch):
+    metadata, title, prompts, turn_usage = _generate(monkeypatch, True, Deadline.after(0))
+
+    assert prompts == []
+    assert (metadata, title) == (DEFAULT_METADATA, None)
+    assert turn_usage.total_tokens == 0
@@ -0,0 +1,50 @@
+import asyncio
+
+from pydantic_ai.messages import ModelMessagesTypeAdapter, ModelResponse, TextPart
+from pydantic_ai.models.function import FunctionModel
+
+from app.models.chat import Deps
+from app.services.agents import chat_agent
+from app.services.agents.chat_agent import build_chat_agent
+from app.services.agents.prompts.chat_prompt import get_system_prompt, get_time_context
+from core import ai
+
+
+def _system_prompts(message):
+    return [part.content for part in message.parts if part.part_kind == 'system-prompt']
+
+
+def test_static_prompt_has_nothing_that_varies():
+    assert get_system_prompt() == get_system_prompt()
+    assert get_time_context().splitlines()[0] not in get_system_prompt()
+
+
+def test_history_prefix_is_identical_on_later_turns(monkeypatch):
+    monkeypatch.setattr(ai, "_models", {})
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    agent = build_chat_agent()
+    deps = Deps(client=None, db_connection=None, language="ta")
+    requests = []
+
+    def answer(messages, info):
+        requests.append(ModelMessagesTypeAdapter.dump_json(messages))
+        return ModelResponse(parts=[TextPart("Ayurveda is a traditional system of medicine.")])
+
+    async def run():
+        with agent.override(model=FunctionModel(answer)):
+            first = await agent.run("What is ayurveda?", deps=deps)
+            # The next turn comes later (another day, even), with the history as stored
+            monkeypatch.setattr(chat_agent, "get_time_context", lambda: "Current Context: a later day")
+            history = ModelMessagesTypeAdapter.validate_json(first.all_messages_json())
+            await agent.run("And siddha?", deps=deps, message_history=history)
+        return first
+
+    first = asyncio.run(run())
+    prompts = _system_prompts(first.all_messages()[0])
+    assert prompts[0] == get_system_prompt()
+    assert "Tamil" in prompts[1]
+    assert prompts[-1].startswith("Current Context:")
+
+    # The second request starts with the first one's messages, byte for byte
+    first_turn = ModelMessagesTypeAdapter.dump_json(first.all_messages())
+    assert requests[1][:len(first_turn) - 1] == first_turn[:-1]
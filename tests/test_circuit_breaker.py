@@ -0,0 +1,112 @@
+import asyncio
+
+from app.utils.circuit_breaker import BreakerState, CircuitBreaker
+from app.utils.resilience import ResilientUpstream
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_breaker_opens_after_threshold_and_backs_off():
+    clock = FakeClock()
+    breaker = CircuitBreaker("test-backoff", failure_threshold=2, reset_timeout=1.0, max_reset_timeout=3.0, clock=clock)
+
+    breaker.record_failure()
+    assert breaker.state == BreakerState.CLOSED
+    breaker.record_failure()
+    assert breaker.state == BreakerState.OPEN
+    assert not breaker.allow_request(), "Open breaker must reject calls"
+
+    clock.now = 1.0
+    assert breaker.allow_request(), "Half-open breaker lets one trial call through"
+    assert not breaker.allow_request(), "Only one trial call at a time"
+
+    # Failed trial doubles the reset timeout
+    breaker.record_failure()
+    clock.now = 2.5
+    assert breaker.state == BreakerState.OPEN
+    clock.now = 3.0
+    assert breaker.state == BreakerState.HALF_OPEN
+
+
+def test_breaker_closes_after_successful_trial():
+    clock = FakeClock()
+    breaker = CircuitBreaker("test-recovery", failure_threshold=1, reset_timeout=1.0, clock=clock)
+
+    breaker.record_failure()
+    clock.now = 1.0
+    assert breaker.allow_request()
+    breaker.record_success()
+    assert breaker.state == BreakerState.CLOSED
+    assert breaker.health()["consecutive_failures"] == 0
+
+
+def test_cancelled_half_open_trial_releases_the_breaker():
+    clock = FakeClock()
+    upstream = ResilientUpstream("test-cancelled-trial", hedging=False)
+    upstream.breaker = CircuitBreaker("test-cancelled-trial", failure_threshold=1, reset_timeout=1.0, clock=clock)
+    upstream.breaker.record_failure()
+    clock.now = 1.0
+
+    async def hang(timeout):
+        await asyncio.sleep(10)
+
+    async def run():
+        trial = asyncio.create_task(upstream.call(hang))
+        await asyncio.sleep(0.01)
+        trial.cancel()
+        try:
+            await trial
+        except asyncio.CancelledError:
+            pass
+
+    asyncio.run(run())
+    assert upstream.breaker.health()["state"] == "half_open"
+    assert upstream.breaker.allow_request(), "A cancelled trial must not block the next one"
+
+
+def test_timeout_follows_observed_latency():
+    upstream = ResilientUpstream("test-adaptive", min_timeout=0.5, max_timeout=10.0, timeout_multiplier=3.0, min_samples=5, window=20)
+    assert upstream.timeout() == 10.0, "Without enough samples the maximum timeout is used"
+    for _ in range(5):
+        upstream.latencies.record(1.0)
+    assert upstream.timeout() == 3.0
+    # Old latencies leave the window
+    for _ in range(20):
+        upstream.latencies.record(0.01)
+    assert upstream.timeout() == 0.5, "The timeout never drops below the minimum"
+
+
+def test_slow_request_is_hedged_and_the_loser_cancelled():
+    upstream = ResilientUpstream("test-hedge", hedging=True, min_samples=5)
+    for _ in range(5):
+        upstream.latencies.record(0.02)
+    attempts = []
+    cancelled = []
+
+    async def request(timeout):
+        attempt = len(attempts)
+        attempts.append(timeout)
+        try:
+            # The first attempt hits a slow replica, the hedge a fast one
+            await asyncio.sleep(5 if attempt == 0 else 0.01)
+        except asyncio.CancelledError:
+            cancelled.append(attempt)
+            raise
+        return attempt
+
+    async def run():
+        started = asyncio.get_running_loop().time()
+        result = await upstream.call(request)
+        await asyncio.sleep(0)
+        return result, asyncio.get_running_loop().time() - started
+
+    result, elapsed = asyncio.run(run())
+    assert result == 1 and len(attempts) == 2
+    assert elapsed < 1.0
+    assert cancelled == [0]
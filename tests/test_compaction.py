@@ -0,0 +1,30 @@
+from app.services.agents.tools.compaction import compact_knowledge_base_response
+
+
+def test_compaction_dedupes_ranks_and_drops_fields():
+    chunk = "Ayurveda is based on the balance of the three doshas vata pitta and kapha in the body"
+    response = {
+        "results": [
+            {"content": "Turmeric is used for inflammation", "score": 0.2, "chunk_id": "c1", "full_doc_id": "d1", "tokens": 7},
+            {"content": chunk, "score": 0.9, "file_path": "ayurveda.pdf", "chunk_order_index": 3},
+            {"content": chunk + ".", "score": 0.8, "file_path": "ayurveda-copy.pdf"},
+        ]
+    }
+
+    compact = compact_knowledge_base_response(response)
+
+    assert compact["results"] == [
+        {"content": chunk, "source": "ayurveda.pdf"},
+        {"content": "Turmeric is used for inflammation"},
+    ]
+    assert compact["omitted"] == 1
+
+
+def test_compaction_respects_token_budget_and_errors():
+    response = {"results": [{"content": "word " * 400}, {"content": "other " * 400}]}
+    compact = compact_knowledge_base_response(response, token_budget=150)
+    assert len(compact["results"]) == 1
+    assert len(compact["results"][0]["content"]) <= 150 * 4 + 1
+
+    error = {"error": "query_failed", "message": "boom"}
+    assert compact_knowledge_base_response(error) is error
@@ -0,0 +1,47 @@
+import asyncio
+import gzip
+import zlib
+
+from app.utils import compression
+from app.utils.compression import FrameCompressor, json_response, negotiate_encoding
+
+
+def test_negotiate_encoding_respects_q_values_and_support(monkeypatch):
+    monkeypatch.setattr(compression, "brotli", object())
+    assert negotiate_encoding("gzip, deflate, br") == "br"
+    assert negotiate_encoding("br;q=0.5, gzip") == "gzip"
+    assert negotiate_encoding("br;q=0, gzip;q=0") is None
+    assert negotiate_encoding("*") == "br"
+    assert negotiate_encoding(None) is None
+    monkeypatch.setattr(compression, "brotli", None)
+    assert negotiate_encoding("br") is None
+    assert negotiate_encoding("br, gzip") == "gzip"
+
+
+def test_json_response_compresses_above_threshold_only():
+    small = json_response({"a": 1}, "gzip")
+    assert "content-encoding" not in small.headers
+    assert small.headers["vary"] == "Accept-Encoding"
+
+    messages = [{"role": "model", "content": "Ayurveda " * 50, "conversation_id": "c1"} for _ in range(20)]
+    large = json_response(messages, "gzip")
+    assert large.headers["content-encoding"] == "gzip"
+    assert gzip.decompress(large.body) == json_response(messages).body
+
+
+def test_frame_compressor_makes_each_frame_decodable_on_arrival():
+    compressor = FrameCompressor("gzip")
+    decoder = zlib.decompressobj(31)
+    frames = [b'{"role": "model", "content": "%d"}\n' % i for i in range(5)]
+    for frame in frames:
+        assert decoder.decompress(compressor.frame(frame)) == frame
+    decoder.decompress(compressor.finish())
+    assert decoder.eof
+
+    async def collect():
+        async def source():
+            for frame in frames:
+                yield frame
+        return b"".join([chunk async for chunk in compression.compress_frames(source(), "gzip")])
+
+    assert gzip.decompress(asyncio.run(collect())) == b"".join(frames)
@@ -0,0 +1,112 @@
+import asyncio
+import json
+from contextlib import asynccontextmanager
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from pydantic_ai import Agent
+from pydantic_ai.models.function import DeltaToolCall, FunctionModel
+
+from app.api.v1 import chat
+from app.utils.deadline import Deadline, turn_deadline
+from core.config import settings
+
+
+def test_turn_deadline_is_kept_within_bounds():
+    assert turn_deadline(0.001).remaining() == pytest.approx(settings.TURN_MIN_STAGE_SECONDS, abs=0.05)
+    assert turn_deadline(1e9).remaining() == pytest.approx(settings.TURN_DEADLINE_MAX_SECONDS, abs=0.05)
+    assert turn_deadline(None).remaining() == pytest.approx(settings.TURN_DEADLINE_SECONDS, abs=0.05)
+
+
+def test_within_stops_a_stream_at_the_deadline():
+    received = []
+
+    async def chunks():
+        for i in range(10):
+            await asyncio.sleep(0.02)
+            yield i
+
+    async def run():
+        deadline = Deadline.after(0.07)
+        with pytest.raises(TimeoutError):
+            async for chunk in deadline.within(chunks()):
+                received.append(chunk)
+
+    asyncio.run(run())
+    assert 1 <= len(received) <= 3
+
+
+def test_non_positive_turn_deadline_header_is_rejected_before_streaming():
+    app = FastAPI()
+    app.include_router(chat.router, prefix="/chat")
+    app.dependency_overrides[chat.get_db] = lambda: None
+    client = TestClient(app)
+
+    response = client.post("/chat/", data={"prompt": "hi", "conversation_id": "c1"}, headers={"X-Turn-Deadline": "0"})
+    assert response.status_code == 422
+
+
+class FakeDatabase:
+    def __init__(self):
+        self.stored = []
+
+    async def get_messages(self, conversation_id, timeout=None):
+        return []
+
+    @asynccontextmanager
+    async def _get_connection(self, timeout=None):
+        yield None
+
+    async def add_messages(self, messages, conversation_id, search_data=None, timeout=None, usage=None):
+        self.stored.append((json.loads(messages), search_data))
+
+
+def _chat_client(monkeypatch, stream_function, tools=()):
+    agent = Agent(FunctionModel(stream_function=stream_function), tools=tools)
+    monkeypatch.setattr(chat, "get_agent", lambda name: agent)
+    monkeypatch.setattr(settings, "TURN_MIN_STAGE_SECONDS", 0.1)
+    database = FakeDatabase()
+    app = FastAPI()
+    app.include_router(chat.router, prefix="/chat")
+    app.dependency_overrides[chat.get_db] = lambda: database
+    return TestClient(app), database
+
+
+def test_turn_past_its_deadline_ends_with_an_error_frame_and_is_stored(monkeypatch):
+    async def slow_answer(messages, info):
+        for word in ["Ayurveda ", "is ", "an ", "ancient ", "system ", "of ", "medicine."]:
+            yield word
+            await asyncio.sleep(0.15)
+
+    client, database = _chat_client(monkeypatch, slow_answer)
+    response = client.post("/chat/", data={"prompt": "What is ayurveda?", "conversation_id": "c1"}, headers={"X-Turn-Deadline": "0.4"})
+
+    frames = [json.loads(line) for line in response.text.splitlines()]
+    assert frames[0]["role"] == "user"
+    assert frames[-1]["role"] == "metadata" and frames[-1]["content"]["error"] == "deadline_exceeded"
+    streamed = [frame["content"] for frame in frames if frame["role"] == "model"]
+    assert streamed and not streamed[-1].endswith("medicine.")
+
+    [(messages, search_data)] = database.stored
+    assert messages[0]["parts"][-1] == {**messages[0]["parts"][-1], "part_kind": "user-prompt", "content": "What is ayurveda?"}
+    assert messages[-1]["parts"] == [{**messages[-1]["parts"][0], "part_kind": "text", "content": streamed[-1]}]
+    assert search_data["error"] == "deadline_exceeded"
+
+
+def test_turn_timing_out_in_a_tool_call_stores_the_prompt(monkeypatch):
+    async def slow_lookup() -> str:
+        await asyncio.sleep(5)
+        return "found"
+
+    async def call_tool(messages, info):
+        yield {0: DeltaToolCall(name="slow_lookup", json_args="{}")}
+
+    client, database = _chat_client(monkeypatch, call_tool, tools=[slow_lookup])
+    response = client.post("/chat/", data={"prompt": "hi", "conversation_id": "c1"}, headers={"X-Turn-Deadline": "0.3"})
+
+    assert json.loads(response.text.splitlines()[-1])["content"]["error"] == "deadline_exceeded"
+    [(messages, _)] = database.stored
+    # Only the prompt: no answer streamed, and no call without its return
+    assert [message["kind"] for message in messages] == ["request"]
+    assert messages[0]["parts"][-1]["content"] == "hi"
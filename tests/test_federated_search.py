@@ -0,0 +1,64 @@
+import asyncio
+from types import SimpleNamespace
+
+from app.services.agents.tools import federated_search as federated
+from app.services.agents.tools.federated_search import federated_search
+from app.services.agents.tools.schema import FederatedSearchRequest
+from app.utils.artifact_store import InMemoryArtifactStore
+from app.utils.deadline import Deadline
+
+
+def _context(use_web_search=False, deadline=None):
+    deps = SimpleNamespace(client=None, use_web_search=use_web_search, deadline=deadline, artifacts=InMemoryArtifactStore())
+    return SimpleNamespace(deps=deps, tool_name="federated_search", run_step=1)
+
+
+def test_domains_are_searched_concurrently_and_merged(monkeypatch):
+    async def fake_search(client, request):
+        await asyncio.sleep(0.05)
+        return {"results": [
+            {"content": f"{request.domain} on digestion", "score": 0.9 if request.domain == "siddha" else 0.5},
+            {"content": "shared introduction to traditional medicine", "score": 0.1},
+        ]}
+
+    async def fake_web_search(query):
+        return {"message": "web answer", "sources": [{"metadata": {"url": "https://example.org"}}]}
+
+    monkeypatch.setattr(federated, "search_knowledge_base", fake_search)
+    monkeypatch.setattr(federated, "cached_web_search", fake_web_search)
+    ctx = _context(use_web_search=True)
+    request = FederatedSearchRequest(query="digestion", domains=["ayurveda", "siddha", "Ayurveda"], include_web_search=True)
+
+    async def run():
+        started = asyncio.get_running_loop().time()
+        result = await federated_search(ctx, request)
+        return result, asyncio.get_running_loop().time() - started
+
+    result, elapsed = asyncio.run(run())
+    assert elapsed < 0.1, "Domains were searched one after the other"
+    assert [(r["domain"], r["content"]) for r in result["results"]][:2] == [
+        ("siddha", "siddha on digestion"), ("ayurveda", "ayurveda on digestion")
+    ]
+    # The same chunk from both domains is kept once
+    assert sum(r["content"] == "shared introduction to traditional medicine" for r in result["results"]) == 1
+    assert result["web_search"] == "web answer"
+    assert "failed" not in result
+    assert len(asyncio.run(ctx.deps.artifacts.get("knowledge_base_results"))) == 2
+
+
+def test_failed_and_late_branches_are_reported_by_name(monkeypatch):
+    async def fake_search(client, request):
+        if request.domain == "siddha":
+            await asyncio.sleep(10)
+        if request.domain == "unani":
+            return {"error": "domain_not_found", "message": "unsupported"}
+        return {"results": [{"content": "ayurveda on sleep"}]}
+
+    monkeypatch.setattr(federated, "search_knowledge_base", fake_search)
+    ctx = _context(deadline=Deadline.after(0.05))
+    request = FederatedSearchRequest(query="sleep", domains=["ayurveda", "siddha", "unani"], include_web_search=True)
+
+    result = asyncio.run(asyncio.wait_for(federated_search(ctx, request), timeout=2))
+    assert [r["content"] for r in result["results"]] == ["ayurveda on sleep"]
+    # Web search was not enabled for the turn, so it is not a branch at all
+    assert result["failed"] == {"siddha": "deadline_exceeded", "unani": "domain_not_found"}
@@ -0,0 +1,98 @@
+import asyncio
+import time
+
+import pytest
+
+from app.utils.frame_scheduler import FrameScheduler
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_slow_sends_space_frames_out_and_fast_sends_recover():
+    clock = FakeClock()
+    frames = FrameScheduler(target_fps=20, min_fps=2, backpressure_factor=4, clock=clock)
+    assert frames.due()
+    frames.sent(100, 0.001)
+    assert frames.interval == 0.05
+
+    clock.now += 0.02
+    assert not frames.due()
+    clock.now += 0.03
+    assert frames.due()
+
+    # A client that takes 100ms to accept each frame gets frames every 400ms at most
+    for _ in range(20):
+        frames.sent(100, 0.1)
+    assert abs(frames.interval - 0.4) < 0.01
+    # Very slow clients are capped at min_fps
+    for _ in range(20):
+        frames.sent(100, 1.0)
+    assert frames.interval == 0.5
+
+    for _ in range(20):
+        frames.sent(100, 0.001)
+    assert frames.interval == 0.05
+    assert frames.frames == 61 and frames.bytes == 6100
+
+
+def test_coalesced_snapshot_is_sent_when_due_without_waiting_for_the_next():
+    async def snapshots():
+        yield "a"
+        await asyncio.sleep(0.01)
+        yield "ab"
+        # e.g. the model calling a tool mid-answer
+        await asyncio.sleep(0.5)
+        yield "abc"
+
+    async def run():
+        frames = FrameScheduler(target_fps=20, min_fps=2, backpressure_factor=4)
+        started = time.monotonic()
+        sent = []
+        async for snapshot in frames.paced(snapshots()):
+            sent.append((snapshot, time.monotonic() - started))
+            frames.sent(len(snapshot), 0.0)
+        return sent
+
+    sent = asyncio.run(run())
+    assert [snapshot for snapshot, _ in sent] == ["a", "ab", "abc"]
+    assert sent[1][1] < 0.2, "The coalesced snapshot waited for the next one"
+
+
+def test_paced_stops_the_pending_snapshot_when_the_consumer_stops():
+    cancelled = []
+
+    async def snapshots():
+        yield "a"
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+        yield "ab"
+
+    async def run():
+        paced = FrameScheduler().paced(snapshots())
+        assert await paced.__anext__() == "a"
+        await asyncio.sleep(0.01)
+        await paced.aclose()
+
+    asyncio.run(run())
+    assert cancelled == [True]
+
+
+def test_paced_raises_the_errors_of_the_snapshots():
+    async def snapshots():
+        yield "a"
+        raise TimeoutError
+
+    async def run():
+        return [snapshot async for snapshot in FrameScheduler().paced(snapshots())]
+
+    with pytest.raises(TimeoutError):
+        asyncio.run(run())
@@ -0,0 +1,22 @@
+import json
+
+from app.services.gazetteer import Gazetteer
+
+DATA = {
+    "Jamaica": ["Kingston", "Montego Bay"],
+    "Canada": ["Kingston", "Halifax", "Vancouver"],
+    "Antigua_and_barbuda": ["St. John's"],
+}
+
+
+def test_fuzzy_and_reverse_lookups_survive_cache_roundtrip(tmp_path):
+    source = tmp_path / "country_ports.json"
+    source.write_text(json.dumps(DATA))
+    cache = tmp_path / "gazetteer.npz"
+
+    for gazetteer in (Gazetteer.load(source, cache), Gazetteer.load(source, cache)):
+        assert gazetteer.find_ports("Vancuover", limit=1)[0].name == "Vancouver"
+        assert gazetteer.countries_for_port("kingston") == ["Jamaica", "Canada"]
+        assert gazetteer.find_countries("antigua barbuda", limit=1)[0].name == "Antigua And Barbuda"
+        assert gazetteer.ports_for_country("canada") == ["Kingston", "Halifax", "Vancouver"]
+    assert cache.exists()
@@ -0,0 +1,56 @@
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+
+import redis.asyncio as redis
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.v1 import health
+from app.utils import redis_utils
+from app.utils.circuit_breaker import CircuitBreaker
+
+
+class FakePool:
+    def get_size(self):
+        return 4
+
+    def get_idle_size(self):
+        return 3
+
+    def get_max_size(self):
+        return 5
+
+
+def _client(db):
+    @asynccontextmanager
+    async def lifespan(app_):
+        yield {'db': db}
+
+    app = FastAPI(lifespan=lifespan)
+    app.include_router(health.router, prefix="/health")
+    return TestClient(app)
+
+
+def test_health_reports_the_database_pool_and_unconfigured_redis():
+    with _client(SimpleNamespace(pool=FakePool())) as client:
+        body = client.get("/health/").json()
+
+    assert body["status"] == "ok"
+    assert body["database"] == {"connected": True, "pool": {"size": 4, "idle": 3, "max_size": 5}}
+    assert body["redis"]["configured"] is False
+    assert set(body["upstreams"]) == {"knowledge_base", "web_search"}
+
+
+def test_open_redis_breaker_makes_the_service_degraded(monkeypatch):
+    breaker = CircuitBreaker("test-redis-health", failure_threshold=1, reset_timeout=60)
+    breaker.record_failure()
+    pool = redis.ConnectionPool.from_url("redis://redis.test:6379", max_connections=8)
+    monkeypatch.setattr(redis_utils, "_breaker", breaker)
+    monkeypatch.setattr(redis_utils, "_redis_client", redis.Redis(connection_pool=pool))
+
+    with _client(SimpleNamespace(pool=FakePool())) as client:
+        body = client.get("/health/").json()
+
+    assert body["status"] == "degraded"
+    assert body["redis"]["state"] == "open"
+    assert body["redis"]["pool"] == {"max_connections": 8, "in_use_connections": 0, "idle_connections": 0}
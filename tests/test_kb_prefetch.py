@@ -0,0 +1,41 @@
+import asyncio
+
+from app.services.agents.tools import kb_prefetch
+from app.services.agents.tools.kb_prefetch import KnowledgeBasePrefetch
+from app.services.agents.tools.schema import KnowledgeBaseRequest
+
+
+def _prefetch(monkeypatch):
+    async def fake_search(client, request):
+        await asyncio.sleep(0.01)
+        return {"results": [{"content": f"about {request.query}"}]}
+
+    monkeypatch.setattr(kb_prefetch, "search_knowledge_base", fake_search)
+    prefetch = KnowledgeBasePrefetch("basic principles of ayurveda", domain="ayurveda", min_similarity=0.5)
+    prefetch.start(client=None)
+    return prefetch
+
+
+def test_parallel_claims_get_the_prefetched_result_once(monkeypatch):
+    async def run():
+        prefetch = _prefetch(monkeypatch)
+        request = KnowledgeBaseRequest(query="principles of ayurveda", domain="ayurveda")
+        results = await asyncio.gather(prefetch.claim(request), prefetch.claim(request))
+        prefetch.finish()
+        return results
+
+    results = asyncio.run(run())
+    assert sum(result is not None for result in results) == 1
+
+
+def test_unmatched_claim_releases_the_prefetch(monkeypatch):
+    async def run():
+        prefetch = _prefetch(monkeypatch)
+        unrelated = await prefetch.claim(KnowledgeBaseRequest(query="siddha fever herbs", domain="ayurveda"))
+        matching = await prefetch.claim(KnowledgeBaseRequest(query="ayurveda basic principles", domain="ayurveda"))
+        prefetch.finish()
+        return unrelated, matching
+
+    unrelated, matching = asyncio.run(run())
+    assert unrelated is None
+    assert matching == {"results": [{"content": "about basic principles of ayurveda"}]}
@@ -0,0 +1,54 @@
+import io
+import json
+import logging
+
+from core.context_var import correlation_id_ctx_var
+from core.log_config import CorrelationIdFilter, JsonFormatter, QueueLogHandler, SamplingFilter
+
+
+def test_sampling_and_rate_limits_per_logger_prefix():
+    now = [0.0]
+    sampling = SamplingFilter(
+        sample_rates={"httpx": 0.25},
+        rate_limits={"": 100, "noisy": 2},
+        clock=lambda: now[0],
+        sample=iter([0.1, 0.5, 0.9, 0.2] * 10).__next__,
+    )
+
+    def record(name, level=logging.INFO):
+        return logging.LogRecord(name, level, __file__, 1, "message", None, None)
+
+    # Sampling keeps records drawn below the rate, and never drops warnings
+    assert [sampling.filter(record("httpx._client")) for _ in range(4)] == [True, False, False, True]
+    assert sampling.filter(record("httpx", logging.WARNING))
+
+    # "noisy.child" shares the 2 per second of "noisy", other loggers fall under ""
+    assert [sampling.filter(record("noisy.child")) for _ in range(3)] == [True, True, False]
+    assert sampling.filter(record("app"))
+    now[0] += 0.5
+    assert sampling.filter(record("noisy"))
+    assert not sampling.filter(record("noisy"))
+
+
+def test_queue_handler_writes_json_with_correlation_id_off_thread():
+    stream = io.StringIO()
+    handler = QueueLogHandler(stream=stream)
+    handler.setFormatter(JsonFormatter())
+    handler.addFilter(CorrelationIdFilter())
+    logger = logging.getLogger("test_log_config")
+    logger.addHandler(handler)
+    logger.propagate = False
+    try:
+        token = correlation_id_ctx_var.set("req-1")
+        args = {"items": [1]}
+        logger.warning("Loaded %s", args, extra={"domain": "ayurveda"})
+        args["items"].append(2)
+        correlation_id_ctx_var.reset(token)
+    finally:
+        logger.removeHandler(handler)
+        handler.close()
+
+    entry = json.loads(stream.getvalue())
+    assert entry["message"] == "Loaded {'items': [1]}"
+    assert entry["correlation_id"] == "req-1"
+    assert entry["level"] == "WARNING" and entry["domain"] == "ayurveda"
@@ -0,0 +1,46 @@
+import asyncio
+import logging
+
+import httpx
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+from core.context_var import correlation_id_ctx_var
+from core.middleware import CorrelationIdMiddleware, LoggingMiddleware
+
+
+async def stream(request):
+    async def chunks():
+        for _ in range(3):
+            await asyncio.sleep(0)
+            yield (correlation_id_ctx_var.get() or "missing").encode() + b"\n"
+    return StreamingResponse(chunks())
+
+
+async def echo(request):
+    return JSONResponse(await request.json())
+
+
+app = Starlette(
+    routes=[Route("/stream", stream), Route("/echo", echo, methods=["POST"])],
+    middleware=[Middleware(CorrelationIdMiddleware), Middleware(LoggingMiddleware)],
+)
+
+
+def test_correlation_id_reaches_streaming_body_and_body_is_not_consumed(caplog):
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            generated = await client.get("/stream")
+            given = await client.get("/stream", headers={"x-correlation-id": "abc"})
+            with caplog.at_level(logging.DEBUG, logger="core.middleware"):
+                echoed = await client.post("/echo", json={"prompt": "hi"})
+        return generated, given, echoed
+
+    generated, given, echoed = asyncio.run(run())
+    assert generated.text.splitlines() == [generated.headers["x-correlation-id"]] * 3
+    assert given.headers["x-correlation-id"] == "abc"
+    assert given.text.splitlines() == ["abc"] * 3
+    assert echoed.json() == {"prompt": "hi"}
+    assert 'Request body: {"prompt": "hi"}' in caplog.text
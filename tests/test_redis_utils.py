@@ -0,0 +1,52 @@
+import asyncio
+
+import pytest
+from redis.exceptions import ConnectionError as RedisConnectionError, ResponseError
+
+from app.utils import redis_utils
+from app.utils.circuit_breaker import BreakerState, CircuitBreaker
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def half_open_breaker(monkeypatch):
+    clock = FakeClock()
+    breaker = CircuitBreaker("test-redis", failure_threshold=1, reset_timeout=1.0, clock=clock)
+    breaker.record_failure()
+    clock.now = 1.0
+    monkeypatch.setattr(redis_utils, "_breaker", breaker)
+    monkeypatch.setattr(redis_utils, "_redis_client", object())
+    return breaker
+
+
+async def _fail_inside_operation(error):
+    try:
+        async with redis_utils.redis_operation() as client:
+            assert client is not None
+            raise error
+    except type(error):
+        pass
+
+
+@pytest.mark.parametrize("error", [TypeError("not JSON serializable"), asyncio.CancelledError()])
+def test_caller_errors_release_the_half_open_trial(half_open_breaker, error):
+    asyncio.run(_fail_inside_operation(error))
+    assert half_open_breaker.state == BreakerState.HALF_OPEN
+    assert half_open_breaker.allow_request()
+
+
+def test_redis_errors_close_and_connection_errors_reopen(half_open_breaker):
+    asyncio.run(_fail_inside_operation(ResponseError("WRONGTYPE")))
+    assert half_open_breaker.state == BreakerState.CLOSED
+
+    half_open_breaker.record_failure()
+    half_open_breaker._clock.now += 1.0
+    asyncio.run(_fail_inside_operation(RedisConnectionError("refused")))
+    assert half_open_breaker.state == BreakerState.OPEN
@@ -0,0 +1,90 @@
+import asyncio
+import time
+
+import httpx
+
+from app.services.agents.tools import knowledge_base
+from app.services.agents.tools.knowledge_base import KB_RESULT_CACHE, search_remote_knowledge_base
+from app.services.agents.tools.schema import KnowledgeBaseRequest
+from app.utils import result_cache
+from app.utils.result_cache import ResultCache, normalize_query
+
+
+def test_trivially_different_queries_share_a_key():
+    assert normalize_query("  What is   Ayurveda?? ") == normalize_query("what is ayurveda")
+    assert normalize_query("what is ayurveda") != normalize_query("what is siddha")
+
+
+def test_entries_expire_are_evicted_and_dropped_on_a_new_version():
+    async def run():
+        cache = ResultCache("test-local", maxsize=2, ttl=0.05)
+        cache.set_version("v1")
+        await cache.set("a", {"n": 1})
+        await cache.set("b", {"n": 2})
+        assert await cache.get("a") == {"n": 1}
+        await cache.set("c", {"n": 3})
+        assert await cache.get("b") is None, "The least recently used entry is evicted first"
+
+        time.sleep(0.06)
+        assert await cache.get("a") is None, "Entries expire after the ttl"
+
+        await cache.set("d", {"n": 4})
+        cache.set_version("v1")
+        assert await cache.get("d") == {"n": 4}
+        cache.set_version("v2")
+        assert len(cache) == 0
+
+    asyncio.run(run())
+
+
+def test_redis_tier_fills_the_local_tier(monkeypatch):
+    stored = {}
+
+    async def fake_set_many_json(values, ttl):
+        stored.update(values)
+        return True
+
+    async def fake_get_many_json(keys):
+        return {key: stored[key] for key in keys if key in stored}
+
+    monkeypatch.setattr(result_cache, "set_many_json", fake_set_many_json)
+    monkeypatch.setattr(result_cache, "get_many_json", fake_get_many_json)
+
+    async def run():
+        writer = ResultCache("test-shared", use_redis=True)
+        writer.set_version("v1")
+        await writer.set("q", {"results": []})
+        # Another worker: its local tier is empty, Redis has the entry under the same version
+        reader = ResultCache("test-shared", use_redis=True)
+        reader.set_version("v1")
+        assert await reader.get("q") == {"results": []}
+        assert len(reader) == 1
+        reader.set_version("v2")
+        assert await reader.get("q") is None
+
+    asyncio.run(run())
+    assert list(stored) == ["cache:test-shared:v1:q"]
+
+
+def test_knowledge_base_answers_repeated_queries_from_the_cache(monkeypatch):
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        return httpx.Response(200, json={"results": [{"content": "Ayurveda is a system of medicine"}]})
+
+    monkeypatch.setattr(knowledge_base, "KNOWLEDGE_BASE_URL", "http://kb.test/query")
+    KB_RESULT_CACHE.clear()
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            first = await search_remote_knowledge_base(client, KnowledgeBaseRequest(query="What is Ayurveda?", domain="ayurveda"))
+            second = await search_remote_knowledge_base(client, KnowledgeBaseRequest(query="what is ayurveda", domain="Ayurveda"))
+            return first, second
+
+    try:
+        first, second = asyncio.run(run())
+    finally:
+        KB_RESULT_CACHE.clear()
+    assert first == second
+    assert len(calls) == 1
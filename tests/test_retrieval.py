@@ -0,0 +1,39 @@
+import json
+
+from app.services.retrieval import cli
+from app.services.retrieval.builder import build_index
+from app.services.retrieval.index import LocalIndex
+
+
+def _export(root, ayurveda_text):
+    (root / "ayurveda").mkdir(parents=True)
+    (root / "siddha").mkdir()
+    (root / "ayurveda" / "doshas.md").write_text(ayurveda_text, encoding="utf-8")
+    (root / "siddha" / "herbs.jsonl").write_text(
+        json.dumps({"doc_id": "h1", "title": "Siddha herbs", "content": "Nilavembu kudineer is used for fever in Siddha medicine."}) + "\n",
+        encoding="utf-8",
+    )
+
+
+def test_build_then_search_and_rebuild_in_place(tmp_path, capsys):
+    _export(tmp_path / "v1", "Ayurveda describes three doshas: vata, pitta and kapha.")
+    output = tmp_path / "index"
+
+    summary = build_index(tmp_path / "v1", output, dim=64)
+    assert summary["documents"] == 2 and summary["chunks_per_domain"] == {"ayurveda": 1, "siddha": 1}
+
+    index = LocalIndex(output)
+    results = index.search("three doshas", top_k=2)
+    assert results[0]["domain"] == "ayurveda" and "doshas" in results[0]["content"]
+    assert index.search("fever", domain="siddha", top_k=1)[0]["source"] == "Siddha herbs"
+
+    # Rebuilding swaps a new directory in, the loaded index keeps reading its own files
+    _export(tmp_path / "v2", "Panchakarma is the Ayurvedic detoxification therapy.")
+    build_index(tmp_path / "v2", output, dim=64)
+    assert "doshas" in index.search("three doshas", top_k=1)[0]["content"]
+    assert "Panchakarma" in LocalIndex(output).search("detoxification", top_k=1)[0]["content"]
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["index", "v1", "v2"]
+
+    cli.main(["query", "--index", str(output), "--domain", "ayurveda", "--top-k", "1", "panchakarma"])
+    out = capsys.readouterr().out
+    assert "[ayurveda]" in out and "1 results in" in out
@@ -0,0 +1,18 @@
+from core import runner
+from core.config import settings
+
+
+def test_pool_sizes_are_split_between_workers(monkeypatch):
+    monkeypatch.setattr(settings, "WORKER_PROCESSES", 1)
+    assert runner.worker_share(10) == 10
+    monkeypatch.setattr(settings, "WORKER_PROCESSES", 4)
+    assert runner.worker_share(10) == 2
+    monkeypatch.setattr(settings, "WORKER_PROCESSES", 32)
+    assert runner.worker_share(10) == 2
+
+
+def test_multiprocess_metrics_dir_is_cleared_of_stale_files(monkeypatch, tmp_path):
+    (tmp_path / "gauge_livemax_123.db").write_bytes(b"stale")
+    monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(tmp_path))
+    assert runner.prepare_multiprocess_metrics() == str(tmp_path)
+    assert list(tmp_path.iterdir()) == []
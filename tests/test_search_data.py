@@ -0,0 +1,31 @@
+from pydantic_ai.messages import ModelRequest, ModelResponse, RetryPromptPart, TextPart, ToolCallPart, ToolReturnPart, UserPromptPart
+
+from app.utils.search_data import ToolCallIndex, extract_search_data
+
+
+def test_index_matches_every_call_to_its_return_incrementally():
+    messages = [
+        ModelRequest(parts=[UserPromptPart("What helps digestion?")]),
+        ModelResponse(parts=[
+            ToolCallPart("knowledge_base_search", {"query": "digestion", "domain": "ayurveda"}, "call-1"),
+            ToolCallPart("web_search", {"query": "digestion"}, "call-2"),
+            ToolCallPart("knowledge_base_search", {"query": "agni", "domain": "ayurveda"}, "call-3"),
+        ]),
+        ModelRequest(parts=[
+            ToolReturnPart("web_search", {"message": "answer", "sources": [{"metadata": {"url": "u"}}]}, "call-2"),
+            ToolReturnPart("knowledge_base_search", {"results": [{"content": "ginger"}]}, "call-1"),
+            RetryPromptPart("invalid domain", tool_name="knowledge_base_search", tool_call_id="call-3"),
+        ]),
+        ModelResponse(parts=[TextPart("Ginger.")]),
+    ]
+
+    index = ToolCallIndex().update(messages[:2])
+    assert [call["status"] for call in index.get_search_data()["tool_calls"]] == ["pending"] * 3
+
+    search_data = index.update(messages).get_search_data()
+    assert search_data == extract_search_data(messages)
+    assert search_data["filter_params"]["filter_type"] == "knowledge_base_search"
+    assert search_data["knowledge_results"] == [{"content": "ginger"}]
+    assert search_data["sources"] == [{"metadata": {"url": "u"}}]
+    assert [call["status"] for call in search_data["tool_calls"]] == ["returned", "returned", "retry"]
+    assert extract_search_data(messages[:1]) is None
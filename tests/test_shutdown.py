@@ -0,0 +1,26 @@
+import asyncio
+
+from core.shutdown import PendingWrites
+
+
+def test_shielded_write_survives_cancelled_request_and_is_flushed():
+    writes = PendingWrites()
+    stored = []
+
+    async def write():
+        await asyncio.sleep(0.05)
+        stored.append("turn")
+
+    async def request():
+        await writes.shielded(write())
+
+    async def run():
+        task = asyncio.create_task(request())
+        await asyncio.sleep(0.01)
+        task.cancel()
+        assert len(writes) == 1
+        assert await writes.flush(timeout=1.0) == 0
+        assert task.cancelled()
+
+    asyncio.run(run())
+    assert stored == ["turn"]
@@ -0,0 +1,39 @@
+import asyncio
+
+from app.utils.single_flight import SingleFlight
+
+
+def test_concurrent_identical_calls_share_one_upstream_request():
+    calls = []
+
+    async def upstream():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"message": "ok"}
+
+    async def run():
+        flight = SingleFlight("test")
+        results = await asyncio.gather(*[flight.do("same query", upstream) for _ in range(5)])
+        # Once finished, the next call goes upstream again
+        await flight.do("same query", upstream)
+        return results
+
+    results = asyncio.run(run())
+    assert all(result == {"message": "ok"} for result in results)
+    assert len(calls) == 2, f"Expected 2 upstream calls, got {len(calls)}"
+
+
+def test_cancelled_caller_does_not_cancel_shared_call():
+    async def upstream():
+        await asyncio.sleep(0.02)
+        return "done"
+
+    async def run():
+        flight = SingleFlight("test")
+        first = asyncio.create_task(flight.do("q", upstream))
+        second = asyncio.create_task(flight.do("q", upstream))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(run()) == "done"
@@ -0,0 +1,16 @@
+import os
+
+from core.import_report import measure_imports
+
+# Generous for slow CI machines; importing core.server takes about 1.1 s on a developer laptop
+STARTUP_IMPORT_BUDGET_SECONDS = float(os.getenv("STARTUP_IMPORT_BUDGET_SECONDS", "2.0"))
+
+
+def test_server_imports_within_budget_without_openai_key():
+    env = {key: value for key, value in os.environ.items() if key != "OPENAI_API_KEY"}
+    report = measure_imports("core.server", env=env)
+
+    # Agents, the OpenAI SDK and the embedded index are built or loaded on first use
+    assert "openai" not in report.modules
+    assert "numpy" not in report.modules
+    assert report.total_seconds < STARTUP_IMPORT_BUDGET_SECONDS, report.format(top=15)
@@ -0,0 +1,31 @@
+from prometheus_client import REGISTRY
+from pydantic_ai.messages import ModelMessagesTypeAdapter, ModelRequest, ModelResponse, TextPart, UserPromptPart
+
+from app.utils.transcript import build_transcript, transcript_for_agent
+
+
+def _dialogue(turns: int):
+    messages = []
+    for i in range(turns):
+        messages.append(ModelRequest(parts=[UserPromptPart(f"question {i}")]))
+        messages.append(ModelResponse(parts=[TextPart(f"answer {i}")]))
+    return messages
+
+
+def test_transcript_drops_the_oldest_lines_over_budget():
+    transcript = build_transcript(_dialogue(20), token_budget=30)
+    lines = transcript.splitlines()
+    assert lines[0].endswith("earlier lines omitted]")
+    assert lines[-1] == "Assistant: answer 19"
+    assert "question 0" not in transcript
+
+
+def test_transcript_for_agent_measures_raw_json_by_its_length():
+    messages = _dialogue(3)
+    raw_json = ModelMessagesTypeAdapter.dump_json(messages)
+
+    transcript = transcript_for_agent("test-transcript", messages, raw_json)
+
+    assert transcript.splitlines()[0] == "User: question 0"
+    raw_sum = REGISTRY.get_sample_value("agent_transcript_tokens_sum", {"agent": "test-transcript", "format": "raw"})
+    assert raw_sum == (len(raw_json) + 3) // 4
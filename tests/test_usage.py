@@ -0,0 +1,131 @@
+import asyncio
+
+import asyncpg
+from pydantic_ai.usage import Usage
+
+from app.utils import usage as usage_module
+from app.utils.pg_utils import DatabaseError, PgDatabase
+from app.utils.usage import TurnUsage, UserTokenBudget
+
+
+def _fake_counters(monkeypatch):
+    counters = {}
+
+    async def fake_get_many_json(keys):
+        await asyncio.sleep(0)
+        return {key: counters[key] for key in keys if key in counters}
+
+    async def fake_incr_counters(amounts, ttl):
+        await asyncio.sleep(0)
+        for key, amount in amounts.items():
+            counters[key] = counters.get(key, 0) + amount
+        return True
+
+    async def fake_incr_counter(key, amount, ttl):
+        await fake_incr_counters({key: amount}, ttl)
+        return counters[key]
+
+    monkeypatch.setattr(usage_module, "get_many_json", fake_get_many_json)
+    monkeypatch.setattr(usage_module, "incr_counters", fake_incr_counters)
+    monkeypatch.setattr(usage_module, "incr_counter", fake_incr_counter)
+    return counters
+
+
+def test_budget_sums_buckets_over_the_rolling_window(monkeypatch):
+    counters = _fake_counters(monkeypatch)
+    budget = UserTokenBudget(limit=1000, window=3600, bucket=600)
+
+    async def run():
+        # A bucket older than the window no longer counts
+        counters["usage:u1:0"] = 5000
+        assert await budget.remaining("u1") == 1000
+        await budget.charge("u1", 400)
+        await budget.charge("u1", 700)
+        assert await budget.remaining("u1") == 0
+        assert await budget.remaining("u2") == 1000
+        assert await UserTokenBudget(limit=0).remaining("u1") is None
+
+    asyncio.run(run())
+
+
+def test_concurrent_turns_cannot_overrun_the_budget(monkeypatch):
+    _fake_counters(monkeypatch)
+    budget = UserTokenBudget(limit=10000, window=3600, bucket=600, turn_reserve=4000)
+
+    async def run():
+        reservations = await asyncio.gather(*(budget.reserve("u1") for _ in range(5)))
+        admitted = [r for r in reservations if r is not None]
+        assert len(admitted) == 2, "Only the turns the budget can cover may start"
+        assert await budget.spent("u1") == 8000
+
+        # Settling replaces each reservation with the turn's actual usage
+        await admitted[0].settle(1000)
+        await admitted[1].settle(6000)
+        assert await budget.spent("u1") == 7000
+        # 3000 tokens left cannot cover a turn's reservation
+        assert await budget.reserve("u1") is None
+        assert await budget.spent("u1") == 7000
+
+    asyncio.run(run())
+
+
+def test_owner_lookup_fails_open(monkeypatch):
+    class FailingDatabase:
+        async def get_conversation_user_id(self, conversation_id, timeout=None):
+            raise DatabaseError("connection pool exhausted")
+
+    assert asyncio.run(usage_module.get_conversation_owner(FailingDatabase(), "c-unknown", timeout=0.1)) is None
+
+
+class FakeConnection:
+    def __init__(self, has_usage_column):
+        self.has_usage_column = has_usage_column
+        self.inserts = []
+
+    async def execute(self, query, *args, timeout=None):
+        if query.startswith("INSERT"):
+            if "usage" in query and not self.has_usage_column:
+                raise asyncpg.exceptions.UndefinedColumnError('column "usage" does not exist')
+            self.inserts.append(query)
+
+    async def fetchval(self, query, *args, timeout=None):
+        return self.has_usage_column
+
+
+class FakePool:
+    def __init__(self, connection):
+        self.connection = connection
+
+    async def acquire(self, timeout=None):
+        return self.connection
+
+    async def release(self, connection):
+        pass
+
+
+def test_turn_usage_is_stored_with_the_messages():
+    turn_usage = TurnUsage()
+    turn_usage.add("chat", Usage(requests=2, request_tokens=900, response_tokens=100, total_tokens=1000, details={"cached_tokens": 768}))
+    turn_usage.add("metadata_title", Usage(requests=1, request_tokens=300, response_tokens=20, total_tokens=320))
+    assert turn_usage.as_dict()["total_tokens"] == 1320
+    assert turn_usage.as_dict()["agents"]["chat"]["cached_tokens"] == 768
+
+    async def add(database):
+        for _ in range(2):
+            await database.add_messages(b"[]", "c1", usage=turn_usage.as_dict())
+
+    with_column = FakeConnection(has_usage_column=True)
+    asyncio.run(add(PgDatabase(FakePool(with_column), None)))
+    assert all("usage" in insert for insert in with_column.inserts)
+
+    # Without the column, turns are still stored and the column is not tried again
+    without_column = FakeConnection(has_usage_column=False)
+    database = PgDatabase(FakePool(without_column), None)
+    asyncio.run(add(database))
+    assert len(without_column.inserts) == 2 and not any("usage" in insert for insert in without_column.inserts)
+    assert database._usage_column is False
+
+    # The startup check finds the missing column before the first turn
+    database = PgDatabase(FakePool(FakeConnection(has_usage_column=False)), None)
+    assert asyncio.run(database.check_usage_column()) is False
+    assert database._usage_column is False